@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..core.config import settings
+from ..core.database import get_db
+from ..core.loop_monitor import LoopMonitor
+from ..core.profiler import ProfilerBusy, SamplingProfiler
+from ..core.tracing import get_trace, recent_traces
+from ..models.user import User
+from ..services.ingest_queue import IngestQueue
+from ..services.vector_store import VectorIndex
+from ..api.auth import require_admin
+from ..api.health import readiness
+
+router = APIRouter()
+
+@router.get("/traces")
+def list_traces(
+    limit: int = Query(50, ge=1, le=500),
+    min_duration_ms: float = 0,
+    current_user: User = Depends(require_admin)
+):
+    traces = recent_traces(limit=settings.trace_buffer_size)
+    return [trace for trace in traces if trace.get("duration_ms", 0) >= min_duration_ms][:limit]
+
+@router.get("/traces/{trace_id}")
+def get_trace_spans(
+    trace_id: str,
+    current_user: User = Depends(require_admin)
+):
+    spans = get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found or no longer buffered")
+    return spans
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    interval_ms: Optional[float] = Query(None, ge=1),
+    include_idle: bool = False,
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(require_admin)
+):
+    """Sample every thread of this worker for `seconds` and return collapsed stacks.
+
+    Pipe the output into flamegraph.pl or open it in speedscope. The sampler
+    runs on the threadpool, so the event loop keeps serving while it profiles.
+    """
+    if seconds > settings.profile_max_seconds:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {settings.profile_max_seconds}")
+
+    try:
+        result = await run_in_threadpool(
+            SamplingProfiler.run,
+            seconds,
+            interval_ms or settings.profile_interval_ms,
+            include_idle
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return PlainTextResponse(
+        SamplingProfiler.collapsed(result["stacks"], limit),
+        headers={
+            "X-Profile-Samples": str(result["samples"]),
+            "X-Profile-Duration": str(result["duration_s"]),
+            "X-Profile-Interval-Ms": str(result["interval_ms"])
+        }
+    )
+
+@router.get("/vector-index")
+def vector_index_status(current_user: User = Depends(require_admin)):
+    return VectorIndex.status()
+
+@router.post("/vector-index/rebuild", status_code=202)
+def rebuild_vector_index(current_user: User = Depends(require_admin)):
+    """Retrain and rebuild every shard with FAISS_INDEX_FACTORY in the background"""
+    if not VectorIndex.available():
+        raise HTTPException(status_code=503, detail="FAISS is not installed")
+    VectorIndex.start_rebuild()
+    return VectorIndex.status()
+
+@router.get("/ingest-queue")
+def ingest_queue_status(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    """Documents per processing status and the leases each ingestion process holds"""
+    return IngestQueue.status(db)
+
+@router.get("/health")
+async def health_details(request: Request, current_user: User = Depends(require_admin)):
+    """/health with the error messages of failed checks and the stacks of recent event-loop stalls"""
+    body = await readiness(request, details=True)
+    body["event_loop"] = LoopMonitor.snapshot()
+    return body
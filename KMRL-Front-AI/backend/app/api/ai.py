@@ -1,42 +1,164 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import json
 
+from ..core.access import visible_departments
 from ..core.database import get_db
+from ..core.executors import iterate_inference, run_inference
+from ..core.rate_limit import rate_limit
 from ..models.user import User
-from ..api.schemas import ChatMessage, ChatResponse
+from ..api.schemas import ChatMessage, ChatResponse, DocumentAnalysis, DocumentClassification, TranslationRequest, TranslationResponse
 from ..api.auth import get_current_user
-from ..services.ai_service import AIService
+from ..api.documents import get_visible_document
+from ..services.chat_service import ChatService
+from ..services.classifier_service import classify_texts
+from ..services.entity_service import EntityService
+from ..services.search_service import SearchService
+from ..services.translation_service import TranslationService, TranslationUnavailable, supported_languages
 
 router = APIRouter()
 
-@router.post("/chat", response_model=ChatResponse)
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(rate_limit("chat"))])
 async def chat_with_ai(
     message: ChatMessage,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     try:
-        ai_service = AIService()
-        response, confidence = ai_service.chat_response(message.message, message.context)
+        # Retrieval only sees chunks of documents the user may read
+        chat_service = ChatService(db, SearchService(db, departments=visible_departments(current_user)))
+        # Query encoding and retrieval run on the inference pool, never on the loop
+        prepared = await run_inference(
+            chat_service.prepare,
+            message.message,
+            user_id=current_user.id,
+            session_id=message.session_id,
+            extra_context=message.context
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
+    
+    if message.stream:
+        # Server-sent events: sources first, then tokens as they are generated
+        async def events():
+            yield sse_event("citations", {"session_id": prepared["session"].id, "citations": chat_service.citations(prepared)})
+            answer = []
+            try:
+                async for piece in iterate_inference(chat_service.stream(prepared)):
+                    answer.append(piece)
+                    yield sse_event("token", {"text": piece})
+            except Exception as e:
+                yield sse_event("error", {"detail": f"AI service error: {str(e)}"})
+                return
+            yield sse_event("done", {
+                "session_id": prepared["session"].id,
+                "confidence": chat_service.confidence(prepared),
+                "citations": chat_service.citations(prepared, "".join(answer))
+            })
         
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    try:
+        response = await run_inference(chat_service.answer, prepared)
         return ChatResponse(
             response=response,
-            confidence=confidence
+            confidence=chat_service.confidence(prepared),
+            session_id=prepared["session"].id,
+            citations=chat_service.citations(prepared, response)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
-@router.post("/analyze-document")
+@router.post("/classify-document", response_model=DocumentClassification)
+async def classify_document(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    def classify():
+        document = get_visible_document(document_id, current_user, db)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        if not document.extracted_text:
+            raise HTTPException(status_code=400, detail="Document text not available")
+        
+        return classify_texts([document.extracted_text])[0]
+    
+    result = await run_inference(classify)
+    return DocumentClassification(document_id=document_id, **result)
+
+@router.post("/analyze-document", response_model=DocumentAnalysis)
 async def analyze_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Placeholder for document analysis
-    return {
-        "document_id": document_id,
-        "analysis": "Document analysis feature coming soon",
-        "entities": [],
-        "sentiment": "neutral",
-        "topics": []
-    }
\ No newline at end of file
+    def load_entities():
+        document = get_visible_document(document_id, current_user, db)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        if not document.extracted_text:
+            raise HTTPException(status_code=400, detail="Document text not available")
+        
+        entity_service = EntityService(db)
+        entities = entity_service.get_entities(document_id)
+        if not entities:
+            # Documents ingested before entity indexing existed
+            entity_service.index_document(document)
+            entities = entity_service.get_entities(document_id)
+        return entities
+    
+    entities = await run_inference(load_entities)
+    
+    entity_counts = {}
+    for entity in entities:
+        entity_counts[entity.label] = entity_counts.get(entity.label, 0) + 1
+    
+    topics = sorted(
+        {entity.normalized for entity in entities if entity.label in ("EQUIPMENT", "STATION")}
+    )
+    
+    return DocumentAnalysis(
+        document_id=document_id,
+        entities=entities,
+        entity_counts=entity_counts,
+        topics=topics
+    )
+
+@router.post("/translate", response_model=TranslationResponse, dependencies=[Depends(rate_limit("translate"))])
+async def translate_text(
+    request: TranslationRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    languages = supported_languages()
+    if request.source_language not in languages or request.target_language not in languages:
+        raise HTTPException(status_code=400, detail=f"Supported languages: {', '.join(languages)}")
+    
+    # Segments seen before (headers, disclaimers) come from the cache
+    try:
+        translated = await run_inference(
+            TranslationService(db).translate,
+            request.text,
+            request.source_language,
+            request.target_language
+        )
+    except TranslationUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return TranslationResponse(
+        text=translated,
+        source_language=request.source_language,
+        target_language=request.target_language,
+        model_id=TranslationService.model_id(request.source_language, request.target_language)
+    )
\ No newline at end of file
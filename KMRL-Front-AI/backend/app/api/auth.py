@@ -3,6 +3,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
+from ..core.access import is_unrestricted
 from ..core.database import get_db
 from ..core.security import verify_password, get_password_hash, create_access_token, verify_token
 from ..models.user import User
@@ -33,8 +34,16 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid token"
         )
 
+def require_admin(current_user: User = Depends(get_current_user)):
+    if not is_unrestricted(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required"
+        )
+    return current_user
+
 @router.post("/register", response_model=UserSchema)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+def register(user: UserCreate, db: Session = Depends(get_db)):
     # Check if user exists
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
@@ -43,13 +52,13 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
     
-    # Create new user
+    # Create new user; registration is open, so the role is never taken from the
+    # request and privileged roles are granted only by an administrator
     hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         name=user.name,
         hashed_password=hashed_password,
-        role=user.role,
         department=user.department
     )
     db.add(db_user)
@@ -59,7 +68,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_credentials.email).first()
     
     if not user:
@@ -1,26 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import RedirectResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
 import uuid
-import shutil
+from urllib.parse import quote
 
+from ..core.access import can_view, restrict, visible_departments
 from ..core.database import get_db
+from ..core.executors import run_inference
+from ..core.rate_limit import bulkhead, rate_limit
+from ..core.tracing import span
 from ..models.user import User
-from ..models.document import Document, DocumentSummary
-from ..api.schemas import Document as DocumentSchema, DocumentSummary as DocumentSummarySchema, SearchQuery, SearchResult
+from ..models.document import Document
+from ..api.schemas import Document as DocumentSchema, DocumentBrief, DocumentPage, DocumentSummary as DocumentSummarySchema, SearchQuery, SearchResult, RelatedDocument as RelatedDocumentSchema, Suggestion
 from ..api.auth import get_current_user
-from ..services.ocr_service import OCRService
-from ..services.ai_service import AIService
+from ..services.classifier_service import PRIORITIES
+from ..services.dedup_service import DedupService
+from ..services.entity_service import EntityService
+from ..services.file_service import DocumentFileResponse, PreviewUnavailable, RenditionService, etag_matches, thumbnail_sizes
+from ..services.ingest_queue import IngestQueue
+from ..services.ingestion_service import IngestionService
+from ..services.related_service import RelatedDocumentsService
+from ..services.search_service import SearchService
+from ..services.storage import StoredFile, content_disposition, get_storage, stream_hash
+from ..services.suggest_service import SuggestIndex
+from ..services.summary_service import SUMMARY_PARAMS, SummaryService, SummaryUnavailable
+from ..services.text_store import TextStore
+from ..services.translation_service import supported_languages
 from ..core.config import settings
 
 router = APIRouter()
 
+def get_visible_document(document_id: int, current_user: User, db: Session) -> Optional[Document]:
+    """The document, or None when it does not exist or belongs to a department the user cannot see"""
+    document = db.query(Document).filter(Document.id == document_id).first()
+    if document is None or not can_view(visible_departments(current_user), document.department):
+        return None
+    return document
+
+# Rate limited by RateLimitMiddleware, before the body is read
 @router.post("/upload", response_model=DocumentSchema)
 async def upload_document(
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
     document_type: Optional[str] = Form(None),
+    priority: Optional[str] = Form(None),
     department: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -28,123 +54,296 @@ async def upload_document(
     # Validate file size
     if file.size > settings.max_file_size:
         raise HTTPException(status_code=413, detail="File too large")
+    if priority is not None and priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
     
     # Generate unique filename
     file_extension = os.path.splitext(file.filename)[1]
     unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(settings.upload_dir, unique_filename)
-    
-    # Save file
-    os.makedirs(settings.upload_dir, exist_ok=True)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
     
     # Create document record
-    document = Document(
-        filename=unique_filename,
-        original_filename=file.filename,
-        file_path=file_path,
-        file_size=file.size,
-        mime_type=file.content_type,
-        title=title or file.filename,
-        document_type=document_type,
-        department=department or current_user.department,
-        uploaded_by=current_user.id,
-        processing_status="pending"
-    )
-    
-    db.add(document)
-    db.commit()
-    db.refresh(document)
-    
-    # Trigger OCR processing (async in production)
-    try:
-        ocr_service = OCRService()
-        extracted_text, confidence = ocr_service.extract_text(file_path)
-        
-        document.extracted_text = extracted_text
-        document.ocr_confidence = confidence
-        document.processing_status = "completed"
+    def save(stored: StoredFile) -> Document:
+        document = Document(
+            filename=unique_filename,
+            original_filename=file.filename,
+            file_path=stored.location,
+            file_size=stored.size,
+            mime_type=file.content_type,
+            content_hash=stored.content_hash,
+            title=title or file.filename,
+            document_type=document_type,
+            classification_source="user" if document_type else None,
+            # Labels for training the classifier's priority head
+            **({"priority": priority, "priority_source": "user"} if priority else {}),
+            department=department or current_user.department,
+            uploaded_by=current_user.id,
+            **IngestQueue.initial_state()
+        )
         
-        db.commit()
+        db.add(document)
+        with span("db.commit"):
+            db.commit()
         db.refresh(document)
-    except Exception as e:
-        document.processing_status = "failed"
-        db.commit()
+        return document
     
-    return document
+    def ingest(document: Document) -> Document:
+        IngestQueue.hold(document.id)
+        try:
+            with span("ingest", document_id=document.id):
+                IngestionService(db).process(document)
+        finally:
+            IngestQueue.release(db, document.id)
+        # Load the final state here so serializing the response does not hit the DB on the loop
+        db.refresh(document)
+        return document
+    
+    if settings.ingest_mode == "queue":
+        # Left pending for the ingest workers
+        with span("upload.write_file", size=file.size):
+            stored = await get_storage().save(unique_filename, file, file.content_type)
+        return await run_in_threadpool(save, stored)
+    
+    # Admitted before anything is saved, so a rejected upload leaves no pending document.
+    # The file is streamed to storage without blocking the loop, DB writes run on
+    # the threadpool, OCR and models on the inference pool
+    async with bulkhead("ocr"):
+        with span("upload.write_file", size=file.size):
+            stored = await get_storage().save(unique_filename, file, file.content_type)
+        document = await run_in_threadpool(save, stored)
+        return await run_inference(ingest, document)
+
+@router.get("/by-entity", response_model=List[DocumentBrief])
+def documents_by_entity(
+    label: str,
+    value: str,
+    skip: int = 0,
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return EntityService(db).find_documents(label, value, skip=skip, limit=limit, departments=visible_departments(current_user))
+
+@router.get("/suggest", response_model=List[Suggestion])
+def suggest(
+    q: str,
+    limit: int = Query(10, ge=1, le=20),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # Served from memory; counts only include documents the user may see
+    return SuggestIndex.suggest(db, q, limit=limit, departments=visible_departments(current_user))
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-async def get_document(
+def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = get_visible_document(document_id, current_user, db)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     return document
 
-@router.get("/", response_model=List[DocumentSchema])
-async def list_documents(
-    skip: int = 0,
-    limit: int = 10,
+@router.get("/{document_id}/text", response_model=DocumentPage)
+def get_document_text(
+    document_id: int,
+    page: int = 1,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    documents = db.query(Document).offset(skip).limit(limit).all()
-    return documents
+    document = get_visible_document(document_id, current_user, db)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document.text_length is None:
+        raise HTTPException(status_code=400, detail="Document text not available")
+    
+    # Only the requested page's segments are read and decompressed
+    text_store = TextStore(db)
+    text = text_store.read_page(document_id, page)
+    if text is None:
+        raise HTTPException(status_code=404, detail=f"Page {page} not found")
+    return DocumentPage(document_id=document_id, page=page, page_count=text_store.page_count(document_id), text=text)
 
-@router.post("/{document_id}/summarize", response_model=DocumentSummarySchema)
-async def summarize_document(
+def load_document_file(document_id: int, current_user: User, db: Session) -> Document:
+    """Document whose file exists in storage, with its content hash filled in for older uploads"""
+    document = get_visible_document(document_id, current_user, db)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    storage = get_storage(document.file_path)
+    if not storage.exists(document.file_path):
+        raise HTTPException(status_code=404, detail="Document file not found")
+    if not document.content_hash:
+        with storage.open(document.file_path) as f:
+            document.content_hash = stream_hash(f)
+        db.commit()
+    return document
+
+# Files never change for a document id, so clients may reuse them for a while and
+# then revalidate cheaply with the ETag
+FILE_CACHE_CONTROL = "private, max-age=3600"
+
+@router.api_route("/{document_id}/download", methods=["GET", "HEAD"])
+async def download_document(
     document_id: int,
+    request: Request,
+    inline: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    document = await run_in_threadpool(load_document_file, document_id, current_user, db)
+    headers = {"ETag": f'"{document.content_hash}"', "Cache-Control": FILE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
-    if not document.extracted_text:
-        raise HTTPException(status_code=400, detail="Document text not available")
+    # Object stores serve the bytes themselves; the client follows a short-lived presigned URL
+    storage = get_storage(document.file_path)
+    url = storage.download_url(document.file_path, document.original_filename, document.mime_type, inline)
+    if url:
+        return RedirectResponse(url, status_code=307)
     
-    # Check if summary already exists
-    existing_summary = db.query(DocumentSummary).filter(
-        DocumentSummary.document_id == document_id
-    ).first()
+    path = storage.local_path(document.file_path)
+    if settings.download_accel_prefix:
+        # NGINX sends the file with sendfile and handles Range itself
+        relative_path = os.path.relpath(path, settings.upload_dir).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.download_accel_prefix.rstrip("/") + "/" + quote(relative_path)
+        headers["Content-Disposition"] = content_disposition(document.original_filename, inline)
+        return Response(media_type=document.mime_type, headers=headers)
     
-    if existing_summary:
-        return existing_summary
+    # Range (single and multipart), If-Range and HEAD are handled by the response
+    return DocumentFileResponse(
+        path,
+        media_type=document.mime_type,
+        filename=document.original_filename,
+        headers=headers,
+        content_disposition_type="inline" if inline else "attachment"
+    )
+
+@router.get("/{document_id}/thumbnail")
+async def get_document_thumbnail(
+    document_id: int,
+    request: Request,
+    size: int = 256,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if size not in thumbnail_sizes():
+        raise HTTPException(status_code=400, detail=f"size must be one of: {', '.join(map(str, thumbnail_sizes()))}")
+    document = await run_in_threadpool(load_document_file, document_id, current_user, db)
+    headers = {"ETag": f'"{document.content_hash}-{size}"', "Cache-Control": FILE_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
-    # Generate summary
-    ai_service = AIService()
-    summary_text, confidence = ai_service.summarize_text(document.extracted_text)
+    # Rendered once per content hash and size, on the inference pool since decoding large scans is CPU-bound
+    try:
+        path = await run_inference(
+            RenditionService().get_or_create,
+            document.file_path,
+            document.content_hash,
+            document.mime_type,
+            size
+        )
+    except PreviewUnavailable as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return DocumentFileResponse(path, media_type="image/jpeg", headers=headers)
+
+@router.get("/{document_id}/versions", response_model=List[DocumentBrief])
+def get_document_versions(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    document = get_visible_document(document_id, current_user, db)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    departments = visible_departments(current_user)
+    return [version for version in DedupService(db).get_versions(document) if can_view(departments, version.department)]
+
+@router.get("/{document_id}/related", response_model=List[RelatedDocumentSchema])
+def get_related_documents(
+    document_id: int,
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    document = get_visible_document(document_id, current_user, db)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
     
-    # Save summary
-    summary = DocumentSummary(
-        document_id=document_id,
-        summary_text=summary_text,
-        summary_type="abstractive",
-        language=document.language,
-        confidence_score=confidence
-    )
+    # Precomputed at ingestion time; a single indexed lookup
+    return RelatedDocumentsService(db).get_related(document_id, limit, departments=visible_departments(current_user))
+
+@router.get("/", response_model=List[DocumentBrief])
+def list_documents(
+    skip: int = 0,
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = restrict(db.query(Document), Document.department, visible_departments(current_user))
+    documents = query.offset(skip).limit(limit).all()
+    return documents
+
+@router.post("/{document_id}/summarize", response_model=DocumentSummarySchema, dependencies=[Depends(rate_limit("summarize"))])
+async def summarize_document(
+    document_id: int,
+    summary_type: str = "abstractive",
+    language: Optional[str] = None,
+    refresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if summary_type not in SUMMARY_PARAMS:
+        raise HTTPException(status_code=400, detail=f"summary_type must be one of: {', '.join(SUMMARY_PARAMS)}")
     
-    db.add(summary)
-    db.commit()
-    db.refresh(summary)
+    def summarize():
+        document = get_visible_document(document_id, current_user, db)
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        if not document.extracted_text:
+            raise HTTPException(status_code=400, detail="Document text not available")
+        
+        if language and language != document.language and language not in supported_languages():
+            raise HTTPException(status_code=400, detail=f"language must be one of: {', '.join(supported_languages())}")
+        
+        # Reuses the stored variant unless the text, model or generation params changed;
+        # other languages are generated on first request
+        try:
+            return SummaryService(db).get_or_create(document, summary_type, language, refresh=refresh)
+        except SummaryUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
     
-    return summary
+    async with bulkhead("summarization"):
+        return await run_inference(summarize)
+
+@router.get("/{document_id}/summaries", response_model=List[DocumentSummarySchema])
+def list_document_summaries(
+    document_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    document = get_visible_document(document_id, current_user, db)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return SummaryService(db).list_summaries(document_id)
 
 @router.post("/search", response_model=SearchResult)
-async def search_documents(
+def search_documents(
     query: SearchQuery,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Simple text search for now
-    documents = db.query(Document).filter(
-        Document.extracted_text.contains(query.query)
-    ).limit(query.limit).all()
+    departments = visible_departments(current_user)
+    documents = SearchService(db, departments=departments).search_documents(
+        query.query, limit=query.limit, collapse_versions=query.collapse_versions
+    )
+    
+    # Documents ingested before the search index existed are only reachable by title;
+    # their text is compressed, so reindex_search.py brings them into the index
+    if not documents:
+        documents = restrict(db.query(Document), Document.department, departments).filter(
+            Document.title.contains(query.query)
+        ).limit(query.limit).all()
     
     return SearchResult(
         documents=documents,
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+from ..core.access import can_view, visible_departments
 from ..core.database import get_db
+from ..core.rate_limit import bulkhead, rate_limit
 from ..models.user import User
-from ..api.auth import get_current_user
-from ..services.graph_service import GraphService
+from ..api.auth import get_current_user, require_admin
+from ..api.schemas import GraphQuery, NamedGraphQuery, GraphQueryResult
+from ..services.graph_service import GraphService, GraphQueryError, GraphQueryTimeout
+from ..services.graph_queries import NAMED_QUERIES
 
 router = APIRouter()
 
 @router.get("/relationships")
-async def get_relationships(
+def get_relationships(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -17,29 +22,82 @@ async def get_relationships(
         graph_service = GraphService()
         relationships = graph_service.get_all_relationships()
         
+        # Documents the user cannot see, and edges to them, are left out
+        departments = visible_departments(current_user)
+        hidden = {
+            node["id"] for node in relationships.get("nodes", [])
+            if node["type"] == "Document" and not can_view(departments, node["properties"].get("department"))
+        }
+        nodes = [node for node in relationships.get("nodes", []) if node["id"] not in hidden]
+        edges = [
+            edge for edge in relationships.get("edges", [])
+            if edge["source"] not in hidden and edge["target"] not in hidden
+        ]
         return {
-            "nodes": relationships.get("nodes", []),
-            "edges": relationships.get("edges", []),
-            "total_nodes": len(relationships.get("nodes", [])),
-            "total_edges": len(relationships.get("edges", []))
+            "nodes": nodes,
+            "edges": edges,
+            "total_nodes": len(nodes),
+            "total_edges": len(edges)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph service error: {str(e)}")
 
-@router.post("/query")
+@router.post("/query", response_model=GraphQueryResult, dependencies=[Depends(rate_limit("graph_query"))])
 async def query_graph(
-    query: dict,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    query: GraphQuery,
+    current_user: User = Depends(require_admin)
 ):
-    try:
-        graph_service = GraphService()
-        results = graph_service.execute_query(query.get("cypher", ""))
-        
-        return {
-            "results": results,
-            "query": query.get("cypher", ""),
-            "execution_time": "< 1ms"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
\ No newline at end of file
+    """Ad-hoc read-only Cypher; admins only, as it can read any node whatever its department"""
+    # The bulkhead caps concurrent Neo4j queries; the query itself blocks, so it runs on the threadpool
+    async with bulkhead("graph_query"):
+        try:
+            graph_service = GraphService()
+            result = await run_in_threadpool(
+                graph_service.run_read_query,
+                query.cypher,
+                query.parameters,
+                limit=query.limit,
+                skip=query.skip,
+                timeout=query.timeout
+            )
+            result["query"] = query.cypher
+            return result
+        except GraphQueryTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except GraphQueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
+
+@router.get("/queries")
+def list_named_queries(
+    current_user: User = Depends(get_current_user)
+):
+    return GraphService.list_named_queries()
+
+@router.post("/queries/{name}", response_model=GraphQueryResult, dependencies=[Depends(rate_limit("graph_query"))])
+async def run_named_query(
+    name: str,
+    query: NamedGraphQuery,
+    current_user: User = Depends(get_current_user)
+):
+    if name not in NAMED_QUERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown query: {name}")
+    
+    async with bulkhead("graph_query"):
+        try:
+            graph_service = GraphService()
+            return await run_in_threadpool(
+                graph_service.run_named_query,
+                name,
+                query.parameters,
+                limit=query.limit,
+                skip=query.skip,
+                departments=visible_departments(current_user)
+            )
+        except GraphQueryTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
+        except GraphQueryError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Graph query error: {str(e)}")
\ No newline at end of file
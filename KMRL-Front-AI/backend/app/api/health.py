@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
+from typing import Callable, Dict
+import asyncio
+import time
+
+from ..core.config import settings
+from ..core.database import engine
+from ..core.loop_monitor import LoopMonitor
+from ..core.metrics import render_metrics
+from ..core.startup_profiler import StartupProfiler
+from ..services.model_registry import ModelRegistry
+
+router = APIRouter()
+
+def _probe_database():
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+def _probe_graph():
+    from ..services.graph_service import GraphService
+
+    driver = GraphService().driver
+    if driver is None:
+        raise RuntimeError("driver not available")
+    driver.verify_connectivity()
+
+async def _probe(check: Callable[[], None]) -> Dict:
+    """Run a blocking check on the threadpool, bounded by HEALTH_CHECK_TIMEOUT"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(run_in_threadpool(check), timeout=settings.health_check_timeout)
+        status, error = "ok", None
+    except asyncio.TimeoutError:
+        status, error = "timeout", f"no response within {settings.health_check_timeout}s"
+    except Exception as e:
+        status, error = "error", str(e)
+    result = {"status": status, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if error:
+        result["error"] = error
+    return result
+
+async def readiness(request: Request, details: bool = False) -> Dict:
+    """Probe results and overall state; error messages only with `details`, since /health is unauthenticated"""
+    database, graph = await asyncio.gather(_probe(_probe_database), _probe(_probe_graph))
+    models = ModelRegistry.status()
+    warmed_up = getattr(request.app.state, "ready", False)
+
+    # The database and warm-up gate traffic; the graph and individual models are
+    # optional features, so their failure only degrades the service
+    if database["status"] != "ok":
+        status = "unavailable"
+    elif not warmed_up:
+        status = "warming_up"
+    elif graph["status"] != "ok" or any(model["state"] == "failed" for model in models.values()):
+        status = "degraded"
+    else:
+        status = "ready"
+
+    if not details:
+        for check in (database, graph, *models.values()):
+            check.pop("error", None)
+    return {
+        "status": status,
+        "checks": {"database": database, "graph": graph, "models": models},
+        "startup": StartupProfiler.report()
+    }
+
+def loop_counters() -> Dict:
+    """Event-loop lag counters, without the stacks of recent stalls"""
+    return {key: value for key, value in LoopMonitor.snapshot().items() if key != "recent_stalls"}
+
+@router.get("/health/live")
+async def liveness_check():
+    # Answering at all means the event loop is running
+    return {"status": "alive", "event_loop": loop_counters()}
+
+@router.get("/health/ready")
+async def readiness_check(request: Request):
+    body = await readiness(request)
+    return JSONResponse(body, status_code=200 if body["status"] in ("ready", "degraded") else 503)
+
+@router.get("/health")
+async def health_check(request: Request):
+    body = await readiness(request)
+    body["event_loop"] = loop_counters()
+    return body
+
+@router.get("/metrics")
+async def metrics():
+    # Rendered on the loop: it is fast, and the threadpool gauges can only be read here
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 
+from ..core.config import settings
+
 # User schemas
 class UserBase(BaseModel):
     email: str
@@ -38,22 +40,38 @@ class DocumentBase(BaseModel):
 class DocumentCreate(DocumentBase):
     pass
 
-class Document(DocumentBase):
+class DocumentBrief(DocumentBase):
+    """A document without its text, for listings"""
     id: int
     filename: str
     original_filename: str
     file_size: int
     mime_type: str
-    extracted_text: Optional[str] = None
+    text_length: Optional[int] = None
     language: str
     processing_status: str
     ocr_confidence: Optional[float] = None
+    classification_source: Optional[str] = None
+    type_confidence: Optional[float] = None
+    priority_confidence: Optional[float] = None
     uploaded_by: int
+    version_group_id: Optional[int] = None
+    previous_version_id: Optional[int] = None
+    version_similarity: Optional[float] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class Document(DocumentBrief):
+    extracted_text: Optional[str] = None
+
+class DocumentPage(BaseModel):
+    document_id: int
+    page: int
+    page_count: int
+    text: str
+
 class DocumentSummary(BaseModel):
     id: int
     document_id: int
@@ -61,19 +79,75 @@ class DocumentSummary(BaseModel):
     summary_type: str
     language: str
     confidence_score: Optional[float] = None
+    model_id: Optional[str] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class RelatedDocument(BaseModel):
+    document_id: int
+    title: Optional[str] = None
+    document_type: Optional[str] = None
+    department: Optional[str] = None
+    score: float
+    sources: List[str] = []
+
+class Suggestion(BaseModel):
+    text: str
+    kind: str  # title, filename, department, entity
+    label: Optional[str] = None  # entity label, for /documents/by-entity
+    count: int  # documents it appears in
+
+class DocumentEntity(BaseModel):
+    text: str
+    label: str
+    normalized: str
+    start: int
+    end: int
+    source: str
     
     class Config:
         from_attributes = True
 
+# Subscription schemas
+class SubscriptionCreate(BaseModel):
+    name: str
+    query: str = ""
+    document_type: Optional[str] = None
+    priority: Optional[str] = None
+    department: Optional[str] = None
+    webhook_url: Optional[str] = None
+    is_active: bool = True
+
+class Subscription(SubscriptionCreate):
+    id: int
+    user_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class Notification(BaseModel):
+    id: int
+    subscription_id: int
+    document_id: int
+    document_title: Optional[str] = None
+    status: str
+    created_at: datetime
+    delivered_at: Optional[datetime] = None
+    read_at: Optional[datetime] = None
+
 # Search schemas
 class SearchQuery(BaseModel):
     query: str
     filters: Optional[dict] = None
     limit: Optional[int] = 10
+    collapse_versions: Optional[bool] = True  # one result per group of near-duplicate versions
 
 class SearchResult(BaseModel):
-    documents: List[Document]
+    documents: List[DocumentBrief]
     total: int
     query: str
 
@@ -81,7 +155,71 @@ class SearchResult(BaseModel):
 class ChatMessage(BaseModel):
     message: str
     context: Optional[str] = None
+    session_id: Optional[str] = None
+    stream: bool = False
+
+class Citation(BaseModel):
+    source: int
+    document_id: int
+    title: Optional[str] = None
+    page: int
+    chunk_id: int
 
 class ChatResponse(BaseModel):
     response: str
-    confidence: Optional[float] = None
\ No newline at end of file
+    confidence: Optional[float] = None
+    session_id: Optional[str] = None
+    citations: List[Citation] = []
+
+class DocumentClassification(BaseModel):
+    document_id: int
+    type: str
+    priority: str
+    type_confidence: float
+    priority_confidence: float
+    type_probabilities: dict
+    priority_probabilities: dict
+
+class DocumentAnalysis(BaseModel):
+    document_id: int
+    entities: List[DocumentEntity]
+    entity_counts: dict
+    topics: List[str]
+
+class TranslationRequest(BaseModel):
+    text: str
+    source_language: str = "en"
+    target_language: str = "ml"
+
+class TranslationResponse(BaseModel):
+    text: str
+    source_language: str
+    target_language: str
+    model_id: str
+
+# Graph schemas
+class GraphQuery(BaseModel):
+    cypher: str
+    parameters: Optional[dict] = None
+    limit: Optional[int] = Field(None, ge=1, le=settings.graph_query_max_rows)
+    skip: int = Field(0, ge=0)
+    timeout: Optional[float] = Field(None, gt=0, le=settings.graph_query_timeout)
+
+class NamedGraphQuery(BaseModel):
+    parameters: Optional[dict] = None
+    limit: Optional[int] = Field(None, ge=1, le=settings.graph_query_max_rows)
+    skip: int = Field(0, ge=0)
+
+class GraphQueryResult(BaseModel):
+    query: str
+    columns: List[str]
+    results: List[dict]
+    row_count: int
+    skip: int
+    limit: int
+    has_more: bool
+    next_skip: Optional[int] = None
+    execution_time_ms: float
+    server_time_ms: dict
+    query_type: Optional[str] = None
+    counters: dict
\ No newline at end of file
@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..core.access import visible_departments
+from ..core.database import get_db
+from ..models.stats import STAT_DIMENSIONS
+from ..models.user import User
+from ..api.auth import get_current_user
+from ..services.stats_service import INTERVALS, StatsService
+
+router = APIRouter()
+
+def stat_filters(
+    department: Optional[str] = None,
+    document_type: Optional[str] = None,
+    priority: Optional[str] = None,
+    processing_status: Optional[str] = None
+):
+    return {
+        "department": department,
+        "document_type": document_type,
+        "priority": priority,
+        "processing_status": processing_status
+    }
+
+@router.get("/summary")
+def get_summary(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    filters: dict = Depends(stat_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return StatsService(db).summary(filters, since=since, until=until, departments=visible_departments(current_user))
+
+@router.get("/series")
+def get_series(
+    interval: str = "day",
+    group_by: Optional[str] = None,
+    days: int = Query(30, ge=1, le=3660),
+    filters: dict = Depends(stat_filters),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
+    if group_by is not None and group_by not in STAT_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(STAT_DIMENSIONS)}")
+    
+    since = date.today() - timedelta(days=days - 1)
+    return {
+        "interval": interval,
+        "since": since,
+        "series": StatsService(db).series(
+            interval, group_by=group_by, filters=filters, since=since, departments=visible_departments(current_user)
+        )
+    }
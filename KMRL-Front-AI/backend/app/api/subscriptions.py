@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from ..core.config import settings
+from ..core.database import get_db
+from ..models.document import Document
+from ..models.subscription import Notification, Subscription
+from ..models.user import User
+from ..api.auth import get_current_user
+from ..api.schemas import Notification as NotificationSchema, Subscription as SubscriptionSchema, SubscriptionCreate
+from ..services.subscription_service import compile_subscription, webhook_allowed
+
+router = APIRouter()
+
+def validate_webhook(webhook_url):
+    """Webhooks are POSTed from the server, so only allowlisted hosts are accepted"""
+    if webhook_url and not webhook_allowed(webhook_url):
+        raise HTTPException(status_code=400, detail="webhook_url host is not allowed")
+
+def get_own_subscription(subscription_id: int, current_user: User, db: Session) -> Subscription:
+    subscription = db.query(Subscription).filter(
+        Subscription.id == subscription_id,
+        Subscription.user_id == current_user.id
+    ).first()
+    if not subscription:
+        raise HTTPException(status_code=404, detail="Subscription not found")
+    return subscription
+
+@router.post("/", response_model=SubscriptionSchema)
+def create_subscription(
+    subscription_data: SubscriptionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    validate_webhook(subscription_data.webhook_url)
+    count = db.query(Subscription).filter(Subscription.user_id == current_user.id).count()
+    if count >= settings.max_subscriptions_per_user:
+        raise HTTPException(status_code=400, detail=f"At most {settings.max_subscriptions_per_user} subscriptions per user")
+
+    subscription = Subscription(user_id=current_user.id, **subscription_data.model_dump())
+    compile_subscription(subscription)
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+@router.get("/", response_model=List[SubscriptionSchema])
+def list_subscriptions(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return db.query(Subscription).filter(Subscription.user_id == current_user.id).order_by(Subscription.id).all()
+
+@router.get("/notifications", response_model=List[NotificationSchema])
+def list_notifications(
+    unread: bool = False,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    query = (
+        db.query(Notification, Document.title)
+        .join(Document, Document.id == Notification.document_id)
+        .filter(Notification.user_id == current_user.id)
+    )
+    if unread:
+        query = query.filter(Notification.read_at.is_(None))
+    rows = query.order_by(Notification.id.desc()).offset(skip).limit(limit).all()
+    return [
+        NotificationSchema(
+            id=notification.id,
+            subscription_id=notification.subscription_id,
+            document_id=notification.document_id,
+            document_title=title,
+            status=notification.status,
+            created_at=notification.created_at,
+            delivered_at=notification.delivered_at,
+            read_at=notification.read_at
+        )
+        for notification, title in rows
+    ]
+
+@router.post("/notifications/{notification_id}/read")
+def mark_notification_read(
+    notification_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    notification = db.query(Notification).filter(
+        Notification.id == notification_id,
+        Notification.user_id == current_user.id
+    ).first()
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    if notification.read_at is None:
+        notification.read_at = datetime.now(timezone.utc)
+        db.commit()
+    return {"id": notification.id, "read_at": notification.read_at}
+
+@router.put("/{subscription_id}", response_model=SubscriptionSchema)
+def update_subscription(
+    subscription_id: int,
+    subscription_data: SubscriptionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    validate_webhook(subscription_data.webhook_url)
+    subscription = get_own_subscription(subscription_id, current_user, db)
+    for field, value in subscription_data.model_dump().items():
+        setattr(subscription, field, value)
+    compile_subscription(subscription)
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+@router.delete("/{subscription_id}")
+def delete_subscription(
+    subscription_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    subscription = get_own_subscription(subscription_id, current_user, db)
+    db.query(Notification).filter(Notification.subscription_id == subscription.id).delete()
+    db.delete(subscription)
+    db.commit()
+    return {"deleted": subscription_id}
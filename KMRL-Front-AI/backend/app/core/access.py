@@ -0,0 +1,43 @@
+from sqlalchemy import false, or_
+from typing import Optional, Tuple
+
+from .config import settings
+
+def _setting_values(value: str) -> Tuple[str, ...]:
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+def is_unrestricted(user) -> bool:
+    """Roles in UNRESTRICTED_ROLES see every department and may use the admin routes"""
+    return user.role in _setting_values(settings.unrestricted_roles)
+
+def visible_departments(user) -> Optional[Tuple[str, ...]]:
+    """Departments whose documents the user may see; None when every department is visible.
+
+    "" stands for documents without a department, which everyone may see, as
+    may departments listed in SHARED_DEPARTMENTS.
+    """
+    if is_unrestricted(user):
+        return None
+    departments = {"", *_setting_values(settings.shared_departments)}
+    if user.department:
+        departments.add(user.department)
+    return tuple(sorted(departments))
+
+def department_filter(column, departments: Optional[Tuple[str, ...]]):
+    """SQL condition restricting a department column to `departments`, or None when unrestricted"""
+    if departments is None:
+        return None
+    conditions = []
+    named = [department for department in departments if department]
+    if named:
+        conditions.append(column.in_(named))
+    if "" in departments:
+        conditions += [column.is_(None), column == ""]
+    return or_(*conditions) if conditions else false()
+
+def restrict(query, column, departments: Optional[Tuple[str, ...]]):
+    condition = department_filter(column, departments)
+    return query if condition is None else query.filter(condition)
+
+def can_view(departments: Optional[Tuple[str, ...]], department: Optional[str]) -> bool:
+    return departments is None or (department or "") in departments
@@ -13,6 +13,8 @@ class Settings(BaseSettings):
     neo4j_url: str = "bolt://localhost:7687"
     neo4j_user: str = "neo4j"
     neo4j_password: str = "password"
+    graph_query_timeout: float = 10.0  # seconds
+    graph_query_max_rows: int = 1000
     
     # JWT
     secret_key: str = "kmrl-dochub-secret-key-change-in-production"
@@ -20,12 +22,113 @@ class Settings(BaseSettings):
     access_token_expire_minutes: int = 30
     
     # File Storage
+    storage_backend: str = "local"  # local (UPLOAD_DIR) or s3 (needs boto3)
     upload_dir: str = "./data/uploads"
     max_file_size: int = 104857600  # 100MB
+    renditions_dir: str = "./data/renditions"
+    thumbnail_sizes: str = "256,1024"  # thumbnail and preview edge lengths that may be requested
+    download_accel_prefix: str = ""  # e.g. /protected-uploads/ to hand file transfer to NGINX via X-Accel-Redirect
+    s3_bucket: str = ""
+    s3_prefix: str = "uploads/"  # prepended to object keys
+    s3_endpoint_url: str = ""  # e.g. http://minio:9000 for MinIO or a local stand-in; empty for AWS
+    s3_public_endpoint_url: str = ""  # endpoint presigned download URLs point at, when clients reach S3 differently
+    s3_region: str = ""
+    s3_access_key_id: str = ""  # empty uses the default AWS credential chain
+    s3_secret_access_key: str = ""
+    s3_addressing_style: str = "auto"  # path for MinIO and most stand-ins
+    s3_part_size: int = 8388608  # multipart upload part size, at least 5 MiB
+    s3_url_expiry: int = 300  # seconds presigned download URLs stay valid
+    
+    # Extracted text storage
+    text_compression: str = "zlib"  # zlib, zstd (needs the zstandard package)
+    text_segment_chars: int = 16384  # pages longer than this are stored as several sections
     
     # AI Models
     huggingface_cache_dir: str = "./data/models"
+    summarization_model: str = "facebook/bart-large-cnn"
+    inference_backend: str = "pytorch"  # pytorch, quantized (dynamic int8), onnx
+    inference_threads: int = 0  # 0 keeps the library default
     faiss_index_path: str = "./data/faiss_index"
+    faiss_index_factory: str = "Flat"  # FAISS index_factory string, e.g. HNSW32,SQfp16 or IVF4096,PQ32
+    faiss_train_size: int = 100000  # vectors sampled to train IVF/PQ; shards stay flat until they hold this many
+    faiss_nprobe: int = 16  # IVF lists scanned per query
+    faiss_ef_search: int = 64  # HNSW candidate list size per query
+    faiss_shard_by: str = ""  # "", department or year
+    faiss_save_every: int = 10000  # vectors added or removed before an index file is rewritten
+    faiss_mmap: bool = True  # map index files read-only, so worker processes share one copy in the page cache
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    ner_model: str = "dslim/bert-base-NER"  # empty disables statistical NER
+    ner_batch_size: int = 8
+    ner_max_chars: int = 50000
+    chat_model: str = "google/flan-t5-base"
+    chat_context_chars: int = 3000
+    chat_max_new_tokens: int = 256
+    chat_token_timeout: float = 60.0  # seconds without a new token before a streamed answer is abandoned
+    chat_session_ttl: int = 1800  # seconds
+    chat_max_sessions: int = 500
+    classifier_model_path: str = "./data/models/document_classifier.npz"
+    translation_model_template: str = "Helsinki-NLP/opus-mt-{source}-{target}"
+    translation_languages: str = "en,ml"  # languages summaries can be requested in
+    translation_batch_size: int = 16
+    
+    # Concurrency
+    threadpool_size: int = 40  # threads for `def` routes and sync dependencies
+    inference_workers: int = 2  # concurrent model calls (OCR, summarization, chat)
+    invalidation_dir: str = "./data/run/invalidation"  # sockets of processes sharing caches on this host; empty disables
+    loop_monitor_interval_ms: float = 50
+    loop_lag_threshold_ms: float = 100
+    loop_monitor_stack_depth: int = 12
+    
+    # Startup and health
+    health_check_timeout: float = 2.0  # seconds per readiness probe
+    warmup_models: str = ""  # comma-separated: embedding, summarizer, classifier, ner, chat, ocr, graph
+    
+    # Tracing and profiling
+    trace_buffer_size: int = 5000  # spans kept in memory for /api/v1/admin/traces
+    trace_file: str = ""  # JSON lines file to append spans to; empty keeps them in memory only
+    profile_max_seconds: float = 60
+    profile_interval_ms: float = 10
+    
+    # Admission control
+    rate_limit_backend: str = "memory"  # memory, redis (shared through REDIS_URL); empty disables rate limits
+    rate_limits: str = "upload=20/60,summarize=10/60,chat=30/60,translate=30/60,graph_query=60/60"  # name=requests/seconds per user
+    bulkheads: str = "ocr=2:8:30,summarization=2:8:20,graph_query=8:32:10"  # name=concurrency:max_queue:max_wait_seconds
+    
+    # Ingestion: uploads are processed by the request (inline), or left pending for ingest_worker.py processes to lease (queue)
+    ingest_mode: str = "inline"  # inline, queue
+    ingest_lease_seconds: float = 300  # a document is reclaimed when its process stops renewing the lease for this long
+    ingest_heartbeat_seconds: float = 60
+    ingest_max_attempts: int = 3  # claims of one document before it is marked failed
+    ingest_poll_seconds: float = 2  # how often idle ingest workers look for documents
+    ingest_reclaim_seconds: float = 60  # inline mode: how often API workers take over documents with expired leases; 0 disables
+    cache_refresh_seconds: float = 10  # how often caches pick up changes made on other hosts; 0 disables
+    
+    # Document visibility: other roles see their own department's documents, shared ones and those without a department
+    unrestricted_roles: str = "admin"  # comma-separated roles that see every department
+    shared_departments: str = ""  # comma-separated departments whose documents everyone may see
+    
+    # Saved-search subscriptions
+    max_subscriptions_per_user: int = 100
+    outbox_poll_seconds: float = 5  # 0 disables the in-process notification relay
+    outbox_max_attempts: int = 5
+    outbox_webhook_timeout: float = 5.0
+    outbox_claim_seconds: float = 120  # a notification still sending after this long (its relay died) is sent again
+    webhook_allowed_hosts: str = ""  # comma-separated hosts subscriptions may POST to; empty disables webhooks
+    
+    # Type-ahead suggestions
+    suggest_snapshot_path: str = "./data/suggest_index.json"
+    suggest_refresh_seconds: float = 30  # how often documents ingested by other processes are picked up
+    suggest_cache_size: int = 20  # top suggestions cached per prefix; larger limits are computed each time
+    suggest_cached_prefixes: int = 20000
+    
+    # Related documents
+    related_top_k: int = 10
+    
+    # Near-duplicate and version detection; run build_signatures.py --rebuild after changing these
+    shingle_words: int = 3
+    minhash_permutations: int = 128
+    minhash_bands: int = 16  # 8 rows per band: pairs above ~0.7 similarity become candidates
+    near_duplicate_threshold: float = 0.8  # estimated Jaccard similarity that links two versions
     
     # OCR
     tesseract_cmd: str = "tesseract"
@@ -33,17 +136,19 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-# Create data directories
+# Create data directories; called on startup, not at import
 def create_directories():
     dirs = [
         "./data",
         "./data/uploads", 
         "./data/models",
         "./data/neo4j",
-        "./data/redis"
+        "./data/redis",
+        settings.upload_dir,
+        settings.renditions_dir,
+        settings.huggingface_cache_dir
     ]
     for dir_path in dirs:
         os.makedirs(dir_path, exist_ok=True)
 
-settings = Settings()
-create_directories()
\ No newline at end of file
+settings = Settings()
\ No newline at end of file
@@ -1,7 +1,7 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import settings
+from .config import settings, create_directories
 
 # SQLite engine
 engine = create_engine(
@@ -20,6 +20,45 @@ def get_db():
     finally:
         db.close()
 
+# Add columns introduced after a table was first created. create_all only
+# creates missing tables, so existing databases would otherwise lack them.
+def add_missing_columns():
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+# Likewise for indexes added to existing tables
+def create_missing_indexes():
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+# Extracted text moved from documents.extracted_text to compressed segments;
+# rows that still carry it inline need migrate_extracted_text.py
+def check_text_migration():
+    columns = {column["name"] for column in inspect(engine).get_columns("documents")}
+    if "extracted_text" not in columns:
+        return
+    with engine.connect() as connection:
+        pending = connection.execute(
+            text("SELECT 1 FROM documents WHERE extracted_text IS NOT NULL LIMIT 1")
+        ).first()
+    if pending:
+        print("Some documents still store extracted text inline; run migrate_extracted_text.py to move it")
+
 # Initialize database
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    create_directories()
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    create_missing_indexes()
+    check_text_migration()
\ No newline at end of file
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, Optional, TypeVar
+import asyncio
+import contextvars
+import functools
+import threading
+
+from .config import settings
+from .metrics import INFERENCE_IN_FLIGHT
+
+T = TypeVar("T")
+
+# Model inference (OCR, transformers, embeddings) is CPU-bound and holds large
+# buffers, so it gets a small dedicated pool. Blocking I/O (SQLAlchemy, files,
+# Neo4j) runs in plain `def` routes on Starlette's threadpool instead.
+_inference_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+_DONE = object()
+
+def configure_threadpool():
+    """Size the threadpool FastAPI uses for `def` routes and sync dependencies"""
+    import anyio.to_thread
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    global _inference_executor
+    with _lock:
+        if _inference_executor is None:
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=settings.inference_workers,
+                thread_name_prefix="inference"
+            )
+        return _inference_executor
+
+async def run_inference(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking model work off the event loop, bounded by INFERENCE_WORKERS"""
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry context variables over; copy them so
+    # spans opened on the worker belong to the calling request's trace
+    context = contextvars.copy_context()
+    INFERENCE_IN_FLIGHT.inc()
+    try:
+        return await loop.run_in_executor(get_inference_executor(), functools.partial(context.run, func, *args, **kwargs))
+    finally:
+        INFERENCE_IN_FLIGHT.dec()
+
+def current_queue_depth() -> int:
+    """Model calls submitted but not yet picked up by a worker"""
+    executor = _inference_executor
+    return executor._work_queue.qsize() if executor is not None else 0
+
+async def iterate_inference(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Drive a blocking generator (e.g. token streaming) from the inference pool"""
+    while True:
+        item = await run_inference(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+def shutdown_executors():
+    global _inference_executor
+    with _lock:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=False, cancel_futures=True)
+            _inference_executor = None
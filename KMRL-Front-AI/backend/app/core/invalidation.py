@@ -0,0 +1,149 @@
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import socket
+import threading
+
+from .config import settings
+from .metrics import INVALIDATION_MESSAGES
+
+# Larger messages are replaced by {"reset": True}; well under the Unix datagram limit
+MAX_MESSAGE_BYTES = 32768
+
+# Kernel buffer per receiving socket, so bursts wait rather than being dropped
+RECEIVE_BUFFER_BYTES = 1024 * 1024
+
+SOCKET_SUFFIX = ".sock"
+
+Handler = Callable[[Dict], None]
+
+class Invalidation:
+    """Broadcasts cache changes to the other processes on this host.
+
+    Each server process binds a Unix datagram socket in INVALIDATION_DIR,
+    named by its pid, and a thread hands what arrives to the handlers
+    subscribed to the message's topic. publish() sends one datagram to every
+    other socket there, so a worker that indexed a document tells the others
+    to pick it up; scripts publish without receiving. Nothing is queued for
+    processes that are not running: caches load current state when they
+    start. A handler gets {"reset": True} instead of a message too large to
+    send, and must then reload whatever it derives from the topic.
+    """
+
+    _handlers: Dict[str, List[Handler]] = {}
+    _receiver: Optional[socket.socket] = None
+    _sender: Optional[socket.socket] = None
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.invalidation_dir) and hasattr(socket, "AF_UNIX")
+
+    @staticmethod
+    def _path(pid: int) -> str:
+        return os.path.join(os.path.abspath(settings.invalidation_dir), f"{pid}{SOCKET_SUFFIX}")
+
+    @classmethod
+    def subscribe(cls, topic: str, handler: Handler):
+        with cls._lock:
+            cls._handlers.setdefault(topic, []).append(handler)
+
+    @classmethod
+    def start(cls):
+        """Receive messages in this process; called by the app lifespan in each worker"""
+        if not cls.enabled() or cls._thread is not None:
+            return
+        os.makedirs(settings.invalidation_dir, exist_ok=True)
+        path = cls._path(os.getpid())
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            # Left behind by an earlier process with the same pid
+            if os.path.exists(path):
+                os.remove(path)
+            receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+            receiver.bind(path)
+        except OSError as e:
+            receiver.close()
+            print(f"Cache invalidation disabled in this process: {e}")
+            return
+        receiver.settimeout(1.0)
+        cls._receiver = receiver
+        cls._stop.clear()
+        cls._thread = threading.Thread(target=cls._receive, name="invalidation", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        if cls._thread is None:
+            return
+        cls._stop.set()
+        cls._thread.join(timeout=2)
+        cls._thread = None
+        cls.forget(os.getpid())
+        cls._receiver.close()
+        cls._receiver = None
+
+    @classmethod
+    def forget(cls, pid: int):
+        """Remove the socket of a process that has exited"""
+        try:
+            os.remove(cls._path(pid))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def _receive(cls):
+        while not cls._stop.is_set():
+            try:
+                data = cls._receiver.recv(MAX_MESSAGE_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                message = json.loads(data)
+                topic = message.pop("topic")
+            except (ValueError, KeyError):
+                continue
+            INVALIDATION_MESSAGES.labels(topic=topic, outcome="received").inc()
+            for handler in list(cls._handlers.get(topic, [])):
+                try:
+                    handler(message)
+                except Exception as e:
+                    print(f"Cache invalidation handler for {topic} failed: {e}")
+
+    @classmethod
+    def _socket(cls) -> socket.socket:
+        with cls._lock:
+            if cls._sender is None:
+                cls._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                cls._sender.setblocking(False)
+            return cls._sender
+
+    @classmethod
+    def publish(cls, topic: str, message: Optional[Dict] = None):
+        """Send `message` to the handlers of `topic` in every other process"""
+        if not cls.enabled() or not os.path.isdir(settings.invalidation_dir):
+            return
+        data = json.dumps({**(message or {}), "topic": topic}, separators=(",", ":")).encode()
+        if len(data) > MAX_MESSAGE_BYTES:
+            data = json.dumps({"reset": True, "topic": topic}).encode()
+        own = f"{os.getpid()}{SOCKET_SUFFIX}"
+        sender = cls._socket()
+        for entry in os.scandir(settings.invalidation_dir):
+            if not entry.name.endswith(SOCKET_SUFFIX) or entry.name == own:
+                continue
+            try:
+                sender.sendto(data, os.path.abspath(entry.path))
+                INVALIDATION_MESSAGES.labels(topic=topic, outcome="sent").inc()
+            except BlockingIOError:
+                # The receiver has a megabyte of messages queued; it is stuck, not slow
+                INVALIDATION_MESSAGES.labels(topic=topic, outcome="dropped").inc()
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Its process exited without removing it
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
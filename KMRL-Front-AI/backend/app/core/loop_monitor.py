@@ -0,0 +1,129 @@
+from typing import Dict, List, Optional
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+from .config import settings
+from .metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS, multiprocess, sample_gauges
+
+# Under several workers a scrape reaches one of them; each refreshes its sampled gauges this often
+GAUGE_SAMPLE_SECONDS = 1.0
+
+class LoopMonitor:
+    """Detects callbacks that block the event loop.
+
+    A coroutine on the loop records a heartbeat every interval; lag is how late
+    it wakes up. A watchdog thread checks the heartbeat independently, so while
+    the loop is still blocked it can capture the stack of the offending callback.
+    """
+
+    _task: Optional[asyncio.Task] = None
+    _watchdog: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _loop_thread_id: Optional[int] = None
+    _heartbeat = 0.0
+
+    # Exported counters; read with snapshot()
+    _stats: Dict = {
+        "checks": 0,
+        "blocked_count": 0,
+        "max_lag_ms": 0.0,
+        "last_lag_ms": 0.0,
+        "total_blocked_ms": 0.0,
+    }
+    _recent: List[Dict] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def start(cls):
+        if cls._task is not None:
+            return
+        cls._loop_thread_id = threading.get_ident()
+        cls._heartbeat = time.monotonic()
+        cls._stop.clear()
+        cls._task = asyncio.get_running_loop().create_task(cls._tick())
+        cls._watchdog = threading.Thread(target=cls._watch, name="loop-watchdog", daemon=True)
+        cls._watchdog.start()
+
+    @classmethod
+    async def stop(cls):
+        cls._stop.set()
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+        cls._watchdog = None
+
+    @classmethod
+    async def _tick(cls):
+        interval = settings.loop_monitor_interval_ms / 1000
+        threshold = settings.loop_lag_threshold_ms
+        sample = multiprocess()
+        sampled_at = 0.0
+        while True:
+            expected = time.monotonic() + interval
+            cls._heartbeat = time.monotonic()
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (time.monotonic() - expected) * 1000)
+            EVENT_LOOP_LAG.observe(lag_ms / 1000)
+            with cls._lock:
+                cls._stats["checks"] += 1
+                cls._stats["last_lag_ms"] = round(lag_ms, 1)
+                cls._stats["max_lag_ms"] = max(cls._stats["max_lag_ms"], round(lag_ms, 1))
+                if lag_ms > threshold:
+                    cls._stats["blocked_count"] += 1
+                    cls._stats["total_blocked_ms"] = round(cls._stats["total_blocked_ms"] + lag_ms, 1)
+            if sample and time.monotonic() - sampled_at >= GAUGE_SAMPLE_SECONDS:
+                sampled_at = time.monotonic()
+                sample_gauges()
+            if lag_ms > threshold:
+                print(f"Event loop blocked for {lag_ms:.0f} ms (threshold {threshold} ms)")
+
+    @classmethod
+    def _watch(cls):
+        """Capture the loop thread's stack while it is blocked past the threshold"""
+        threshold = settings.loop_lag_threshold_ms / 1000
+        interval = settings.loop_monitor_interval_ms / 1000
+        reported_heartbeat = None
+        while not cls._stop.wait(threshold / 2):
+            heartbeat = cls._heartbeat
+            stalled = time.monotonic() - heartbeat - interval
+            if stalled <= threshold or heartbeat == reported_heartbeat:
+                continue
+            # Report each stall once, from inside it
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(cls._loop_thread_id)
+            if frame is None or frame.f_code.co_filename == __file__:
+                # Already back in the heartbeat: the stall ended before we looked
+                continue
+            # Parked in the selector means no callback is running: the loop thread
+            # is waiting for the GIL held by CPU-bound work in another thread
+            cause = "gil_contention" if frame.f_code.co_filename.endswith("selectors.py") else "blocking_callback"
+            stack = traceback.format_stack(frame)[-settings.loop_monitor_stack_depth:]
+            EVENT_LOOP_STALLS.labels(cause=cause).inc()
+            with cls._lock:
+                cls._recent.append({
+                    "at": time.time(),
+                    "stalled_ms": round(stalled * 1000, 1),
+                    "cause": cause,
+                    "stack": [line.strip() for line in stack] if cause == "blocking_callback" else []
+                })
+                del cls._recent[:-20]
+            if cause == "blocking_callback":
+                print(f"Event loop stalled {stalled * 1000:.0f} ms in:\n{''.join(stack)}")
+            else:
+                print(f"Event loop stalled {stalled * 1000:.0f} ms waiting for the GIL")
+
+    @classmethod
+    def snapshot(cls) -> Dict:
+        with cls._lock:
+            return {
+                **cls._stats,
+                "threshold_ms": settings.loop_lag_threshold_ms,
+                "recent_stalls": list(cls._recent),
+            }
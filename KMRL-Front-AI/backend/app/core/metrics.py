@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from typing import Optional
+import os
+import time
+
+from .tracing import span
+
+# Buckets span fast DB reads up to multi-second model calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled", ["method"], multiprocess_mode="livesum")
+
+STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duration of processing stages (OCR, models, indexing, graph)",
+    ["stage", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+MODEL_LOAD_SECONDS = Gauge("model_load_seconds", "Time taken by the last load of each model", ["model"], multiprocess_mode="livemax")
+MODEL_LOADED = Gauge("model_loaded", "1 when the model is loaded in this process (in every worker)", ["model"], multiprocess_mode="livemin")
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+
+INFERENCE_IN_FLIGHT = Gauge("inference_in_flight", "Model calls submitted to the inference pool and not yet finished", multiprocess_mode="livesum")
+INFERENCE_QUEUE_DEPTH = Gauge("inference_queue_depth", "Model calls waiting for an inference worker", multiprocess_mode="livesum")
+THREADPOOL_IN_USE = Gauge("threadpool_in_use", "Threadpool tokens held by def routes and sync dependencies", multiprocess_mode="livesum")
+THREADPOOL_WAITING = Gauge("threadpool_waiting", "Tasks waiting for a threadpool token", multiprocess_mode="livesum")
+
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Database connections currently checked out", multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_size", "Database connection pool size", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Database connections opened beyond the pool size", multiprocess_mode="livesum")
+
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests rejected by rate limits and bulkheads", ["kind", "name"])
+BULKHEAD_ACTIVE = Gauge("bulkhead_active", "Slots in use per bulkhead", ["name"], multiprocess_mode="livesum")
+BULKHEAD_WAITING = Gauge("bulkhead_waiting", "Requests queued for a bulkhead slot", ["name"], multiprocess_mode="livesum")
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop heartbeat woke up",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+EVENT_LOOP_STALLS = Counter("event_loop_stalls_total", "Event loop stalls beyond the threshold", ["cause"])
+
+INVALIDATION_MESSAGES = Counter("invalidation_messages_total", "Cache invalidation messages between processes", ["topic", "outcome"])
+
+INGEST_CLAIMS = Counter("ingest_claims_total", "Ingestion queue claims and leases by outcome", ["outcome"])
+
+@contextmanager
+def track_stage(stage: str):
+    """Record the duration and outcome of a processing stage, as a metric and a span"""
+    started = time.perf_counter()
+    outcome = "success"
+    try:
+        with span(stage):
+            yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        STAGE_DURATION.labels(stage=stage, outcome=outcome).observe(time.perf_counter() - started)
+
+def record_model_load(model: str, started: float, loaded: bool):
+    MODEL_LOAD_SECONDS.labels(model=model).set(time.perf_counter() - started)
+    MODEL_LOADED.labels(model=model).set(1 if loaded else 0)
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        CACHE_REQUESTS.labels(cache=cache, result="hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache=cache, result="miss").inc(misses)
+
+def multiprocess() -> bool:
+    """Whether worker processes share metrics through PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py)"""
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+def sample_gauges():
+    """Gauges read from live objects at scrape time, and every second per worker in multiprocess mode"""
+    from .database import engine
+    from .executors import current_queue_depth
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    if hasattr(pool, "size"):
+        DB_POOL_SIZE.set(pool.size())
+    if hasattr(pool, "overflow"):
+        DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+
+    INFERENCE_QUEUE_DEPTH.set(current_queue_depth())
+    try:
+        import anyio.to_thread
+
+        statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+        THREADPOOL_IN_USE.set(statistics.borrowed_tokens)
+        THREADPOOL_WAITING.set(statistics.tasks_waiting)
+    except Exception:
+        # Only available from inside the event loop
+        pass
+
+def render_metrics():
+    sample_gauges()
+    if multiprocess():
+        from prometheus_client import CollectorRegistry, multiprocess as prometheus_multiprocess
+
+        # Every worker's values, summed or labelled by pid as each metric's mode says
+        registry = CollectorRegistry()
+        prometheus_multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = getattr(route, "path", "unmatched")
+    # Recent FastAPI versions dispatch included routers without copying their
+    # routes, so the include prefix is only on the include context
+    included = (scope.get("fastapi") or {}).get("included_router")
+    prefix = getattr(getattr(included, "include_context", None), "prefix", "") or ""
+    return prefix + path if not path.startswith(prefix) else path
+
+class MetricsMiddleware:
+    """Per-route request latency, labelled by route template to bound cardinality"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.labels(method=method).inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            status = 500
+            raise
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method=method).dec()
+            REQUEST_LATENCY.labels(
+                method=method,
+                route=route_template(scope),
+                status=str(status or 500)
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,74 @@
+from typing import List
+import gc
+import glob
+import os
+
+from .config import settings
+from .invalidation import Invalidation
+
+# Hold sockets or threads that do not survive fork(); each worker opens its own
+FORK_UNSAFE_MODELS = {"graph"}
+
+def preload_models() -> List[str]:
+    """WARMUP_MODELS that are safe to load before forking"""
+    names = [name.strip() for name in settings.warmup_models.split(",") if name.strip()]
+    return [name for name in names if name not in FORK_UNSAFE_MODELS]
+
+def preload():
+    """Load models and indexes in the server master, before it forks the workers.
+
+    Workers then share these pages with the master copy-on-write: model
+    weights and mapped vector bases are only read, so each worker adds little
+    more than its own request state. Nothing here may start a thread, which
+    would not exist in the workers.
+    """
+    from ..services.entity_service import EntityService
+    from ..services.model_registry import ModelRegistry
+    from ..services.suggest_service import SuggestIndex
+    from ..services.vector_store import VectorIndex
+    from .database import SessionLocal, engine, init_db
+
+    # Allocating millions of objects would otherwise trigger full collections midway
+    gc.disable()
+    try:
+        ModelRegistry.warm_up(preload_models())
+        init_db()
+        db = SessionLocal()
+        try:
+            SuggestIndex.load(db)
+        finally:
+            db.close()
+        EntityService()  # builds the gazetteer matcher
+        vectors = VectorIndex.preload()
+        # Pooled SQLite connections must not be shared with the workers
+        engine.dispose()
+    finally:
+        # Moved out of the collector's generations, so a collection in a worker
+        # does not write to (and so copy) every page holding a preloaded object
+        gc.freeze()
+        gc.enable()
+    print(f"Preloaded for workers: models {ModelRegistry.status()}, {vectors} vectors")
+
+def after_fork():
+    """Run in each worker as it starts"""
+    from .database import engine
+
+    # Connections inherited from the master belong to it; drop them without closing
+    engine.dispose(close=False)
+
+def clear_metrics():
+    """Remove metric files left by an earlier run of the server; before any worker starts"""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(glob.escape(directory), "*.db")):
+        os.remove(path)
+
+def worker_exited(pid: int):
+    """Forget a worker's live gauges and its invalidation socket"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+    Invalidation.forget(pid)
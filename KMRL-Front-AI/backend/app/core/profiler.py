@@ -0,0 +1,78 @@
+from collections import Counter
+from typing import Dict, Optional
+import os
+import sys
+import threading
+import time
+
+# Leaf frames of threads parked waiting for work; excluded unless asked for
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being taken in this process"""
+
+class SamplingProfiler:
+    """Samples the stacks of every thread in the worker at a fixed interval.
+
+    The result is in collapsed-stack format (one `frame;frame;frame count`
+    line per distinct stack), which flamegraph.pl, speedscope and inferno
+    render directly. Only one profile runs at a time per process.
+    """
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    @classmethod
+    def _stack(cls, frame) -> list:
+        stack = []
+        while frame is not None:
+            stack.append(cls._frame_name(frame))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    @classmethod
+    def run(cls, seconds: float, interval_ms: float, include_idle: bool = False) -> Dict:
+        if not cls._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            own_thread = threading.get_ident()
+            interval = interval_ms / 1000
+            stacks: Counter = Counter()
+            samples = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+                    if not include_idle and leaf in IDLE_FRAMES:
+                        continue
+                    thread_name = names.get(thread_id, str(thread_id))
+                    stacks[";".join([thread_name] + cls._stack(frame))] += 1
+                samples += 1
+                time.sleep(interval)
+            return {
+                "samples": samples,
+                "duration_s": round(time.perf_counter() - started, 3),
+                "interval_ms": interval_ms,
+                "stacks": stacks,
+            }
+        finally:
+            cls._lock.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter, limit: Optional[int] = None) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common(limit)) + "\n"
@@ -0,0 +1,263 @@
+from contextlib import asynccontextmanager
+from fastapi import Depends, HTTPException
+from fastapi.responses import JSONResponse
+from typing import Dict, Optional, Tuple
+import asyncio
+import math
+import threading
+import time
+
+from .config import settings
+from .metrics import ADMISSION_REJECTED, BULKHEAD_ACTIVE, BULKHEAD_WAITING
+
+# Atomic token bucket; Redis time keeps buckets consistent across workers
+REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or capacity
+local at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[int, float]]:
+    """"upload=20/60,summarize=10/60" -> {name: (requests, seconds)}"""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, spec = item.split("=")
+        requests, seconds = spec.split("/")
+        limits[name.strip()] = (int(requests), float(seconds))
+    return limits
+
+def parse_bulkheads(value: str) -> Dict[str, Tuple[int, int, float]]:
+    """"ocr=2:8:30" -> {name: (concurrency, max_queue, max_wait_seconds)}"""
+    bulkheads = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, spec = item.split("=")
+        concurrency, max_queue, max_wait = spec.split(":")
+        bulkheads[name.strip()] = (int(concurrency), int(max_queue), float(max_wait))
+    return bulkheads
+
+# Routes with large bodies, limited by RateLimitMiddleware before the body is read
+BODY_RATE_LIMITS = {("POST", "/api/v1/documents/upload"): "upload"}
+
+def _retry_after(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+class RateLimiter:
+    """Token buckets per (limit name, user); in process, or shared through Redis"""
+
+    _limits: Optional[Dict[str, Tuple[int, float]]] = None
+    _buckets: Dict[str, Tuple[float, float]] = {}
+    _lock = threading.Lock()
+    _redis = None
+    _script = None
+
+    @classmethod
+    def limits(cls) -> Dict[str, Tuple[int, float]]:
+        if cls._limits is None:
+            cls._limits = parse_rate_limits(settings.rate_limits)
+        return cls._limits
+
+    @classmethod
+    def _take_local(cls, key: str, capacity: int, rate: float) -> float:
+        now = time.monotonic()
+        with cls._lock:
+            tokens, at = cls._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - at) * rate)
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            cls._buckets[key] = (tokens, now)
+            if len(cls._buckets) > 10000:
+                # Buckets idle long enough to be full again carry no state
+                cls._buckets = {
+                    bucket: state for bucket, state in cls._buckets.items()
+                    if state[0] + (now - state[1]) * rate < capacity
+                }
+        return retry_after
+
+    @classmethod
+    async def _take_redis(cls, key: str, capacity: int, rate: float) -> float:
+        if cls._redis is None:
+            import redis.asyncio
+
+            cls._redis = redis.asyncio.from_url(settings.redis_url)
+            cls._script = cls._redis.register_script(REDIS_TOKEN_BUCKET)
+        return float(await cls._script(keys=[key], args=[capacity, rate]))
+
+    @classmethod
+    async def check(cls, name: str, subject: str):
+        """Take a token or raise 429 with the time until the next one"""
+        if name not in cls.limits() or not settings.rate_limit_backend:
+            return
+        requests, seconds = cls.limits()[name]
+        key = f"ratelimit:{name}:{subject}"
+        rate = requests / seconds
+        if settings.rate_limit_backend == "redis":
+            try:
+                retry_after = await cls._take_redis(key, requests, rate)
+            except Exception as e:
+                # Fail open to the local buckets rather than rejecting everyone
+                print(f"Rate limiter Redis error, using local buckets: {e}")
+                retry_after = cls._take_local(key, requests, rate)
+        else:
+            retry_after = cls._take_local(key, requests, rate)
+
+        if retry_after > 0:
+            ADMISSION_REJECTED.labels(kind="rate_limit", name=name).inc()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit for {name} exceeded ({requests} requests per {seconds:g}s)",
+                headers=_retry_after(retry_after)
+            )
+
+    @classmethod
+    async def close(cls):
+        if cls._redis is not None:
+            await cls._redis.aclose()
+            cls._redis = None
+
+def rate_limit(name: str):
+    """Route dependency: one token from the user's bucket for `name`"""
+    from ..api.auth import get_current_user
+
+    async def dependency(current_user=Depends(get_current_user)):
+        await RateLimiter.check(name, str(current_user.id))
+    return dependency
+
+class RateLimitMiddleware:
+    """Applies the limits of BODY_RATE_LIMITS before the request body is read.
+
+    FastAPI parses the whole multipart body before a route's dependencies run,
+    so a rate-limited upload would otherwise be received and spooled in full
+    only to get its 429. Requests without a valid token are left for the
+    route to refuse.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _subject(scope) -> Optional[str]:
+        from .security import verify_token
+
+        for header, value in scope["headers"]:
+            if header == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    return verify_token(token.strip())
+                except HTTPException:
+                    return None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        name = BODY_RATE_LIMITS.get((scope["method"], scope["path"])) if scope["type"] == "http" else None
+        subject = self._subject(scope) if name is not None else None
+        if subject is not None:
+            try:
+                await RateLimiter.check(name, subject)
+            except HTTPException as e:
+                response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class Bulkhead:
+    """Bounds concurrent work of one class (OCR, summarization, graph queries).
+
+    Callers beyond the concurrency limit queue for at most `max_wait` seconds;
+    when the queue is full they are rejected at once, so overload turns into
+    fast 503s instead of an ever-growing backlog on the worker pools.
+    """
+
+    _registry: Dict[str, "Bulkhead"] = {}
+
+    def __init__(self, name: str, concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        # Moving average of how long a slot is held, for Retry-After
+        self.average_hold = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    @classmethod
+    def get(cls, name: str) -> Optional["Bulkhead"]:
+        if name not in cls._registry:
+            config = parse_bulkheads(settings.bulkheads).get(name)
+            if config is None:
+                return None
+            cls._registry[name] = cls(name, *config)
+        return cls._registry[name]
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.labels(kind="bulkhead", name=self.name).inc()
+        estimate = self.average_hold * (self.waiting + 1) / self.concurrency
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many concurrent {self.name} requests: {reason}",
+            headers=_retry_after(min(estimate, self.max_wait))
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Semaphores belong to one event loop
+            self._semaphore, self._loop = asyncio.Semaphore(self.concurrency), loop
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self._reject("queue is full")
+
+        self.waiting += 1
+        BULKHEAD_WAITING.labels(name=self.name).inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self._reject(f"no slot within {self.max_wait:g}s")
+        finally:
+            self.waiting -= 1
+            BULKHEAD_WAITING.labels(name=self.name).dec()
+
+        self.active += 1
+        BULKHEAD_ACTIVE.labels(name=self.name).inc()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.average_hold = 0.8 * self.average_hold + 0.2 * (time.perf_counter() - started)
+            self.active -= 1
+            BULKHEAD_ACTIVE.labels(name=self.name).dec()
+            self._semaphore.release()
+
+@asynccontextmanager
+async def bulkhead(name: str):
+    """Hold a slot of the named bulkhead; unconfigured names are unbounded"""
+    guard = Bulkhead.get(name)
+    if guard is None:
+        yield
+        return
+    async with guard.slot():
+        yield
@@ -0,0 +1,24 @@
+from typing import Dict, List, Tuple
+import time
+
+# Import this module first in the entry point; everything after counts toward startup
+_started = time.perf_counter()
+
+class StartupProfiler:
+    """Wall-clock time of each startup phase, reported by /health/ready"""
+
+    _phases: List[Tuple[str, float]] = []
+    _last = _started
+
+    @classmethod
+    def mark(cls, phase: str):
+        now = time.perf_counter()
+        cls._phases.append((phase, round((now - cls._last) * 1000, 1)))
+        cls._last = now
+
+    @classmethod
+    def report(cls) -> Dict:
+        return {
+            "phases_ms": dict(cls._phases),
+            "total_ms": round((cls._last - _started) * 1000, 1),
+        }
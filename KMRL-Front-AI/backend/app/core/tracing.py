@@ -0,0 +1,159 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+from .config import settings
+
+# The request id is the trace id. Context variables follow the request into
+# the threadpool and, through run_inference, into the inference pool.
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_span_id: ContextVar[Optional[str]] = ContextVar("span_id", default=None)
+
+_spans: deque = deque(maxlen=settings.trace_buffer_size)
+_lock = threading.Lock()
+_file = None
+
+REQUEST_ID_HEADER = "x-request-id"
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def _export(span: Dict):
+    """Keep the span in memory and, when TRACE_FILE is set, append it as JSON"""
+    global _file
+    with _lock:
+        _spans.append(span)
+        if not settings.trace_file:
+            return
+        try:
+            if _file is None:
+                directory = os.path.dirname(settings.trace_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                _file = open(settings.trace_file, "a", encoding="utf-8")
+            _file.write(json.dumps(span, default=str) + "\n")
+            _file.flush()
+        except OSError as e:
+            print(f"Trace export error: {e}")
+
+def close_exporter():
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+
+@contextmanager
+def span(name: str, **attributes):
+    """Record a timed span, nested under the current one in the current trace.
+
+    Spans opened outside a request (scripts, warm-up) start their own trace.
+    """
+    trace_id = _trace_id.get()
+    trace_token = None
+    if trace_id is None:
+        trace_id = new_id()
+        trace_token = _trace_id.set(trace_id)
+    span_id = new_id()
+    parent_id = _span_id.get()
+    span_token = _span_id.set(span_id)
+
+    record = {
+        "trace_id": trace_id,
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "name": name,
+        "start": time.time(),
+        "thread": threading.current_thread().name,
+        "attributes": attributes,
+    }
+    started = time.perf_counter()
+    try:
+        yield record["attributes"]
+        record["status"] = "ok"
+    except BaseException as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        _span_id.reset(span_token)
+        if trace_token is not None:
+            _trace_id.reset(trace_token)
+        _export(record)
+
+def traced(name: str):
+    """Decorator form of span() for service methods"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def recent_traces(limit: int = 50) -> List[Dict]:
+    """Most recent traces, newest first, summarized by their root span"""
+    with _lock:
+        spans = list(_spans)
+    traces: Dict[str, Dict] = {}
+    for record in spans:
+        trace = traces.setdefault(record["trace_id"], {"trace_id": record["trace_id"], "span_count": 0})
+        trace["span_count"] += 1
+        if record["parent_id"] is None:
+            trace.update(
+                name=record["name"],
+                start=record["start"],
+                duration_ms=record["duration_ms"],
+                status=record["status"]
+            )
+    ordered = sorted(traces.values(), key=lambda trace: trace.get("start", 0), reverse=True)
+    return ordered[:limit]
+
+def get_trace(trace_id: str) -> List[Dict]:
+    """Spans of one trace in start order"""
+    with _lock:
+        spans = [record for record in _spans if record["trace_id"] == trace_id]
+    return sorted(spans, key=lambda record: record["start"])
+
+class TracingMiddleware:
+    """Opens the root span of each request and echoes its id as X-Request-ID"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from .metrics import route_template
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")[:64] or new_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.encode(), request_id.encode("latin-1"))]
+                attributes["status"] = message["status"]
+            await send(message)
+
+        token = _trace_id.set(request_id)
+        try:
+            with span(f"{scope['method']} {scope['path']}", method=scope["method"]) as attributes:
+                await self.app(scope, receive, send_wrapper)
+                # The route is only known once routing has run
+                attributes["route"] = route_template(scope)
+        finally:
+            _trace_id.reset(token)
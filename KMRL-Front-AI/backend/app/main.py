@@ -1,20 +1,94 @@
+from .core.startup_profiler import StartupProfiler
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import os
+import asyncio
 
 from .core.config import settings
-from .core.database import init_db
-from .api import auth, documents, ai, graph
+from .core.database import SessionLocal, engine, init_db
+from .core.executors import configure_threadpool, run_inference, shutdown_executors
+from .core.invalidation import Invalidation
+from .core.loop_monitor import LoopMonitor
+from .core.metrics import MetricsMiddleware
+from .core.rate_limit import RateLimiter, RateLimitMiddleware
+from .core.tracing import TracingMiddleware, close_exporter
+from .services.graph_service import GraphService
+from .services.ingest_queue import IngestQueue
+from .services.model_registry import ModelRegistry
+from .services.subscription_service import NotificationRelay
+from .services.suggest_service import SuggestIndex
+from .services.vector_store import VectorIndex
+from .api import auth, documents, ai, graph, health, admin, stats, subscriptions
 
-# Initialize database
-init_db()
+StartupProfiler.mark("imports")
+
+def load_suggestions():
+    db = SessionLocal()
+    try:
+        SuggestIndex.load(db)
+    finally:
+        db.close()
+
+async def warm_up(app: FastAPI, names):
+    """Load models in the background; readiness reports ready once they are done"""
+    await run_inference(ModelRegistry.warm_up, names)
+    StartupProfiler.mark("warm_up")
+    app.state.ready = True
+    print(f"Warm-up finished: {ModelRegistry.status()}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: the app owns the database, worker pools, models and graph driver
+    app.state.ready = False
+    await run_in_threadpool(init_db)
+    StartupProfiler.mark("database")
+    
+    # Before loading caches, so changes other workers make meanwhile are not missed
+    Invalidation.start()
+    
+    # From the snapshot, so only documents added since it was written are read
+    await run_in_threadpool(load_suggestions)
+    StartupProfiler.mark("suggestions")
+    
+    configure_threadpool()
+    LoopMonitor.start()
+    NotificationRelay.start()
+    IngestQueue.start()
+    StartupProfiler.mark("executors")
+    
+    warmup_models = [name.strip() for name in settings.warmup_models.split(",") if name.strip()]
+    warmup_task = None
+    if warmup_models:
+        warmup_task = asyncio.create_task(warm_up(app, warmup_models))
+    else:
+        # Models load on first use
+        app.state.ready = True
+    print(f"Startup complete: {StartupProfiler.report()}")
+    
+    yield
+    
+    # Shutdown
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await LoopMonitor.stop()
+    await NotificationRelay.stop()
+    await IngestQueue.stop()
+    await run_in_threadpool(SuggestIndex.save)
+    await run_in_threadpool(VectorIndex.save)
+    Invalidation.stop()
+    await RateLimiter.close()
+    shutdown_executors()
+    GraphService.close_driver()
+    engine.dispose()
+    close_exporter()
 
 # Create FastAPI app
 app = FastAPI(
     title="KMRL DocHub API",
     description="Intelligent Document Management Platform for Kochi Metro Rail Limited",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,15 +100,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-if os.path.exists(settings.upload_dir):
-    app.mount("/uploads", StaticFiles(directory=settings.upload_dir), name="uploads")
+# Upload rate limits, checked before the body is read
+app.add_middleware(RateLimitMiddleware)
+
+# Request latency per route template
+app.add_middleware(MetricsMiddleware)
+
+# Root span and X-Request-ID per request; added last so it wraps everything
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
 app.include_router(documents.router, prefix="/api/v1/documents", tags=["documents"])
 app.include_router(ai.router, prefix="/api/v1/ai", tags=["ai"])
 app.include_router(graph.router, prefix="/api/v1/graph", tags=["knowledge-graph"])
+app.include_router(subscriptions.router, prefix="/api/v1/subscriptions", tags=["subscriptions"])
+app.include_router(stats.router, prefix="/api/v1/stats", tags=["stats"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(health.router, tags=["health"])
 
 @app.get("/")
 async def root():
@@ -44,18 +127,6 @@ async def root():
         "status": "operational"
     }
 
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "services": {
-            "ocr": "available",
-            "ai": "available",
-            "search": "available"
-        }
-    }
-
 @app.get("/test")
 async def test_endpoint():
     print("TEST ENDPOINT CALLED!")
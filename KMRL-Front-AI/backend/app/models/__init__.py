@@ -1,4 +1,11 @@
 from .user import User
-from .document import Document, DocumentSummary
+from .document import Document, DocumentTextSegment, DocumentSummary, SummaryCache
+from .related import DocumentFeatures, RelatedDocument
+from .entity import DocumentEntity
+from .search import DocumentChunk
+from .dedup import DocumentSignature, LSHBucket
+from .subscription import Subscription, Notification
+from .stats import DocumentStat, DocumentStatTotal
+from .translation import TranslationSegment
 
-__all__ = ["User", "Document", "DocumentSummary"]
\ No newline at end of file
+__all__ = ["User", "Document", "DocumentTextSegment", "DocumentSummary", "SummaryCache", "DocumentFeatures", "RelatedDocument", "DocumentEntity", "DocumentChunk", "DocumentSignature", "LSHBucket", "Subscription", "Notification", "DocumentStat", "DocumentStatTotal", "TranslationSegment"]
\ No newline at end of file
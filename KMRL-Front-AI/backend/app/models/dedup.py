@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, LargeBinary, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class DocumentSignature(Base):
+    """MinHash signature of a document's word shingles"""
+    __tablename__ = "document_signatures"
+    
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    minhash = Column(LargeBinary, nullable=False)  # uint32 per permutation
+    shingle_count = Column(Integer, nullable=False)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class LSHBucket(Base):
+    """One band of a signature; documents sharing a bucket are near-duplicate candidates"""
+    __tablename__ = "lsh_buckets"
+    
+    id = Column(Integer, primary_key=True)
+    band = Column(Integer, nullable=False)
+    bucket = Column(BigInteger, nullable=False)  # 64-bit hash of the band's rows
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    
+    __table_args__ = (
+        Index("ix_lsh_buckets_band_bucket", "band", "bucket"),
+        Index("ix_lsh_buckets_document", "document_id"),
+    )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import object_session, relationship
+from typing import Optional
 from ..core.database import Base
 
 class Document(Base):
@@ -12,9 +13,10 @@ class Document(Base):
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the file; the download ETag
     
-    # Content
-    extracted_text = Column(Text, nullable=True)
+    # Content; the text itself lives compressed in document_text_segments
+    text_length = Column(Integer, nullable=True)  # characters of extracted text; null until extracted
     language = Column(String, default="en")
     
     # Metadata
@@ -22,11 +24,25 @@ class Document(Base):
     document_type = Column(String, nullable=True)  # safety, compliance, operational, financial
     priority = Column(String, default="medium")  # low, medium, high, critical
     department = Column(String, nullable=True)
+    classification_source = Column(String, nullable=True)  # user, model; of document_type
+    priority_source = Column(String, nullable=True)  # user, model
+    type_confidence = Column(Float, nullable=True)
+    priority_confidence = Column(Float, nullable=True)
+    
+    # Near-duplicate versions; the group is the id of the oldest document in the chain
+    version_group_id = Column(Integer, nullable=True, index=True)
+    previous_version_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    version_similarity = Column(Float, nullable=True)  # estimated Jaccard similarity to the previous version
     
     # Processing status
     processing_status = Column(String, default="pending")  # pending, processing, completed, failed
     ocr_confidence = Column(Float, nullable=True)
     
+    # Lease on a document being processed (see services.ingest_queue); expired leases are reclaimed
+    lease_owner = Column(String, nullable=True)  # host:pid of the process holding it
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    processing_attempts = Column(Integer, nullable=True, default=0)
+    
     # Relationships
     uploaded_by = Column(Integer, ForeignKey("users.id"))
     uploader = relationship("User")
@@ -34,6 +50,55 @@ class Document(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        # Claims scan pending documents and expired leases
+        Index("ix_documents_queue", "processing_status", "lease_expires_at"),
+    )
+    
+    @property
+    def extracted_text(self) -> Optional[str]:
+        """The full extracted text, decompressed on first access and kept for the instance"""
+        if self.text_length is None:
+            return None
+        cached = getattr(self, "_extracted_text", None)
+        if cached is None:
+            from ..services.text_store import TextStore
+            
+            session = object_session(self)
+            if session is None:
+                raise RuntimeError(f"Document {self.id} is detached; its text cannot be loaded")
+            cached = TextStore(session).read(self.id) or ""
+            self._extracted_text = cached
+        return cached
+    
+    @extracted_text.setter
+    def extracted_text(self, value: Optional[str]):
+        from ..services.text_store import TextStore
+        
+        session = object_session(self)
+        if session is None or self.id is None:
+            raise RuntimeError("Text can only be stored for a document that has been flushed")
+        self.text_length = TextStore(session).write(self.id, value)
+        self._extracted_text = value
+
+class DocumentTextSegment(Base):
+    """A compressed page, or section of a long page, of a document's extracted text"""
+    __tablename__ = "document_text_segments"
+    
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    segment_index = Column(Integer, nullable=False)
+    page = Column(Integer, nullable=False)
+    char_start = Column(Integer, nullable=False)  # offset in the full text, form feeds included
+    char_length = Column(Integer, nullable=False)
+    codec = Column(String(8), nullable=False)  # zlib, zstd
+    data = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("document_id", "segment_index", name="uq_document_text_segments_position"),
+        Index("ix_document_text_segments_page", "document_id", "page"),
+    )
 
 class DocumentSummary(Base):
     __tablename__ = "document_summaries"
@@ -45,7 +110,35 @@ class DocumentSummary(Base):
     language = Column(String, default="en")
     confidence_score = Column(Float, nullable=True)
     
+    # What the summary was generated from; a mismatch with the current text or model means stale
+    text_hash = Column(String, nullable=True)
+    model_id = Column(String, nullable=True)
+    params_hash = Column(String, nullable=True)
+    
     # Relationship
     document = relationship("Document")
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_document_summaries_variant", "document_id", "summary_type", "language"),
+    )
+
+class SummaryCache(Base):
+    """Summaries shared across documents, keyed by input text and generation settings"""
+    __tablename__ = "summary_cache"
+    
+    id = Column(Integer, primary_key=True)
+    text_hash = Column(String, nullable=False)
+    model_id = Column(String, nullable=False)
+    params_hash = Column(String, nullable=False)
+    summary_text = Column(Text, nullable=False)
+    confidence_score = Column(Float, nullable=True)
+    hits = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("text_hash", "model_id", "params_hash", name="uq_summary_cache_key"),
+    )
\ No newline at end of file
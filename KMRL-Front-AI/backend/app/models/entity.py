@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from ..core.database import Base
+
+class DocumentEntity(Base):
+    """An entity mention found in a document's extracted text"""
+    __tablename__ = "document_entities"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    label = Column(String, nullable=False)  # STATION, ROLLING_STOCK, EQUIPMENT, EQUIPMENT_CODE, ORG, LOC, PER, MISC
+    text = Column(String, nullable=False)  # surface form as it appears in the text
+    normalized = Column(String, nullable=False)  # canonical, lowercased form used for lookups
+    start = Column(Integer, nullable=False)
+    end = Column(Integer, nullable=False)
+    source = Column(String, nullable=False)  # gazetteer, pattern, ner
+
+    __table_args__ = (
+        # "All documents mentioning station X" is a single index range scan
+        Index("ix_document_entities_lookup", "label", "normalized", "document_id"),
+        Index("ix_document_entities_document", "document_id"),
+    )
\ No newline at end of file
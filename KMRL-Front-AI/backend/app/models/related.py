@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, LargeBinary, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class DocumentFeatures(Base):
+    """Per-document signals used to precompute related documents"""
+    __tablename__ = "document_features"
+    
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    embedding = Column(LargeBinary, nullable=True)  # float32, L2-normalized
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class RelatedDocument(Base):
+    """Precomputed top-K related documents, one row per (document, neighbor)"""
+    __tablename__ = "related_documents"
+    
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    related_document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    sources = Column(String, nullable=True)  # comma-separated: graph, embedding, entities
+    
+    __table_args__ = (
+        Index("ix_related_documents_document_rank", "document_id", "rank"),
+        Index("ix_related_documents_related", "related_document_id"),
+    )
\ No newline at end of file
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, Text, ForeignKey, Index, DDL, event
+from ..core.database import Base
+
+class DocumentChunk(Base):
+    """A retrievable passage of a document's extracted text"""
+    __tablename__ = "document_chunks"
+
+    id = Column(Integer, primary_key=True)  # also the vector id in the FAISS index
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    page = Column(Integer, nullable=False, default=1)
+    chunk_index = Column(Integer, nullable=False)
+    char_start = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_document_chunks_document", "document_id", "chunk_index"),
+    )
+
+# Lexical index over chunk text, kept in sync by triggers (SQLite FTS5)
+event.listen(
+    DocumentChunk.__table__,
+    "after_create",
+    DDL("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS document_chunks_fts
+        USING fts5(text, content='document_chunks', content_rowid='id', tokenize='porter unicode61')
+    """).execute_if(dialect="sqlite")
+)
+event.listen(
+    DocumentChunk.__table__,
+    "after_create",
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS document_chunks_ai AFTER INSERT ON document_chunks BEGIN
+            INSERT INTO document_chunks_fts(rowid, text) VALUES (new.id, new.text);
+        END
+    """).execute_if(dialect="sqlite")
+)
+event.listen(
+    DocumentChunk.__table__,
+    "after_create",
+    DDL("""
+        CREATE TRIGGER IF NOT EXISTS document_chunks_ad AFTER DELETE ON document_chunks BEGIN
+            INSERT INTO document_chunks_fts(document_chunks_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END
+    """).execute_if(dialect="sqlite")
+)
\ No newline at end of file
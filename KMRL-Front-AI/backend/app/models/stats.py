@@ -0,0 +1,117 @@
+from sqlalchemy import Column, Integer, String, Date, DDL, PrimaryKeyConstraint, event
+from ..core.database import Base
+from .document import Document
+
+# Dimensions of the rollups; missing values are stored as '' so they group like any other
+STAT_DIMENSIONS = ("department", "document_type", "priority", "processing_status")
+
+class DocumentStatTotal(Base):
+    """Document counts per combination of dimension values, over all time"""
+    __tablename__ = "document_stat_totals"
+
+    department = Column(String, nullable=False, default="")
+    document_type = Column(String, nullable=False, default="")
+    priority = Column(String, nullable=False, default="")
+    processing_status = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint(*STAT_DIMENSIONS),
+    )
+
+class DocumentStat(Base):
+    """Document counts per creation day and dimension values, for date ranges and series"""
+    __tablename__ = "document_stats"
+
+    day = Column(Date, nullable=False)
+    department = Column(String, nullable=False, default="")
+    document_type = Column(String, nullable=False, default="")
+    priority = Column(String, nullable=False, default="")
+    processing_status = Column(String, nullable=False, default="")
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("day", *STAT_DIMENSIONS),
+    )
+
+# Key columns of each rollup table
+ROLLUPS = {
+    "document_stat_totals": STAT_DIMENSIONS,
+    "document_stats": ("day",) + STAT_DIMENSIONS,
+}
+
+def _value(row: str, column: str) -> str:
+    """SQL expression for one key column of `new`, `old` or `documents`"""
+    if column == "day":
+        return f"COALESCE(date({row}.created_at), date('now'))"
+    return f"COALESCE({row}.{column}, '')"
+
+def _match(row: str, columns) -> str:
+    return " AND ".join(f"{column} = {_value(row, column)}" for column in columns)
+
+def _add(row: str) -> str:
+    return "".join(
+        f"""
+            INSERT OR IGNORE INTO {table} ({", ".join(columns)}, count) VALUES ({", ".join(_value(row, column) for column in columns)}, 0);
+            UPDATE {table} SET count = count + 1 WHERE {_match(row, columns)};"""
+        for table, columns in ROLLUPS.items()
+    )
+
+def _subtract(row: str) -> str:
+    return "".join(
+        f"""
+            UPDATE {table} SET count = count - 1 WHERE {_match(row, columns)};
+            DELETE FROM {table} WHERE count <= 0 AND {_match(row, columns)};"""
+        for table, columns in ROLLUPS.items()
+    )
+
+def recount_sql(table: str) -> str:
+    """Rows of a rollup table recounted from the documents table"""
+    columns = ROLLUPS[table]
+    return f"""
+        SELECT {", ".join(_value("documents", column) for column in columns)}, COUNT(*) FROM documents
+        GROUP BY {", ".join(str(position) for position in range(1, len(columns) + 1))}
+    """
+
+def rebuild_sql(table: str) -> str:
+    return f"INSERT INTO {table} ({', '.join(ROLLUPS[table])}, count) {recount_sql(table)}"
+
+# The triggers and the initial fill need the documents and totals tables to exist first
+DocumentStat.__table__.add_is_dependent_on(Document.__table__)
+DocumentStat.__table__.add_is_dependent_on(DocumentStatTotal.__table__)
+
+# Filled from the documents table when first created, then kept in sync by
+# triggers, so every insert, status change or reclassification is counted in
+# the same transaction, including bulk and raw SQL updates (SQLite)
+for _table in ROLLUPS:
+    for _statement in (f"DELETE FROM {_table}", rebuild_sql(_table)):
+        event.listen(
+            DocumentStat.__table__,
+            "after_create",
+            DDL(_statement).execute_if(dialect="sqlite")
+        )
+event.listen(
+    DocumentStat.__table__,
+    "after_create",
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS document_stats_ai AFTER INSERT ON documents BEGIN{_add("new")}
+        END
+    """).execute_if(dialect="sqlite")
+)
+event.listen(
+    DocumentStat.__table__,
+    "after_create",
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS document_stats_au
+        AFTER UPDATE OF created_at, {", ".join(STAT_DIMENSIONS)} ON documents BEGIN{_subtract("old")}{_add("new")}
+        END
+    """).execute_if(dialect="sqlite")
+)
+event.listen(
+    DocumentStat.__table__,
+    "after_create",
+    DDL(f"""
+        CREATE TRIGGER IF NOT EXISTS document_stats_ad AFTER DELETE ON documents BEGIN{_subtract("old")}
+        END
+    """).execute_if(dialect="sqlite")
+)
@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class Subscription(Base):
+    """A saved search; new documents matching it notify its owner"""
+    __tablename__ = "subscriptions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+    query = Column(String, nullable=False, default="")
+    
+    # Filters; null matches any value
+    document_type = Column(String, nullable=True)
+    priority = Column(String, nullable=True)
+    department = Column(String, nullable=True)
+    webhook_url = Column(String, nullable=True)  # also POSTed to, besides the in-app notification
+    is_active = Column(Boolean, default=True)
+    
+    # Compiled form for the percolator: normalized terms, all of which must occur,
+    # and the one key the subscription is indexed under (see PercolatorService)
+    terms = Column(Text, nullable=False, default="")
+    anchor = Column(String, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    __table_args__ = (
+        Index("ix_subscriptions_anchor", "anchor"),
+        Index("ix_subscriptions_user", "user_id"),
+    )
+
+class Notification(Base):
+    """Outbox of subscription matches; written with the match, delivered by NotificationRelay"""
+    __tablename__ = "notification_outbox"
+    
+    id = Column(Integer, primary_key=True)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, delivered, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # when a relay took it for sending
+    last_error = Column(String, nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("subscription_id", "document_id", name="uq_notification_outbox_match"),
+        Index("ix_notification_outbox_status", "status", "id"),
+        Index("ix_notification_outbox_user", "user_id", "id"),
+    )
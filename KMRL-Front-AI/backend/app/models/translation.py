@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class TranslationSegment(Base):
+    """Translated sentence or line, shared by every document containing it"""
+    __tablename__ = "translation_segments"
+    
+    id = Column(Integer, primary_key=True)
+    segment_hash = Column(String, nullable=False)  # sha256 of the whitespace-normalized source
+    source_language = Column(String, nullable=False)
+    target_language = Column(String, nullable=False)
+    model_id = Column(String, nullable=False)
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint(
+            "segment_hash", "source_language", "target_language", "model_id",
+            name="uq_translation_segments_key"
+        ),
+    )
@@ -0,0 +1,263 @@
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional
+import queue
+import re
+import threading
+import time
+import uuid
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import record_cache, record_model_load
+from .search_service import SearchService
+
+# Chunks retrieved per question
+RETRIEVAL_K = 6
+
+# A follow-up this similar to an earlier question in the session reuses its context
+REUSE_SIMILARITY = 0.85
+
+# Conversation turns included in the prompt
+HISTORY_TURNS = 4
+
+CITATION_PATTERN = re.compile(r"\[(\d+)\]")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+class ChatSession:
+    def __init__(self, session_id: str, user_id: int):
+        self.id = session_id
+        self.user_id = user_id
+        self.history: List[Dict] = []
+        # chunk_id -> chunk, most relevant first
+        self.chunks: "OrderedDict[int, Dict]" = OrderedDict()
+        self.query_vectors: List[np.ndarray] = []
+        self.last_used = time.time()
+
+class SessionStore:
+    """In-process LRU of chat sessions with a TTL"""
+
+    _sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_or_create(cls, session_id: Optional[str], user_id: int) -> ChatSession:
+        now = time.time()
+        with cls._lock:
+            for key in [key for key, session in cls._sessions.items() if now - session.last_used > settings.chat_session_ttl]:
+                del cls._sessions[key]
+
+            session = cls._sessions.get(session_id) if session_id else None
+            if session is None or session.user_id != user_id:
+                session = ChatSession(session_id or uuid.uuid4().hex, user_id)
+                cls._sessions[session.id] = session
+                while len(cls._sessions) > settings.chat_max_sessions:
+                    cls._sessions.popitem(last=False)
+            cls._sessions.move_to_end(session.id)
+            session.last_used = now
+            return session
+
+class Generator:
+    """Locally runnable seq2seq model with token streaming, loaded once per process"""
+
+    _model = None
+    _tokenizer = None
+    _load_failed = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls):
+        with cls._lock:
+            if cls._model is not None or cls._load_failed:
+                return cls._model
+            started = time.perf_counter()
+            try:
+                from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+                cls._tokenizer = AutoTokenizer.from_pretrained(settings.chat_model, cache_dir=settings.huggingface_cache_dir)
+                cls._model = AutoModelForSeq2SeqLM.from_pretrained(settings.chat_model, cache_dir=settings.huggingface_cache_dir)
+                cls._model.eval()
+                print("Chat model loaded successfully")
+            except Exception as e:
+                print(f"Error loading chat model: {e}")
+                cls._load_failed = True
+            record_model_load("chat", started, cls._model is not None)
+            return cls._model
+
+    @classmethod
+    def stream(cls, prompt: str) -> Iterator[str]:
+        from transformers import TextIteratorStreamer
+
+        inputs = cls._tokenizer(prompt, return_tensors="pt", truncation=True, max_length=1024)
+        # Bounded waits: a stuck generation must not hold an inference worker forever
+        streamer = TextIteratorStreamer(
+            cls._tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=settings.chat_token_timeout
+        )
+        errors: List[Exception] = []
+
+        def generate():
+            try:
+                cls._model.generate(
+                    **inputs, streamer=streamer, max_new_tokens=settings.chat_max_new_tokens, do_sample=False
+                )
+            except Exception as e:
+                # Without the end signal the consumer would wait for tokens that never come
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, daemon=True)
+        thread.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        except queue.Empty:
+            raise TimeoutError(f"No tokens generated within {settings.chat_token_timeout:g}s")
+        thread.join()
+        if errors:
+            raise errors[0]
+
+class ChatService:
+    """Retrieval-augmented answers over the document corpus"""
+
+    def __init__(self, db: Session, search_service: Optional[SearchService] = None):
+        self.db = db
+        self.search_service = search_service or SearchService(db)
+
+    def prepare(self, message: str, user_id: int, session_id: Optional[str] = None, extra_context: Optional[str] = None) -> Dict:
+        """Retrieve and assemble the bounded context for a question.
+
+        Only the new message is encoded. When it is close to an earlier question
+        in the session, the cached chunks are reused without another retrieval.
+        """
+        session = SessionStore.get_or_create(session_id, user_id)
+        query_vector = self.search_service.encode_query(message)
+
+        reuse = False
+        if query_vector is not None and session.query_vectors and session.chunks:
+            similarity = max(float(np.dot(query_vector, previous)) for previous in session.query_vectors)
+            reuse = similarity >= REUSE_SIMILARITY
+            record_cache("chat_context", hits=int(reuse), misses=int(not reuse))
+
+        if not reuse:
+            retrieved = self.search_service.search_chunks(message, k=RETRIEVAL_K, query_vector=query_vector)
+            # Fresh hits go first; earlier context stays behind them until it falls out of budget
+            merged = OrderedDict((chunk["chunk_id"], chunk) for chunk in retrieved)
+            for chunk_id, chunk in session.chunks.items():
+                merged.setdefault(chunk_id, chunk)
+            session.chunks = merged
+        if query_vector is not None:
+            session.query_vectors.append(query_vector)
+
+        context: List[Dict] = []
+        used = len(extra_context or "")
+        for chunk in session.chunks.values():
+            if used + len(chunk["text"]) > settings.chat_context_chars:
+                continue
+            context.append(chunk)
+            used += len(chunk["text"])
+        # Keep the cache bounded to what can actually be used
+        session.chunks = OrderedDict((chunk["chunk_id"], chunk) for chunk in context)
+
+        return {
+            "session": session,
+            "message": message,
+            "context": context,
+            "extra_context": extra_context,
+            "prompt": self._build_prompt(session, message, context, extra_context)
+        }
+
+    def _build_prompt(self, session: ChatSession, message: str, context: List[Dict], extra_context: Optional[str]) -> str:
+        sources = "\n".join(
+            f"[{number}] ({chunk['title']}, page {chunk['page']}) {chunk['text']}"
+            for number, chunk in enumerate(context, start=1)
+        )
+        history = "\n".join(
+            f"{turn['role'].capitalize()}: {turn['text']}" for turn in session.history[-HISTORY_TURNS:]
+        )
+        parts = [
+            "You are the KMRL DocHub assistant. Answer the question using only the numbered sources "
+            "and cite them like [1]. If the sources do not contain the answer, say so."
+        ]
+        if extra_context:
+            parts.append(f"Additional context: {extra_context}")
+        parts.append(f"Sources:\n{sources or 'None'}")
+        if history:
+            parts.append(f"Conversation:\n{history}")
+        parts.append(f"Question: {message}\nAnswer:")
+        return "\n\n".join(parts)
+
+    def citations(self, prepared: Dict, answer: Optional[str] = None) -> List[Dict]:
+        """Sources referenced by the answer, or every context source before the answer exists"""
+        context = prepared["context"]
+        numbers = range(1, len(context) + 1)
+        if answer:
+            cited = sorted({int(number) for number in CITATION_PATTERN.findall(answer) if 1 <= int(number) <= len(context)})
+            numbers = cited or numbers
+        return [
+            {
+                "source": number,
+                "document_id": context[number - 1]["document_id"],
+                "title": context[number - 1]["title"],
+                "page": context[number - 1]["page"],
+                "chunk_id": context[number - 1]["chunk_id"]
+            }
+            for number in numbers
+        ]
+
+    def confidence(self, prepared: Dict) -> float:
+        if not prepared["context"]:
+            return 0.0
+        similarities = [chunk.get("similarity") for chunk in prepared["context"] if chunk.get("similarity") is not None]
+        return round(max(similarities), 3) if similarities else 0.5
+
+    def stream(self, prepared: Dict) -> Iterator[str]:
+        """Yield answer text as it is generated and record the turn in the session"""
+        pieces = []
+        if not prepared["context"] and not prepared["extra_context"]:
+            generator = iter(["I could not find any documents relevant to that question."])
+        elif Generator.load() is not None:
+            generator = self._generated(prepared)
+        else:
+            generator = self._extractive(prepared)
+
+        for piece in generator:
+            pieces.append(piece)
+            yield piece
+
+        session = prepared["session"]
+        session.history.append({"role": "user", "text": prepared["message"]})
+        session.history.append({"role": "assistant", "text": "".join(pieces).strip()})
+
+    def answer(self, prepared: Dict) -> str:
+        return "".join(self.stream(prepared)).strip()
+
+    def _generated(self, prepared: Dict) -> Iterator[str]:
+        """Model output; a generation failing before its first token falls back to the extractive answer"""
+        started = False
+        try:
+            for piece in Generator.stream(prepared["prompt"]):
+                started = True
+                yield piece
+        except Exception as e:
+            if started:
+                raise
+            print(f"Chat generation error, answering extractively: {e}")
+            yield from self._extractive(prepared)
+
+    def _extractive(self, prepared: Dict) -> Iterator[str]:
+        """Fallback when no generator model is available: best-matching sentences with citations"""
+        terms = {term.lower() for term in WORD_PATTERN.findall(prepared["message"]) if len(term) > 3}
+        scored = []
+        for number, chunk in enumerate(prepared["context"], start=1):
+            for sentence in SENTENCE_PATTERN.split(chunk["text"]):
+                overlap = len(terms & {word.lower() for word in WORD_PATTERN.findall(sentence)})
+                if overlap:
+                    scored.append((overlap, number, sentence.strip()))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        if not scored:
+            yield "The retrieved documents do not appear to answer that question."
+            return
+        for _, number, sentence in scored[:3]:
+            yield f"{sentence} [{number}] "
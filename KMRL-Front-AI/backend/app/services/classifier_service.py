@@ -0,0 +1,247 @@
+from typing import Dict, List, Optional
+import os
+import re
+import zlib
+import numpy as np
+
+from ..core.config import settings
+from ..core.invalidation import Invalidation
+
+DOCUMENT_TYPES = ["safety", "compliance", "operational", "financial", "general"]
+PRIORITIES = ["low", "medium", "high", "critical"]
+
+# Hashed feature space; 2**14 columns keeps a batch of 256 documents at 16MB
+N_FEATURES = 2 ** 14
+
+# Only the head of long documents is needed to decide type and priority
+MAX_CHARS = 20000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Seed lexicon used until a model is trained on labelled documents
+SEED_TYPE_TERMS: Dict[str, List[str]] = {
+    "safety": ["safety", "accident", "emergency", "incident", "hazard", "injury", "evacuation", "fire", "derailment"],
+    "compliance": ["compliance", "audit", "regulation", "regulatory", "inspection", "cmrs", "certificate", "statutory"],
+    "operational": ["maintenance", "repair", "technical", "operation", "schedule", "rolling", "signalling", "depot", "overhaul"],
+    "financial": ["budget", "finance", "cost", "invoice", "payment", "tender", "expenditure", "revenue", "procurement"],
+    "general": ["circular", "notice", "meeting", "general", "information", "announcement"],
+}
+SEED_PRIORITY_TERMS: Dict[str, List[str]] = {
+    "critical": ["emergency", "immediate", "fatal", "derailment", "evacuation", "critical", "urgent"],
+    "high": ["safety", "accident", "incident", "hazard", "failure", "deadline", "breach"],
+    "medium": ["compliance", "audit", "maintenance", "inspection", "repair", "review"],
+    "low": ["budget", "information", "newsletter", "meeting", "general", "notice"],
+}
+
+def _hash(token: str) -> int:
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode("utf-8")) % N_FEATURES
+
+def featurize(texts: List[str]) -> np.ndarray:
+    """Hashed unigram+bigram features with sublinear TF, L2-normalized per row"""
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, text in enumerate(texts):
+        tokens = TOKEN_PATTERN.findall((text or "")[:MAX_CHARS].lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        rows.extend([row] * len(grams))
+        cols.extend(_hash(gram) for gram in grams)
+
+    matrix = np.zeros((len(texts), N_FEATURES), dtype=np.float32)
+    if rows:
+        np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), 1.0)
+    np.log1p(matrix, out=matrix)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class LinearHead:
+    """Multinomial logistic regression over hashed features, with temperature scaling"""
+
+    def __init__(self, classes: List[str], weights: np.ndarray, bias: np.ndarray, temperature: float = 1.0):
+        self.classes = classes
+        self.weights = weights
+        self.bias = bias
+        self.temperature = temperature
+
+    @classmethod
+    def from_seed(
+        cls,
+        classes: List[str],
+        seed_terms: Dict[str, List[str]],
+        default: str,
+        strength: float = 4.0
+    ) -> "LinearHead":
+        weights = np.zeros((N_FEATURES, len(classes)), dtype=np.float32)
+        for index, label in enumerate(classes):
+            for term in seed_terms.get(label, []):
+                weights[_hash(term), index] += strength
+        # Texts without any seed term fall back to the default class
+        bias = np.zeros(len(classes), dtype=np.float32)
+        bias[classes.index(default)] = 0.1
+        return cls(classes, weights, bias)
+
+    @classmethod
+    def fit(
+        cls,
+        features: np.ndarray,
+        labels: List[str],
+        classes: List[str],
+        epochs: int = 200,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4
+    ) -> "LinearHead":
+        """Full-batch gradient descent, then temperature fitted on a held-out split"""
+        targets = np.asarray([classes.index(label) for label in labels])
+        order = np.random.default_rng(0).permutation(len(targets))
+        holdout = order[: max(1, len(order) // 5)] if len(order) >= 10 else order
+        train = order[len(holdout):] if len(order) >= 10 else order
+
+        one_hot = np.zeros((len(targets), len(classes)), dtype=np.float32)
+        one_hot[np.arange(len(targets)), targets] = 1.0
+
+        weights = np.zeros((features.shape[1], len(classes)), dtype=np.float32)
+        bias = np.zeros(len(classes), dtype=np.float32)
+        x_train, y_train = features[train], one_hot[train]
+        for _ in range(epochs):
+            probabilities = _softmax(x_train @ weights + bias)
+            error = (probabilities - y_train) / len(train)
+            weights -= learning_rate * (x_train.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        head = cls(classes, weights, bias)
+        head.temperature = head._fit_temperature(features[holdout], targets[holdout])
+        return head
+
+    def _fit_temperature(self, features: np.ndarray, targets: np.ndarray) -> float:
+        logits = features @ self.weights + self.bias
+        best_temperature, best_loss = 1.0, float("inf")
+        for temperature in np.linspace(0.25, 5.0, 39):
+            probabilities = _softmax(logits / temperature)
+            loss = -np.log(probabilities[np.arange(len(targets)), targets] + 1e-12).mean()
+            if loss < best_loss:
+                best_temperature, best_loss = float(temperature), loss
+        return best_temperature
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        return _softmax((features @ self.weights + self.bias) / self.temperature)
+
+class DocumentClassifier:
+    """Predicts document_type and priority with calibrated probabilities"""
+
+    # Loaded once per process and shared across instances
+    _instance: Optional["DocumentClassifier"] = None
+
+    def __init__(self, type_head: LinearHead, priority_head: LinearHead, trained: bool = False):
+        self.type_head = type_head
+        self.priority_head = priority_head
+        self.trained = trained
+
+    @classmethod
+    def load(cls) -> "DocumentClassifier":
+        if cls._instance is not None:
+            return cls._instance
+
+        path = settings.classifier_model_path
+        if os.path.exists(path):
+            try:
+                data = np.load(path, allow_pickle=False)
+                cls._instance = cls(
+                    LinearHead(DOCUMENT_TYPES, data["type_weights"], data["type_bias"], float(data["type_temperature"])),
+                    LinearHead(PRIORITIES, data["priority_weights"], data["priority_bias"], float(data["priority_temperature"])),
+                    trained=True
+                )
+                return cls._instance
+            except Exception as e:
+                print(f"Error loading classifier model: {e}")
+
+        cls._instance = cls(
+            LinearHead.from_seed(DOCUMENT_TYPES, SEED_TYPE_TERMS, default="general"),
+            LinearHead.from_seed(PRIORITIES, SEED_PRIORITY_TERMS, default="low")
+        )
+        return cls._instance
+
+    def save(self):
+        os.makedirs(os.path.dirname(settings.classifier_model_path) or ".", exist_ok=True)
+        np.savez_compressed(
+            settings.classifier_model_path,
+            type_weights=self.type_head.weights,
+            type_bias=self.type_head.bias,
+            type_temperature=self.type_head.temperature,
+            priority_weights=self.priority_head.weights,
+            priority_bias=self.priority_head.bias,
+            priority_temperature=self.priority_head.temperature
+        )
+        DocumentClassifier._instance = self
+        Invalidation.publish("classifier")
+
+    @classmethod
+    def _invalidate(cls, message: Dict):
+        """Another process saved a model: load it on next use"""
+        cls._instance = None
+
+    @classmethod
+    def train(
+        cls,
+        texts: List[str],
+        types: List[Optional[str]],
+        priorities: List[Optional[str]]
+    ) -> "DocumentClassifier":
+        """Train whichever heads have labels for at least two classes; keep the current head otherwise"""
+        current = cls.load()
+        features = featurize(texts)
+
+        def train_head(labels, classes, fallback):
+            labelled = [index for index, label in enumerate(labels) if label in classes]
+            if len({labels[index] for index in labelled}) < 2:
+                return fallback
+            return LinearHead.fit(features[labelled], [labels[index] for index in labelled], classes)
+
+        return cls(
+            train_head(types, DOCUMENT_TYPES, current.type_head),
+            train_head(priorities, PRIORITIES, current.priority_head),
+            trained=True
+        )
+
+    def predict(self, texts: List[str]) -> List[Dict]:
+        """Classify a batch of texts in one vectorized pass"""
+        if not texts:
+            return []
+        features = featurize(texts)
+        type_probabilities = self.type_head.predict_proba(features)
+        priority_probabilities = self.priority_head.predict_proba(features)
+
+        results = []
+        for type_row, priority_row in zip(type_probabilities, priority_probabilities):
+            type_index = int(type_row.argmax())
+            priority_index = int(priority_row.argmax())
+            results.append({
+                "type": DOCUMENT_TYPES[type_index],
+                "priority": PRIORITIES[priority_index],
+                "type_confidence": float(type_row[type_index]),
+                "priority_confidence": float(priority_row[priority_index]),
+                "type_probabilities": dict(zip(DOCUMENT_TYPES, map(float, type_row))),
+                "priority_probabilities": dict(zip(PRIORITIES, map(float, priority_row)))
+            })
+        return results
+
+Invalidation.subscribe("classifier", DocumentClassifier._invalidate)
+
+def classify_texts(texts: List[str]) -> List[Dict]:
+    return DocumentClassifier.load().predict(texts)
+
+def apply_classification(document, result: Dict):
+    """Copy a prediction onto a Document, keeping a document_type or priority chosen by the uploader"""
+    if document.classification_source != "user":
+        document.document_type = result["type"]
+        document.type_confidence = result["type_confidence"]
+        document.classification_source = "model"
+    if document.priority_source != "user":
+        document.priority = result["priority"]
+        document.priority_confidence = result["priority_confidence"]
+        document.priority_source = "model"
@@ -0,0 +1,173 @@
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import hashlib
+import re
+import zlib
+import numpy as np
+
+from ..core.config import settings
+from ..core.tracing import span
+from ..models.dedup import DocumentSignature, LSHBucket
+from ..models.document import Document
+from .graph_service import GraphService
+from .ocr_service import has_extracted_text
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Universal hashing modulo a Mersenne prime; hashes are truncated to 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Bounds the (shingles x permutations) matrix hashed at once
+HASH_BLOCK = 4096
+
+_permutations: Dict[int, tuple] = {}
+
+def _permutation_parameters(count: int):
+    # Fixed seed: signatures must agree across processes and restarts
+    if count not in _permutations:
+        rng = np.random.RandomState(1)
+        a = rng.randint(1, np.iinfo(np.int64).max, size=count, dtype=np.int64).astype(np.uint64) % MERSENNE_PRIME
+        b = rng.randint(0, np.iinfo(np.int64).max, size=count, dtype=np.int64).astype(np.uint64) % MERSENNE_PRIME
+        _permutations[count] = (a, b)
+    return _permutations[count]
+
+def shingles(text: str, size: int) -> np.ndarray:
+    """Distinct 32-bit hashes of the text's word n-grams, case and punctuation ignored"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams))
+
+def minhash(hashes: np.ndarray, permutations: int) -> np.ndarray:
+    """Minimum of each permuted hash over the shingles; equal positions estimate Jaccard similarity"""
+    a, b = _permutation_parameters(permutations)
+    signature = np.full(permutations, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), HASH_BLOCK):
+        block = hashes[start:start + HASH_BLOCK]
+        # uint64 multiplication wraps; the result is still a usable hash family
+        permuted = (np.outer(block, a) + b) % MERSENNE_PRIME & MAX_HASH
+        signature = np.minimum(signature, permuted.min(axis=0))
+    return signature.astype(np.uint32)
+
+def band_buckets(signature: np.ndarray, bands: int) -> List[int]:
+    """Hash each band of rows to a signed 64-bit bucket id"""
+    rows = len(signature) // bands
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "little",
+            signed=True
+        )
+        for band in range(bands)
+    ]
+
+def estimate_similarity(signature: np.ndarray, other: np.ndarray) -> float:
+    return float(np.mean(signature == other))
+
+class DedupService:
+    """Near-duplicate detection with MinHash signatures and an LSH index in SQLite.
+
+    A document whose estimated similarity to an earlier one reaches
+    near_duplicate_threshold becomes its next version: it points at the most
+    recent matching document and joins that document's version group.
+    """
+
+    def __init__(self, db: Session, graph_service: Optional[GraphService] = None):
+        self.db = db
+        self.graph_service = graph_service
+
+    def index_document(self, document: Document) -> Optional[Dict]:
+        """Store the document's signature and link it to its previous version; returns the match, if any"""
+        self.remove_document(document.id)
+        document.previous_version_id = document.version_similarity = None
+        # A re-indexed document keeps its group only while later versions point at it
+        has_successors = self.db.query(Document.id).filter(Document.previous_version_id == document.id).first()
+        former_group = document.version_group_id if has_successors else None
+        document.version_group_id = former_group
+
+        # Placeholder and error text is the same for unrelated files, so it must not make them versions
+        if not has_extracted_text(document.extracted_text, document.ocr_confidence):
+            self.db.commit()
+            return None
+
+        hashes = shingles(document.extracted_text or "", settings.shingle_words)
+        if not len(hashes):
+            self.db.commit()
+            return None
+
+        with span("dedup.minhash", shingles=len(hashes)):
+            signature = minhash(hashes, settings.minhash_permutations)
+        buckets = band_buckets(signature, settings.minhash_bands)
+
+        match = self._best_match(document.id, signature, buckets)
+        self.db.add(DocumentSignature(document_id=document.id, minhash=signature.tobytes(), shingle_count=len(hashes)))
+        self.db.add_all([
+            LSHBucket(band=band, bucket=bucket, document_id=document.id)
+            for band, bucket in enumerate(buckets)
+        ])
+
+        if match:
+            previous = self.db.query(Document).filter(Document.id == match["document_id"]).first()
+            if previous.version_group_id is None:
+                previous.version_group_id = previous.id
+            document.version_group_id = previous.version_group_id
+            document.previous_version_id = previous.id
+            document.version_similarity = match["similarity"]
+            if former_group is not None and former_group != previous.version_group_id:
+                self.db.query(Document).filter(Document.version_group_id == former_group).update(
+                    {Document.version_group_id: previous.version_group_id}, synchronize_session=False
+                )
+        self.db.commit()
+
+        if match:
+            if self.graph_service is None:
+                self.graph_service = GraphService()
+            self.graph_service.link_versions(document.id, match["document_id"], match["similarity"])
+        return match
+
+    def _best_match(self, document_id: int, signature: np.ndarray, buckets: List[int]) -> Optional[Dict]:
+        """The most recent earlier document above the threshold; only bucket collisions are compared"""
+        candidate_ids = {
+            row[0] for row in self.db.query(LSHBucket.document_id)
+            .filter(tuple_(LSHBucket.band, LSHBucket.bucket).in_(list(enumerate(buckets))))
+            .filter(LSHBucket.document_id < document_id)
+            .distinct()
+            .all()
+        }
+        if not candidate_ids:
+            return None
+
+        matches = []
+        for candidate_id, stored in (
+            self.db.query(DocumentSignature.document_id, DocumentSignature.minhash)
+            .filter(DocumentSignature.document_id.in_(candidate_ids))
+            .all()
+        ):
+            other = np.frombuffer(stored, dtype=np.uint32)
+            if len(other) != len(signature):
+                continue
+            similarity = estimate_similarity(signature, other)
+            if similarity >= settings.near_duplicate_threshold:
+                matches.append({"document_id": candidate_id, "similarity": similarity})
+        if not matches:
+            return None
+        # Chains follow ingestion order, so a revision links to the latest earlier copy
+        return max(matches, key=lambda item: item["document_id"])
+
+    def get_versions(self, document: Document) -> List[Document]:
+        """Every document in the document's version group, oldest first"""
+        if document.version_group_id is None:
+            return [document]
+        return (
+            self.db.query(Document)
+            .filter(Document.version_group_id == document.version_group_id)
+            .order_by(Document.id)
+            .all()
+        )
+
+    def remove_document(self, document_id: int):
+        self.db.query(LSHBucket).filter(LSHBucket.document_id == document_id).delete()
+        self.db.query(DocumentSignature).filter(DocumentSignature.document_id == document_id).delete()
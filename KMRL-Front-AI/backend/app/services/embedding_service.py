@@ -0,0 +1,65 @@
+from typing import List
+import threading
+import time
+import numpy as np
+
+from ..core.config import settings
+from ..core.metrics import record_model_load, track_stage
+from .model_backend import load_embedder
+
+class EmbeddingService:
+    # Shared across instances so the model is only loaded once per process
+    _model = None
+    _load_failed = False
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.model_name = settings.embedding_model
+
+    def _load_model(self):
+        """Load the sentence embedding model on first use"""
+        # Checked without the lock first, so encoding never waits once the model is loaded
+        if EmbeddingService._model is not None or EmbeddingService._load_failed:
+            return EmbeddingService._model
+
+        # Concurrent first requests on the inference pool load it once, the others wait
+        with EmbeddingService._lock:
+            if EmbeddingService._model is not None or EmbeddingService._load_failed:
+                return EmbeddingService._model
+            started = time.perf_counter()
+            try:
+                EmbeddingService._model = load_embedder(model_name=self.model_name)
+                print("Embedding model loaded successfully")
+            except Exception as e:
+                print(f"Error loading embedding model: {e}")
+                EmbeddingService._load_failed = True
+            record_model_load("embedding", started, EmbeddingService._model is not None)
+            return EmbeddingService._model
+
+    @property
+    def available(self) -> bool:
+        return self._load_model() is not None
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Encode texts into L2-normalized float32 vectors"""
+        model = self._load_model()
+        if model is None or not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        with track_stage("embed"):
+            vectors = model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        return vectors.astype(np.float32)
+
+    @staticmethod
+    def to_bytes(vector: np.ndarray) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def from_bytes(data: bytes) -> np.ndarray:
+        return np.frombuffer(data, dtype=np.float32)
@@ -0,0 +1,361 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import deque
+import re
+import time
+
+from ..core.access import restrict
+from ..core.config import settings
+from ..core.metrics import record_model_load
+from ..models.document import Document
+from ..models.entity import DocumentEntity
+
+# Domain gazetteers: canonical name -> aliases (matched case-insensitively)
+STATIONS: Dict[str, List[str]] = {
+    "Aluva": ["Aluva"],
+    "Pulinchodu": ["Pulinchodu"],
+    "Companypady": ["Companypady"],
+    "Ambattukavu": ["Ambattukavu"],
+    "Muttom": ["Muttom", "Muttom Depot"],
+    "Kalamassery": ["Kalamassery"],
+    "Cochin University": ["Cochin University", "CUSAT"],
+    "Pathadipalam": ["Pathadipalam"],
+    "Edapally": ["Edapally", "Edappally"],
+    "Changampuzha Park": ["Changampuzha Park"],
+    "Palarivattom": ["Palarivattom"],
+    "JLN Stadium": ["JLN Stadium", "Jawaharlal Nehru Stadium"],
+    "Kaloor": ["Kaloor"],
+    "Town Hall": ["Town Hall", "Lissie"],
+    "MG Road": ["MG Road", "M.G. Road", "M G Road", "Mahatma Gandhi Road"],
+    "Maharaja's College": ["Maharaja's College", "Maharajas College"],
+    "Ernakulam South": ["Ernakulam South"],
+    "Kadavanthra": ["Kadavanthra"],
+    "Elamkulam": ["Elamkulam"],
+    "Vyttila": ["Vyttila", "Vyttila Hub"],
+    "Thaikoodam": ["Thaikoodam"],
+    "Petta": ["Petta"],
+    "Vadakkekotta": ["Vadakkekotta"],
+    "SN Junction": ["SN Junction", "S.N. Junction"],
+    "Tripunithura": ["Tripunithura", "Tripunithura Terminal"],
+}
+
+EQUIPMENT: Dict[str, List[str]] = {
+    "escalator": ["escalator", "escalators"],
+    "elevator": ["elevator", "elevators", "lift", "lifts"],
+    "afc gate": ["AFC gate", "AFC gates", "fare gate", "fare gates"],
+    "ticket vending machine": ["ticket vending machine", "TVM"],
+    "cbtc": ["CBTC", "communication based train control"],
+    "signalling": ["signalling", "signaling", "interlocking"],
+    "platform screen door": ["platform screen door", "platform screen doors", "PSD"],
+    "traction substation": ["traction substation", "receiving substation", "RSS", "TSS"],
+    "third rail": ["third rail"],
+    "bogie": ["bogie", "bogies"],
+    "pantograph": ["pantograph"],
+    "brake": ["brake", "brakes", "braking system"],
+    "hvac": ["HVAC", "air conditioning"],
+    "scada": ["SCADA"],
+    "cctv": ["CCTV"],
+    "fire alarm": ["fire alarm", "fire detection system"],
+}
+
+ORGANIZATIONS: Dict[str, List[str]] = {
+    "KMRL": ["KMRL", "Kochi Metro Rail Limited", "Kochi Metro"],
+    "CMRS": ["CMRS", "Commissioner of Metro Rail Safety"],
+    "Alstom": ["Alstom"],
+    "DMRC": ["DMRC", "Delhi Metro Rail Corporation"],
+}
+
+GAZETTEERS: Dict[str, Dict[str, List[str]]] = {
+    "STATION": STATIONS,
+    "EQUIPMENT": EQUIPMENT,
+    "ORG": ORGANIZATIONS,
+}
+
+# Identifier patterns; earlier entries win when matches overlap.
+# Case-sensitive: "TS"/"RS" only as codes with a hyphen ("TS-05"), so rupee
+# amounts ("Rs 500", "Rs. 25 lakh", "RS-2 crore") are not taken for rakes
+PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("ROLLING_STOCK", re.compile(
+        r"\b(?:(?:TS|RS)-|(?:[Rr]ake|[Tt]rain\s?set)[\s\-#:]*)(\d{1,3})\b(?![.,]\d)(?!\s*(?i:lakhs?|crores?|cr)\b)"
+    )),
+    ("EQUIPMENT_CODE", re.compile(r"\b[A-Z]{2,5}-\d{2,5}(?:-[A-Z0-9]{1,5})?\b")),
+]
+
+# A rolling-stock value as typed into a lookup
+ROLLING_STOCK_QUERY = re.compile(r"\s*(?:TS|RS|Rake|Train\s?set)?[\s\-#:]*(\d{1,3})\s*", re.IGNORECASE)
+
+# Characters per NER chunk; well under the 512-token limit of BERT-sized models
+NER_CHUNK_CHARS = 1000
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern in one pass over the text"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, object]]] = [[]]
+
+        for pattern, payload in patterns:
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((len(pattern), payload))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(char, 0) if self.goto[state].get(char, 0) != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text: str) -> List[Tuple[int, int, object]]:
+        """Return (start, end, payload) for every match in text"""
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, payload in self.output[node]:
+                matches.append((index - length + 1, index + 1, payload))
+        return matches
+
+def _normalize(value: str) -> str:
+    return re.sub(r"\s+", " ", value).strip().lower()
+
+def _build_gazetteer_matcher() -> AhoCorasick:
+    patterns = []
+    for label, entries in GAZETTEERS.items():
+        for canonical, aliases in entries.items():
+            for alias in aliases + [canonical]:
+                patterns.append((alias.lower(), (label, canonical)))
+    return AhoCorasick(patterns)
+
+def _select_non_overlapping(spans: List[Dict]) -> List[Dict]:
+    """Keep the earliest, then longest, span wherever spans overlap"""
+    selected = []
+    last_end = -1
+    for span in sorted(spans, key=lambda item: (item["start"], -(item["end"] - item["start"]))):
+        if span["start"] >= last_end:
+            selected.append(span)
+            last_end = span["end"]
+    return selected
+
+def _chunk(text: str, size: int) -> List[Tuple[int, str]]:
+    """Split text into (offset, chunk) pieces, breaking on whitespace where possible"""
+    chunks = []
+    position = 0
+    while position < len(text):
+        end = min(position + size, len(text))
+        if end < len(text):
+            split = text.rfind(" ", position, end)
+            if split > position:
+                end = split
+        chunks.append((position, text[position:end]))
+        position = end
+    return chunks
+
+class EntityService:
+    # Built once per process and shared across instances
+    _matcher: Optional[AhoCorasick] = None
+    _ner = None
+    _ner_load_failed = False
+
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db
+        if EntityService._matcher is None:
+            EntityService._matcher = _build_gazetteer_matcher()
+
+    def _load_ner(self):
+        """Load the statistical NER model on first use"""
+        if EntityService._ner is not None or EntityService._ner_load_failed or not settings.ner_model:
+            return EntityService._ner
+
+        started = time.perf_counter()
+        try:
+            from transformers import pipeline
+
+            EntityService._ner = pipeline(
+                "ner",
+                model=settings.ner_model,
+                aggregation_strategy="simple",
+                device=-1,
+                model_kwargs={"cache_dir": settings.huggingface_cache_dir}
+            )
+            print("NER model loaded successfully")
+        except Exception as e:
+            print(f"Error loading NER model: {e}")
+            EntityService._ner_load_failed = True
+        record_model_load("ner", started, EntityService._ner is not None)
+
+        return EntityService._ner
+
+    def _rule_entities(self, text: str) -> List[Dict]:
+        spans = []
+        lowered = text.lower()
+        for start, end, (label, canonical) in EntityService._matcher.search(lowered):
+            # Gazetteer entries must match whole words
+            if start > 0 and lowered[start - 1].isalnum():
+                continue
+            if end < len(lowered) and lowered[end].isalnum():
+                continue
+            spans.append({
+                "text": text[start:end],
+                "label": label,
+                "normalized": _normalize(canonical),
+                "start": start,
+                "end": end,
+                "source": "gazetteer"
+            })
+
+        for label, pattern in PATTERNS:
+            for match in pattern.finditer(text):
+                if label == "ROLLING_STOCK":
+                    normalized = f"ts-{int(match.group(1)):02d}"
+                else:
+                    normalized = _normalize(match.group(0))
+                spans.append({
+                    "text": match.group(0),
+                    "label": label,
+                    "normalized": normalized,
+                    "start": match.start(),
+                    "end": match.end(),
+                    "source": "pattern"
+                })
+
+        return _select_non_overlapping(spans)
+
+    def _ner_entities(self, texts: List[str]) -> List[List[Dict]]:
+        """Run NER over all texts as one batched, chunked inference pass"""
+        results: List[List[Dict]] = [[] for _ in texts]
+        ner = self._load_ner()
+        if ner is None:
+            return results
+
+        owners = []
+        chunks = []
+        for text_index, text in enumerate(texts):
+            for offset, chunk in _chunk(text[:settings.ner_max_chars], NER_CHUNK_CHARS):
+                if chunk.strip():
+                    owners.append((text_index, offset))
+                    chunks.append(chunk)
+        if not chunks:
+            return results
+
+        try:
+            predictions = ner(chunks, batch_size=settings.ner_batch_size)
+        except Exception as e:
+            print(f"NER inference error: {e}")
+            return results
+
+        for (text_index, offset), chunk_entities in zip(owners, predictions):
+            for entity in chunk_entities:
+                word = entity.get("word", "").strip()
+                if len(word) < 2 or word.startswith("##"):
+                    continue
+                results[text_index].append({
+                    "text": word,
+                    "label": entity.get("entity_group", "MISC"),
+                    "normalized": _normalize(word),
+                    "start": offset + int(entity["start"]),
+                    "end": offset + int(entity["end"]),
+                    "source": "ner"
+                })
+        return results
+
+    def extract_batch(self, texts: List[str]) -> List[List[Dict]]:
+        """Extract entities from several texts; domain matches take precedence over NER"""
+        ner_results = self._ner_entities(texts)
+        extracted = []
+        for text, ner_entities in zip(texts, ner_results):
+            rule_entities = self._rule_entities(text)
+            taken = [(span["start"], span["end"]) for span in rule_entities]
+            merged = list(rule_entities)
+            for entity in ner_entities:
+                if not any(entity["start"] < end and start < entity["end"] for start, end in taken):
+                    merged.append(entity)
+            merged.sort(key=lambda item: item["start"])
+            extracted.append(merged)
+        return extracted
+
+    def extract(self, text: str) -> List[Dict]:
+        return self.extract_batch([text or ""])[0]
+
+    def index_documents(self, documents: List[Document]):
+        """Replace the stored entities of the given documents"""
+        documents = [document for document in documents if document.extracted_text]
+        if not documents:
+            return
+
+        extracted = self.extract_batch([document.extracted_text for document in documents])
+        for document, entities in zip(documents, extracted):
+            self.db.query(DocumentEntity).filter(DocumentEntity.document_id == document.id).delete()
+            self.db.add_all([
+                DocumentEntity(
+                    document_id=document.id,
+                    label=entity["label"],
+                    text=entity["text"][:255],
+                    normalized=entity["normalized"][:255],
+                    start=entity["start"],
+                    end=entity["end"],
+                    source=entity["source"]
+                )
+                for entity in entities
+            ])
+        self.db.commit()
+
+    def index_document(self, document: Document):
+        self.index_documents([document])
+
+    def get_entities(self, document_id: int) -> List[DocumentEntity]:
+        return (
+            self.db.query(DocumentEntity)
+            .filter(DocumentEntity.document_id == document_id)
+            .order_by(DocumentEntity.start)
+            .all()
+        )
+
+    def find_documents(
+        self,
+        label: str,
+        value: str,
+        skip: int = 0,
+        limit: int = 10,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> List[Document]:
+        """Documents mentioning an entity, via the (label, normalized) index, only from `departments` when given"""
+        label = label.upper()
+        normalized = _normalize(value)
+        # Accept aliases for gazetteer entries, e.g. "M.G. Road" -> "mg road"
+        for canonical, aliases in GAZETTEERS.get(label, {}).items():
+            if normalized in {_normalize(alias) for alias in aliases}:
+                normalized = _normalize(canonical)
+                break
+        if label == "ROLLING_STOCK":
+            # Lenient for queries: "ts-5", "TS 05", "rake 5"
+            match = ROLLING_STOCK_QUERY.fullmatch(value)
+            if match:
+                normalized = f"ts-{int(match.group(1)):02d}"
+
+        document_ids = (
+            self.db.query(DocumentEntity.document_id)
+            .filter(DocumentEntity.label == label, DocumentEntity.normalized == normalized)
+            .distinct()
+        )
+        return (
+            restrict(self.db.query(Document), Document.department, departments)
+            .filter(Document.id.in_(document_ids))
+            .order_by(Document.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
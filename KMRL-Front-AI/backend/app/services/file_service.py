@@ -0,0 +1,91 @@
+from starlette.responses import FileResponse
+from typing import List, Optional
+import os
+import threading
+
+from ..core.config import settings
+from ..core.tracing import span
+from .storage import COPY_CHUNK_SIZE, get_storage
+
+# Content types Pillow can decode into a thumbnail
+PREVIEWABLE_TYPES = ("image/jpeg", "image/png", "image/tiff", "image/bmp", "image/gif", "image/webp")
+
+# Previewed by their first page, rendered with pdf2image (poppler)
+PDF_TYPES = ("application/pdf",)
+
+class PreviewUnavailable(Exception):
+    """Raised when no preview can be rendered for a file"""
+
+class DocumentFileResponse(FileResponse):
+    """FileResponse with larger reads; servers with the pathsend extension send the file zero-copy"""
+    chunk_size = COPY_CHUNK_SIZE
+
+def thumbnail_sizes() -> List[int]:
+    return [int(size) for size in settings.thumbnail_sizes.split(",") if size.strip()]
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+class RenditionService:
+    """Thumbnails and previews of uploaded images and PDFs, rendered once per content hash and size"""
+
+    @staticmethod
+    def rendition_path(content_hash: str, size: int) -> str:
+        # Sharded so one directory never holds every rendition
+        return os.path.join(settings.renditions_dir, content_hash[:2], f"{content_hash}-{size}.jpg")
+
+    @staticmethod
+    def previewable(mime_type: Optional[str]) -> bool:
+        return (mime_type or "").lower() in PREVIEWABLE_TYPES + PDF_TYPES
+
+    @staticmethod
+    def _open(source_path: str, mime_type: str, size: int):
+        """The image to scale down: the file itself, or the first page of a PDF"""
+        from PIL import Image
+
+        if mime_type.lower() not in PDF_TYPES:
+            image = Image.open(source_path)
+            # JPEG decoders can scale down while decoding, far cheaper for large drawings
+            image.draft("RGB", (size, size))
+            return image
+        try:
+            from pdf2image import convert_from_path
+            from pdf2image.exceptions import PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError
+        except ImportError:
+            raise PreviewUnavailable("PDF previews need pdf2image and poppler")
+        try:
+            # Rendered straight at the rendition height rather than at full resolution
+            return convert_from_path(source_path, first_page=1, last_page=1, size=(None, size))[0]
+        except (PDFInfoNotInstalledError, PDFPageCountError, PDFSyntaxError) as e:
+            raise PreviewUnavailable(f"Could not render a preview: {e}")
+
+    def get_or_create(self, source_location: str, content_hash: str, mime_type: Optional[str], size: int) -> str:
+        """Path of the rendition; `source_location` is a storage location (Document.file_path)"""
+        if not self.previewable(mime_type):
+            raise PreviewUnavailable(f"No preview available for {mime_type or 'this file type'}")
+        path = self.rendition_path(content_hash, size)
+        if os.path.exists(path):
+            return path
+
+        from PIL import Image
+
+        # Concurrent first requests may render the same file; the rename keeps it whole
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with span("rendition.render", size=size):
+            try:
+                with get_storage(source_location).local_copy(source_location) as source_path, \
+                        self._open(source_path, mime_type, size) as image:
+                    thumbnail = image.convert("RGB")
+                thumbnail.thumbnail((size, size), reducing_gap=3.0)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                thumbnail.save(temporary_path, "JPEG", quality=80, optimize=True)
+            except (OSError, Image.DecompressionBombError) as e:
+                raise PreviewUnavailable(f"Could not render a preview: {e}")
+        os.replace(temporary_path, path)
+        return path
@@ -0,0 +1,70 @@
+from typing import Dict
+
+# Named, pre-validated read-only queries that dashboards run by name.
+# Each entry declares the parameters it accepts and their Python types;
+# values are always sent as Cypher parameters, never interpolated.
+# $departments is bound by the server to the caller's visible departments
+# (null when unrestricted) and every Document matched is filtered by it.
+NAMED_QUERIES: Dict[str, Dict] = {
+    "graph_overview": {
+        "description": "Node counts per label",
+        "cypher": """
+            MATCH (n)
+            WHERE NOT n:Document OR $departments IS NULL OR coalesce(n.department, '') IN $departments
+            RETURN labels(n)[0] AS label, count(*) AS count
+            ORDER BY count DESC
+        """,
+        "parameters": {}
+    },
+    "document_neighbors": {
+        "description": "Documents directly connected to a document",
+        "cypher": """
+            MATCH (d:Document {id: $document_id})-[r]-(related:Document)
+            WHERE $departments IS NULL
+                OR (coalesce(d.department, '') IN $departments AND coalesce(related.department, '') IN $departments)
+            RETURN related.id AS id, related.title AS title, type(r) AS relationship
+        """,
+        "parameters": {"document_id": int}
+    },
+    "document_versions": {
+        "description": "Earlier and later versions of a document, linked by near-duplicate detection",
+        "cypher": """
+            MATCH (d:Document {id: $document_id})-[:VERSION_OF*1..50]-(version:Document)
+            WHERE $departments IS NULL
+                OR (coalesce(d.department, '') IN $departments AND coalesce(version.department, '') IN $departments)
+            RETURN DISTINCT version.id AS id, version.title AS title
+            ORDER BY id DESC
+        """,
+        "parameters": {"document_id": int}
+    },
+    "documents_by_department": {
+        "description": "Documents belonging to a department",
+        "cypher": """
+            MATCH (d:Document {department: $department})
+            WHERE $departments IS NULL OR coalesce(d.department, '') IN $departments
+            RETURN d.id AS id, d.title AS title, d.type AS type
+            ORDER BY d.created_at DESC
+        """,
+        "parameters": {"department": str}
+    },
+    "department_summary": {
+        "description": "Document counts per department and type",
+        "cypher": """
+            MATCH (d:Document)
+            WHERE $departments IS NULL OR coalesce(d.department, '') IN $departments
+            RETURN d.department AS department, d.type AS type, count(*) AS documents
+            ORDER BY documents DESC
+        """,
+        "parameters": {}
+    },
+    "user_uploads": {
+        "description": "Documents a user is connected to",
+        "cypher": """
+            MATCH (u:User {id: $user_id})-[r]->(d:Document)
+            WHERE $departments IS NULL OR coalesce(d.department, '') IN $departments
+            RETURN d.id AS id, d.title AS title, type(r) AS relationship
+            ORDER BY d.created_at DESC
+        """,
+        "parameters": {"user_id": int}
+    },
+}
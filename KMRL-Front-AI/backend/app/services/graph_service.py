@@ -1,29 +1,84 @@
-from neo4j import GraphDatabase
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+import re
+import threading
+import time
 from ..core.config import settings
+from ..core.metrics import track_stage
+from ..core.tracing import traced
+from .graph_queries import NAMED_QUERIES
+
+# Clauses that modify the graph; rejected before a query reaches the server
+WRITE_CLAUSE_PATTERN = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|IN\s+TRANSACTIONS|PERIODIC\s+COMMIT)\b",
+    re.IGNORECASE
+)
+CALL_PATTERN = re.compile(r"\bCALL\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+READ_ONLY_PROCEDURES = ("db.labels", "db.relationshipTypes", "db.propertyKeys", "db.schema.")
+LITERAL_OR_COMMENT_PATTERN = re.compile(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|`[^`]*`|//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+COUNTER_FIELDS = (
+    "nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+    "properties_set", "labels_added", "labels_removed", "indexes_added", "indexes_removed",
+    "constraints_added", "constraints_removed", "system_updates"
+)
+
+class GraphQueryError(Exception):
+    """Raised when a query is rejected or fails on the server"""
+
+class GraphQueryTimeout(GraphQueryError):
+    """Raised when a query exceeds its transaction timeout"""
+
+def validate_read_only(cypher_query: str):
+    """Reject queries containing write clauses or non-allowlisted procedure calls"""
+    stripped = LITERAL_OR_COMMENT_PATTERN.sub(" ", cypher_query)
+    match = WRITE_CLAUSE_PATTERN.search(stripped)
+    if match:
+        raise GraphQueryError(f"Write clause not allowed: {match.group(1).upper()}")
+    for procedure in CALL_PATTERN.findall(stripped):
+        if not procedure.startswith(READ_ONLY_PROCEDURES):
+            raise GraphQueryError(f"Procedure not allowed: {procedure}")
 
 class GraphService:
+    # Named queries that passed validation in this process, keyed by name
+    _validated_queries: Dict[str, str] = {}
+    
+    # One driver (and connection pool) per process; closed by the app lifespan
+    _driver = None
+    _driver_lock = threading.Lock()
+    
     def __init__(self):
         self.driver = None
         self._connect()
     
     def _connect(self):
         """Connect to Neo4j database"""
-        try:
-            self.driver = GraphDatabase.driver(
-                settings.neo4j_url,
-                auth=(settings.neo4j_user, settings.neo4j_password)
-            )
-            print("Connected to Neo4j")
-        except Exception as e:
-            print(f"Neo4j connection error: {e}")
-            self.driver = None
+        with GraphService._driver_lock:
+            if GraphService._driver is None:
+                try:
+                    from neo4j import GraphDatabase
+                    
+                    GraphService._driver = GraphDatabase.driver(
+                        settings.neo4j_url,
+                        auth=(settings.neo4j_user, settings.neo4j_password)
+                    )
+                    print("Connected to Neo4j")
+                except Exception as e:
+                    print(f"Neo4j connection error: {e}")
+        self.driver = GraphService._driver
     
     def close(self):
-        """Close Neo4j connection"""
-        if self.driver:
-            self.driver.close()
+        """Release this instance; the shared driver stays open for other requests"""
+        self.driver = None
     
+    @classmethod
+    def close_driver(cls):
+        """Close the shared Neo4j driver"""
+        with cls._driver_lock:
+            if cls._driver is not None:
+                cls._driver.close()
+                cls._driver = None
+    
+    @traced("graph.create_document_node")
     def create_document_node(self, document_id: int, title: str, doc_type: str, department: str):
         """Create a document node in the graph"""
         if not self.driver:
@@ -51,6 +106,7 @@ class GraphService:
                 print(f"Error creating document node: {e}")
                 return False
     
+    @traced("graph.create_user_node")
     def create_user_node(self, user_id: int, name: str, role: str, department: str):
         """Create a user node in the graph"""
         if not self.driver:
@@ -76,6 +132,7 @@ class GraphService:
                 print(f"Error creating user node: {e}")
                 return False
     
+    @traced("graph.create_relationship")
     def create_relationship(self, from_id: int, to_id: int, relationship_type: str, from_type: str = "User", to_type: str = "Document"):
         """Create relationship between nodes"""
         if not self.driver:
@@ -97,6 +154,33 @@ class GraphService:
                 print(f"Error creating relationship: {e}")
                 return False
     
+    @traced("graph.link_versions")
+    def link_versions(self, document_id: int, previous_id: int, similarity: float):
+        """Record that a document is a newer version or near-copy of another"""
+        if not self.driver:
+            return False
+        
+        with self.driver.session() as session:
+            try:
+                # MERGE, since documents only get a node once something links them
+                session.run(
+                    """
+                    MERGE (new:Document {id: $doc_id})
+                    MERGE (old:Document {id: $previous_id})
+                    MERGE (new)-[r:VERSION_OF]->(old)
+                    SET r.similarity = $similarity,
+                        r.updated_at = datetime()
+                    """,
+                    doc_id=document_id,
+                    previous_id=previous_id,
+                    similarity=similarity
+                )
+                return True
+            except Exception as e:
+                print(f"Error linking document versions: {e}")
+                return False
+    
+    @traced("graph.get_all_relationships")
     def get_all_relationships(self) -> Dict:
         """Get all nodes and relationships for visualization"""
         if not self.driver:
@@ -145,6 +229,7 @@ class GraphService:
                 print(f"Error getting relationships: {e}")
                 return {"nodes": [], "edges": []}
     
+    @traced("graph.execute_query")
     def execute_query(self, cypher_query: str) -> List[Dict]:
         """Execute custom Cypher query"""
         if not self.driver or not cypher_query:
@@ -158,6 +243,148 @@ class GraphService:
                 print(f"Error executing query: {e}")
                 return []
     
+    @traced("graph.run_read_query")
+    def run_read_query(
+        self,
+        cypher_query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Run a read-only query with a transaction timeout and a row cap.
+        
+        Records are pulled from the server in batches and the stream is cut off
+        once the requested page is full, so large results are never materialized.
+        """
+        if not self.driver:
+            raise GraphQueryError("Graph database not available")
+        if not cypher_query or not cypher_query.strip():
+            raise GraphQueryError("Empty query")
+        
+        from neo4j import READ_ACCESS, unit_of_work
+        from neo4j.exceptions import ClientError
+        
+        validate_read_only(cypher_query)
+        max_rows = settings.graph_query_max_rows
+        limit = max(1, min(limit or max_rows, max_rows))
+        skip = max(0, skip)
+        timeout = settings.graph_query_timeout if not timeout or timeout <= 0 else min(timeout, settings.graph_query_timeout)
+        
+        @unit_of_work(timeout=timeout)
+        def work(tx):
+            result = tx.run(cypher_query, parameters or {})
+            columns = list(result.keys())
+            rows = []
+            has_more = False
+            for index, record in enumerate(result):
+                if index < skip:
+                    continue
+                if len(rows) >= limit:
+                    has_more = True
+                    break
+                rows.append(record.data())
+            # Discards any remaining records server-side
+            summary = result.consume()
+            return columns, rows, has_more, summary
+        
+        started = time.perf_counter()
+        try:
+            with track_stage("graph_query"), self.driver.session(
+                default_access_mode=READ_ACCESS,
+                fetch_size=min(skip + limit + 1, 1000)
+            ) as session:
+                columns, rows, has_more, summary = session.execute_read(work)
+        except ClientError as e:
+            if "TransactionTimedOut" in (e.code or ""):
+                raise GraphQueryTimeout(f"Query exceeded {timeout}s timeout")
+            raise GraphQueryError(e.message or str(e))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        counters = {field: getattr(summary.counters, field, 0) for field in COUNTER_FIELDS}
+        return {
+            "columns": columns,
+            "results": rows,
+            "row_count": len(rows),
+            "skip": skip,
+            "limit": limit,
+            "has_more": has_more,
+            "next_skip": skip + len(rows) if has_more else None,
+            "execution_time_ms": round(elapsed_ms, 3),
+            "server_time_ms": {
+                "available_after": summary.result_available_after,
+                "consumed_after": summary.result_consumed_after
+            },
+            "query_type": summary.query_type,
+            "counters": counters
+        }
+    
+    @staticmethod
+    def list_named_queries() -> List[Dict]:
+        """Describe the available named queries"""
+        return [
+            {
+                "name": name,
+                "description": spec["description"],
+                "parameters": {key: value.__name__ for key, value in spec["parameters"].items()}
+            }
+            for name, spec in NAMED_QUERIES.items()
+        ]
+    
+    @traced("graph.run_named_query")
+    def run_named_query(
+        self,
+        name: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        skip: int = 0,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> Dict:
+        """Run a pre-validated named query with typed parameters, over the Documents of `departments` when given"""
+        spec = NAMED_QUERIES.get(name)
+        if spec is None:
+            raise GraphQueryError(f"Unknown query: {name}")
+        
+        parameters = parameters or {}
+        unknown = set(parameters) - set(spec["parameters"])
+        if unknown:
+            raise GraphQueryError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+        bound = {}
+        for key, expected_type in spec["parameters"].items():
+            if key not in parameters:
+                raise GraphQueryError(f"Missing parameter: {key}")
+            try:
+                bound[key] = expected_type(parameters[key])
+            except (TypeError, ValueError):
+                raise GraphQueryError(f"Parameter {key} must be {expected_type.__name__}")
+        # Not a declared parameter, so callers cannot set it themselves
+        bound["departments"] = list(departments) if departments is not None else None
+        
+        if name not in GraphService._validated_queries:
+            self._validate_named_query(name, spec["cypher"])
+        
+        result = self.run_read_query(spec["cypher"], bound, limit=limit, skip=skip)
+        result["query"] = name
+        return result
+    
+    def _validate_named_query(self, name: str, cypher_query: str):
+        """Check a named query once with EXPLAIN; the server caches its plan from then on"""
+        from neo4j import READ_ACCESS
+        from neo4j.exceptions import ClientError
+        
+        validate_read_only(cypher_query)
+        if not self.driver:
+            raise GraphQueryError("Graph database not available")
+        try:
+            with self.driver.session(default_access_mode=READ_ACCESS) as session:
+                summary = session.run("EXPLAIN " + cypher_query).consume()
+        except ClientError as e:
+            raise GraphQueryError(f"Named query {name} is invalid: {e.message or e}")
+        if summary.query_type != "r":
+            raise GraphQueryError(f"Named query {name} is not read-only")
+        GraphService._validated_queries[name] = summary.query_type
+    
+    @traced("graph.find_related_documents")
     def find_related_documents(self, document_id: int) -> List[Dict]:
         """Find documents related to a given document"""
         if not self.driver:
@@ -0,0 +1,289 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set
+import asyncio
+import os
+import socket
+import threading
+import time
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.executors import run_inference
+from ..core.metrics import INGEST_CLAIMS
+from ..models.document import Document
+from .ingestion_service import IngestionService
+
+# Lower is claimed first; unknown priorities rank as medium
+PRIORITY_RANKS = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+# Candidates read per document wanted, so claims lost to other processes can be made up
+CANDIDATES_PER_CLAIM = 4
+
+def lease_owner() -> str:
+    """host:pid of this process; computed each time, since forked workers have their own pid"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class IngestQueue:
+    """Pending documents as a work queue shared by any number of processes and hosts.
+
+    A process claims a document with a conditional UPDATE that only succeeds
+    while the document is pending or its lease has expired, so exactly one
+    claimant wins and no scheduler is needed. A thread renews the leases the
+    process holds every INGEST_HEARTBEAT_SECONDS. When a process dies its
+    leases run out after INGEST_LEASE_SECONDS and other processes reclaim the
+    documents: ingest workers in queue mode, API workers in inline mode. After
+    INGEST_MAX_ATTEMPTS claims a document is marked failed. A document is only
+    completed once every pipeline step has run, so processing is at least
+    once: a process stalled past its lease may see the document processed
+    again, and the pipeline steps replace what they derive rather than add to it.
+
+    Higher priorities are claimed first. Within a priority, departments take
+    turns, and those with documents already leased wait theirs, so a bulk
+    upload from one department does not hold up the others.
+    """
+
+    _held: Set[int] = set()
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            Document.processing_status == "pending",
+            and_(Document.processing_status == "processing", Document.lease_expires_at < now)
+        )
+
+    @staticmethod
+    def initial_state() -> Dict:
+        """Columns of a new upload: pending for the ingest workers, or leased by this process to ingest inline"""
+        if settings.ingest_mode == "queue":
+            return {"processing_status": "pending", "processing_attempts": 0}
+        return {
+            "processing_status": "processing",
+            "lease_owner": lease_owner(),
+            "lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=settings.ingest_lease_seconds),
+            "processing_attempts": 1,
+        }
+
+    @classmethod
+    def _fail_exhausted(cls, db: Session, now: datetime):
+        """Mark failed the documents whose last allowed lease expired; their processes keep dying on them"""
+        exhausted = (
+            Document.processing_status == "processing",
+            Document.lease_expires_at < now,
+            func.coalesce(Document.processing_attempts, 0) >= settings.ingest_max_attempts
+        )
+        # Runs on every claim poll; a read first keeps idle polls from taking SQLite's write lock
+        if db.query(Document.id).filter(*exhausted).first() is None:
+            return
+        failed = db.query(Document).filter(*exhausted).update(
+            {Document.processing_status: "failed", Document.lease_owner: None, Document.lease_expires_at: None},
+            synchronize_session=False
+        )
+        if failed:
+            db.commit()
+            INGEST_CLAIMS.labels(outcome="exhausted").inc(failed)
+            print(f"Ingestion gave up on {failed} document(s) after {settings.ingest_max_attempts} attempts")
+        else:
+            # Another process failed them between the read and the update
+            db.rollback()
+
+    @classmethod
+    def _candidates(cls, db: Session, now: datetime, limit: int) -> List[tuple]:
+        """(id, status) of the documents to claim next, in claim order"""
+        rank = case(PRIORITY_RANKS, value=Document.priority, else_=PRIORITY_RANKS["medium"])
+        department = func.coalesce(Document.department, "")
+        queued = (
+            select(
+                Document.id,
+                Document.processing_status.label("status"),
+                department.label("department"),
+                rank.label("rank"),
+                # Each department's place in line within its priority
+                func.row_number().over(partition_by=(department, rank), order_by=Document.id).label("position"),
+            )
+            .where(cls._claimable(now), func.coalesce(Document.processing_attempts, 0) < settings.ingest_max_attempts)
+            .subquery()
+        )
+        leased = (
+            select(department.label("department"), func.count().label("leased"))
+            .where(Document.processing_status == "processing", Document.lease_expires_at >= now)
+            .group_by(department)
+            .subquery()
+        )
+        query = (
+            select(queued.c.id, queued.c.status)
+            .outerjoin(leased, leased.c.department == queued.c.department)
+            .order_by(queued.c.rank, queued.c.position + func.coalesce(leased.c.leased, 0), queued.c.id)
+            .limit(limit)
+        )
+        return db.execute(query).all()
+
+    @classmethod
+    def claim(cls, db: Session, limit: int = 1) -> List[Document]:
+        """Lease up to `limit` documents to this process; release each when done with it"""
+        now = datetime.now(timezone.utc)
+        cls._fail_exhausted(db, now)
+        owner = lease_owner()
+        claimed = []
+        for document_id, status in cls._candidates(db, now, limit * CANDIDATES_PER_CLAIM):
+            if len(claimed) == limit:
+                break
+            won = (
+                db.query(Document)
+                .filter(Document.id == document_id, cls._claimable(now))
+                .update(
+                    {
+                        Document.processing_status: "processing",
+                        Document.lease_owner: owner,
+                        Document.lease_expires_at: now + timedelta(seconds=settings.ingest_lease_seconds),
+                        Document.processing_attempts: func.coalesce(Document.processing_attempts, 0) + 1,
+                    },
+                    synchronize_session=False
+                )
+            )
+            db.commit()
+            if not won:
+                # Another process got there first
+                INGEST_CLAIMS.labels(outcome="conflict").inc()
+                continue
+            INGEST_CLAIMS.labels(outcome="reclaimed" if status == "processing" else "claimed").inc()
+            cls.hold(document_id)
+            claimed.append(document_id)
+        if not claimed:
+            return []
+        documents = {document.id: document for document in db.query(Document).filter(Document.id.in_(claimed))}
+        return [documents[document_id] for document_id in claimed if document_id in documents]
+
+    @classmethod
+    def hold(cls, document_id: int):
+        """Renew the lease on `document_id` until it is released"""
+        with cls._lock:
+            cls._held.add(document_id)
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._heartbeat, name="ingest-heartbeat", daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def release(cls, db: Session, document_id: int):
+        """Give up the lease; a document left processing goes back to pending"""
+        # First, so a heartbeat running meanwhile does not report the lease as lost
+        with cls._lock:
+            cls._held.discard(document_id)
+        db.query(Document).filter(Document.id == document_id, Document.lease_owner == lease_owner()).update(
+            {
+                Document.lease_owner: None,
+                Document.lease_expires_at: None,
+                Document.processing_status: case(
+                    (Document.processing_status == "processing", "pending"), else_=Document.processing_status
+                ),
+            },
+            synchronize_session=False
+        )
+        db.commit()
+
+    @classmethod
+    def start(cls):
+        """In inline mode, have this API worker take over documents whose uploading worker died;
+        in queue mode the ingest workers do"""
+        if cls._task is None and settings.ingest_mode == "inline" and settings.ingest_reclaim_seconds > 0:
+            cls._task = asyncio.get_running_loop().create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            await asyncio.sleep(settings.ingest_reclaim_seconds)
+            try:
+                # One at a time, so uploads are not kept off the inference pool for long
+                while await run_inference(cls.process_next):
+                    pass
+            except Exception as e:
+                print(f"Ingestion reclaim error: {e}")
+
+    @classmethod
+    def process_next(cls) -> Optional[str]:
+        """Claim and process one document; returns its final status, or None if there was none to claim"""
+        db = SessionLocal()
+        try:
+            documents = cls.claim(db)
+            if not documents:
+                return None
+            document = documents[0]
+            try:
+                return IngestionService(db).process(document).processing_status
+            except Exception as e:
+                print(f"Ingestion error for document {document.id}: {e}")
+                db.rollback()
+                return "failed"
+            finally:
+                cls.release(db, document.id)
+        finally:
+            db.close()
+
+    @classmethod
+    def _heartbeat(cls):
+        while True:
+            time.sleep(settings.ingest_heartbeat_seconds)
+            with cls._lock:
+                held = list(cls._held)
+            if not held:
+                continue
+            try:
+                lost = cls._renew(held)
+            except Exception as e:
+                print(f"Ingestion lease renewal failed: {e}")
+                continue
+            with cls._lock:
+                # Released meanwhile is not lost
+                lost &= cls._held
+                cls._held -= lost
+            if lost:
+                INGEST_CLAIMS.labels(outcome="lost").inc(len(lost))
+                print(f"Ingestion leases lost, documents may be processed again elsewhere: {sorted(lost)}")
+
+    @staticmethod
+    def _renew(held: List[int]) -> Set[int]:
+        """Extend this process's leases on `held`; returns those it no longer holds"""
+        owner = lease_owner()
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Document)
+                .where(Document.id.in_(held), Document.lease_owner == owner, Document.processing_status == "processing")
+                .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.ingest_lease_seconds))
+            )
+            kept = {
+                row[0] for row in db.query(Document.id).filter(Document.id.in_(held), Document.lease_owner == owner)
+            }
+            db.commit()
+        finally:
+            db.close()
+        return set(held) - kept
+
+    @staticmethod
+    def status(db: Session) -> Dict:
+        """Documents per processing status, and live and expired leases per process"""
+        now = datetime.now(timezone.utc)
+        counts = dict(db.query(Document.processing_status, func.count()).group_by(Document.processing_status).all())
+        leases: Dict[str, Dict[str, int]] = {}
+        rows = (
+            db.query(Document.lease_owner, Document.lease_expires_at < now, func.count())
+            .filter(Document.processing_status == "processing", Document.lease_owner.isnot(None))
+            .group_by(Document.lease_owner, Document.lease_expires_at < now)
+        )
+        for owner, expired, count in rows:
+            leases.setdefault(owner, {"live": 0, "expired": 0})["expired" if expired else "live"] += count
+        return {"mode": settings.ingest_mode, "documents": counts, "leases": leases}
@@ -0,0 +1,98 @@
+from sqlalchemy.orm import Session
+
+from ..core.metrics import track_stage
+from ..core.tracing import span
+from ..models.document import Document
+from .classifier_service import apply_classification, classify_texts
+from .dedup_service import DedupService
+from .entity_service import EntityService
+from .ocr_service import OCRService
+from .related_service import RelatedDocumentsService
+from .search_service import SearchService
+from .storage import get_storage
+from .subscription_service import PercolatorService
+from .suggest_service import SuggestIndex
+
+class IngestionService:
+    """Runs the processing pipeline for a newly uploaded document"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def process(self, document: Document) -> Document:
+        """Extract text, then precompute derived data for the document"""
+        try:
+            ocr_service = OCRService()
+            with track_stage("ocr"), get_storage(document.file_path).local_copy(document.file_path) as path:
+                extracted_text, confidence = ocr_service.extract_text(path)
+
+            document.extracted_text = extracted_text
+            document.ocr_confidence = confidence
+            document.language = ocr_service.detect_language(extracted_text)
+
+            with span("db.commit"):
+                self.db.commit()
+            self.db.refresh(document)
+        except Exception as e:
+            print(f"Ingestion error for document {document.id}: {e}")
+            document.processing_status = "failed"
+            self.db.commit()
+            return document
+
+        # Derived data is best-effort; a failure here must not fail the upload
+        try:
+            with track_stage("classify"):
+                apply_classification(document, classify_texts([document.extracted_text or ""])[0])
+            self.db.commit()
+        except Exception as e:
+            print(f"Classification error for document {document.id}: {e}")
+            self.db.rollback()
+
+        try:
+            with track_stage("entities"):
+                EntityService(self.db).index_document(document)
+        except Exception as e:
+            print(f"Entity extraction error for document {document.id}: {e}")
+            self.db.rollback()
+
+        try:
+            with track_stage("suggest"):
+                SuggestIndex.index_document(self.db, document)
+        except Exception as e:
+            print(f"Suggestion indexing error for document {document.id}: {e}")
+            self.db.rollback()
+
+        try:
+            with track_stage("search_index"):
+                SearchService(self.db).index_document(document)
+        except Exception as e:
+            print(f"Search indexing error for document {document.id}: {e}")
+            self.db.rollback()
+
+        try:
+            with track_stage("dedup"):
+                DedupService(self.db).index_document(document)
+        except Exception as e:
+            print(f"Near-duplicate detection error for document {document.id}: {e}")
+            self.db.rollback()
+
+        try:
+            with track_stage("related"):
+                RelatedDocumentsService(self.db).index_document(document)
+        except Exception as e:
+            print(f"Related documents indexing error for document {document.id}: {e}")
+            self.db.rollback()
+
+        # Last, so subscriptions filtering on type or priority see the classification
+        try:
+            with track_stage("percolate"):
+                PercolatorService(self.db).percolate(document)
+        except Exception as e:
+            print(f"Subscription matching error for document {document.id}: {e}")
+            self.db.rollback()
+
+        # Only now: a process that dies before this leaves the document processing,
+        # so its lease expires and another process runs the derived steps again
+        document.processing_status = "completed"
+        self.db.commit()
+        return document
@@ -0,0 +1,121 @@
+from typing import Optional
+import os
+
+from ..core.config import settings
+
+BACKENDS = ("pytorch", "quantized", "onnx")
+
+_threads_configured = False
+
+def configure_threads():
+    """Apply INFERENCE_THREADS to torch once per process"""
+    global _threads_configured
+    if _threads_configured or settings.inference_threads <= 0:
+        return
+    import torch
+
+    torch.set_num_threads(settings.inference_threads)
+    try:
+        torch.set_num_interop_threads(max(1, settings.inference_threads // 2))
+    except RuntimeError:
+        # Only allowed before any parallel work has started
+        pass
+    _threads_configured = True
+
+def _resolve(backend: Optional[str]) -> str:
+    backend = (backend or settings.inference_backend).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return backend
+
+def _artifact_dir(kind: str, model_name: str) -> str:
+    """Converted model artifacts live next to the Hugging Face cache"""
+    return os.path.join(settings.huggingface_cache_dir, kind, model_name.replace("/", "--"))
+
+def model_id(model_name: str, backend: Optional[str] = None) -> str:
+    """Identifies the weights actually used, so outputs can be keyed by it"""
+    return f"{model_name}@{_resolve(backend)}"
+
+def load_summarizer(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """Summarization pipeline on CPU for the configured backend"""
+    from transformers import AutoTokenizer, pipeline
+
+    backend = _resolve(backend)
+    model_name = model_name or settings.summarization_model
+    configure_threads()
+    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=settings.huggingface_cache_dir)
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        import onnxruntime
+
+        export_dir = _artifact_dir("onnx", model_name)
+        session_options = onnxruntime.SessionOptions()
+        if settings.inference_threads > 0:
+            session_options.intra_op_num_threads = settings.inference_threads
+        if os.path.exists(os.path.join(export_dir, "config.json")):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, session_options=session_options)
+        else:
+            model = ORTModelForSeq2SeqLM.from_pretrained(
+                model_name,
+                export=True,
+                cache_dir=settings.huggingface_cache_dir,
+                session_options=session_options
+            )
+            model.save_pretrained(export_dir)
+            tokenizer.save_pretrained(export_dir)
+        return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    if backend == "quantized":
+        # Only tensors are stored, so loading the artifact cannot run pickled code
+        artifact = os.path.join(_artifact_dir("quantized", model_name), "state_dict.pt")
+        if os.path.exists(artifact):
+            from transformers import AutoConfig
+
+            # The quantized module structure, without reading the float weights, then the saved int8 ones
+            config = AutoConfig.from_pretrained(model_name, cache_dir=settings.huggingface_cache_dir)
+            model = torch.quantization.quantize_dynamic(
+                AutoModelForSeq2SeqLM.from_config(config), {torch.nn.Linear}, dtype=torch.qint8
+            )
+            model.load_state_dict(torch.load(artifact, weights_only=True))
+        else:
+            model = AutoModelForSeq2SeqLM.from_pretrained(model_name, cache_dir=settings.huggingface_cache_dir)
+            # int8 weights for every Linear layer; activations are quantized on the fly
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            os.makedirs(os.path.dirname(artifact), exist_ok=True)
+            # Renamed into place, so a concurrent load never reads a partial file
+            temporary_path = f"{artifact}.{os.getpid()}.tmp"
+            torch.save(model.state_dict(), temporary_path)
+            os.replace(temporary_path, artifact)
+    else:
+        model = AutoModelForSeq2SeqLM.from_pretrained(model_name, cache_dir=settings.huggingface_cache_dir)
+
+    model.eval()
+    return pipeline("summarization", model=model, tokenizer=tokenizer, device=-1)
+
+def load_embedder(backend: Optional[str] = None, model_name: Optional[str] = None):
+    """SentenceTransformer on CPU for the configured backend"""
+    from sentence_transformers import SentenceTransformer
+
+    backend = _resolve(backend)
+    model_name = model_name or settings.embedding_model
+    configure_threads()
+
+    if backend == "onnx":
+        # sentence-transformers exports to ONNX itself and caches the export
+        return SentenceTransformer(
+            model_name,
+            cache_folder=settings.huggingface_cache_dir,
+            device="cpu",
+            backend="onnx"
+        )
+
+    model = SentenceTransformer(model_name, cache_folder=settings.huggingface_cache_dir, device="cpu")
+    if backend == "quantized":
+        import torch
+
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
@@ -0,0 +1,88 @@
+from typing import Callable, Dict, List
+import threading
+import time
+
+from ..core.metrics import record_model_load
+
+# Loaders import their service on call, so the registry itself is cheap to import.
+# Each returns None when the model could not be loaded.
+def _load_embedding():
+    from .embedding_service import EmbeddingService
+    return EmbeddingService()._load_model()
+
+def _load_summarizer():
+    from .ai_service import AIService
+    return AIService()._load_models()
+
+def _load_classifier():
+    from .classifier_service import DocumentClassifier
+    return DocumentClassifier.load()
+
+def _load_ner():
+    from .entity_service import EntityService
+    return EntityService()._load_ner()
+
+def _load_chat():
+    from .chat_service import Generator
+    return Generator.load()
+
+def _load_ocr():
+    import cv2
+    import pytesseract
+    return pytesseract.get_tesseract_version()
+
+def _load_graph():
+    from .graph_service import GraphService
+    driver = GraphService().driver
+    if driver is not None:
+        driver.verify_connectivity()
+    return driver
+
+class ModelRegistry:
+    """Named model loaders with their load state, for warm-up and readiness"""
+
+    LOADERS: Dict[str, Callable] = {
+        "embedding": _load_embedding,
+        "summarizer": _load_summarizer,
+        "classifier": _load_classifier,
+        "ner": _load_ner,
+        "chat": _load_chat,
+        "ocr": _load_ocr,
+        "graph": _load_graph,
+    }
+
+    _status: Dict[str, Dict] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls, name: str) -> bool:
+        if name not in cls.LOADERS:
+            raise ValueError(f"Unknown model: {name}")
+        with cls._lock:
+            cls._status[name] = {"state": "loading"}
+        started = time.perf_counter()
+        try:
+            loaded = cls.LOADERS[name]() is not None
+            error = None if loaded else "not available"
+        except Exception as e:
+            loaded, error = False, str(e)
+        record_model_load(name, started, loaded)
+        with cls._lock:
+            cls._status[name] = {
+                "state": "ready" if loaded else "failed",
+                "seconds": round(time.perf_counter() - started, 3),
+                **({"error": error} if error else {})
+            }
+        return loaded
+
+    @classmethod
+    def warm_up(cls, names: List[str]) -> Dict[str, Dict]:
+        """Load models one after another; a failure is recorded, not raised"""
+        for name in names:
+            cls.load(name)
+        return cls.status()
+
+    @classmethod
+    def status(cls) -> Dict[str, Dict]:
+        with cls._lock:
+            return {name: dict(state) for name, state in cls._status.items()}
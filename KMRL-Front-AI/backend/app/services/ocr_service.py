@@ -1,9 +1,17 @@
-import pytesseract
-import cv2
-import numpy as np
-from PIL import Image
 import os
-from typing import Tuple
+from typing import Optional, Tuple
+
+from ..core.tracing import span
+
+# Stored as the extracted text when nothing could be read from the file
+PDF_PLACEHOLDER = "PDF text extraction not implemented yet"
+ERROR_PREFIX = "Error extracting text:"
+
+def has_extracted_text(text: Optional[str], confidence: Optional[float]) -> bool:
+    """False for empty text and for the placeholder or error text stored when extraction failed"""
+    if not (text or "").strip() or confidence == 0:
+        return False
+    return text != PDF_PLACEHOLDER and not text.startswith(ERROR_PREFIX)
 
 class OCRService:
     def __init__(self):
@@ -11,32 +19,45 @@ class OCRService:
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
         pass
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    def preprocess_image(self, image_path: str):
         """Preprocess image for better OCR results"""
-        image = cv2.imread(image_path)
+        # OpenCV is only needed for image uploads; keep it out of process startup
+        import cv2
+        
+        with span("ocr.read_image"):
+            image = cv2.imread(image_path)
         
         # Convert to grayscale
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
         # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray)
+        with span("ocr.denoise", height=gray.shape[0], width=gray.shape[1]):
+            denoised = cv2.fastNlMeansDenoising(gray)
         
         # Apply threshold to get binary image
-        _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        with span("ocr.threshold"):
+            _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
         return thresh
     
     def extract_text(self, file_path: str) -> Tuple[str, float]:
         """Extract text from document using OCR"""
+        with span("ocr.extract_text", file_extension=os.path.splitext(file_path)[1].lower()):
+            return self._extract_text(file_path)
+    
+    def _extract_text(self, file_path: str) -> Tuple[str, float]:
         try:
             file_extension = os.path.splitext(file_path)[1].lower()
             
             if file_extension in ['.jpg', '.jpeg', '.png', '.tiff', '.bmp']:
                 # Image file - use OCR
+                import pytesseract
+                
                 processed_image = self.preprocess_image(file_path)
                 
                 # Get OCR data with confidence
-                ocr_data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT)
+                with span("ocr.tesseract"):
+                    ocr_data = pytesseract.image_to_data(processed_image, output_type=pytesseract.Output.DICT)
                 
                 # Extract text and calculate average confidence
                 text_parts = []
@@ -57,7 +78,7 @@ class OCRService:
             elif file_extension == '.pdf':
                 # For PDF files, we'd need additional libraries like PyPDF2 or pdfplumber
                 # For now, return placeholder
-                return "PDF text extraction not implemented yet", 0.0
+                return PDF_PLACEHOLDER, 0.0
                 
             else:
                 # Try to read as text file
@@ -67,7 +88,7 @@ class OCRService:
                 
         except Exception as e:
             print(f"OCR Error: {str(e)}")
-            return f"Error extracting text: {str(e)}", 0.0
+            return f"{ERROR_PREFIX} {str(e)}", 0.0
     
     def detect_language(self, text: str) -> str:
         """Detect language of extracted text"""
@@ -0,0 +1,330 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set, Tuple
+import math
+import numpy as np
+
+from ..core.access import restrict
+from ..core.config import settings
+from ..core.metrics import track_stage
+from ..models.document import Document
+from ..models.entity import DocumentEntity
+from ..models.related import DocumentFeatures, RelatedDocument
+from ..models.search import DocumentChunk
+from .embedding_service import EmbeddingService
+from .graph_service import GraphService
+from .ocr_service import has_extracted_text
+from .vector_store import VectorIndex
+
+# Weight of each signal in the combined relatedness score
+GRAPH_WEIGHT = 0.3
+EMBEDDING_WEIGHT = 0.4
+ENTITY_WEIGHT = 0.3
+
+# Pairs scoring below this are not worth listing as related
+MIN_SCORE = 0.1
+
+# Only the head of the text is embedded; enough to capture the topic
+EMBEDDING_TEXT_CHARS = 4000
+
+# Nearest chunks fetched from the vector index per related document wanted;
+# a document usually owns several of them
+CANDIDATE_CHUNKS_PER_RESULT = 20
+
+class RelatedDocumentsService:
+    def __init__(
+        self,
+        db: Session,
+        graph_service: Optional[GraphService] = None,
+        embedding_service: Optional[EmbeddingService] = None
+    ):
+        self.db = db
+        self.graph_service = graph_service
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.top_k = settings.related_top_k
+
+    def get_related(
+        self,
+        document_id: int,
+        limit: Optional[int] = None,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict]:
+        """Return the precomputed related documents in rank order, only from `departments` when given"""
+        rows = (
+            restrict(
+                self.db.query(RelatedDocument, Document)
+                .join(Document, Document.id == RelatedDocument.related_document_id)
+                .filter(RelatedDocument.document_id == document_id),
+                Document.department,
+                departments
+            )
+            .order_by(RelatedDocument.rank)
+            .limit(limit or self.top_k)
+            .all()
+        )
+        return [
+            {
+                "document_id": related.related_document_id,
+                "title": document.title,
+                "document_type": document.document_type,
+                "department": document.department,
+                "score": related.score,
+                "sources": related.sources.split(",") if related.sources else []
+            }
+            for related, document in rows
+        ]
+
+    def index_document(self, document: Document):
+        """Compute signals for a document, store its top-K list and update its neighbors.
+        
+        Expects the document's entities and search chunks to be indexed already.
+        On re-ingestion the lists that referenced the document are recomputed
+        too, since its old scores in them no longer hold.
+        """
+        if not has_extracted_text(document.extracted_text, document.ocr_confidence):
+            self.remove_document(document.id)
+            return
+        reindexed = self.db.query(DocumentFeatures.document_id).filter(
+            DocumentFeatures.document_id == document.id
+        ).first() is not None
+        self._update_features(document)
+        if reindexed:
+            self.refresh_neighbors(document.id)
+        scored = self._score_candidates(document.id)
+        self._store_list(document.id, scored)
+        self._propagate(document.id, scored)
+        self.db.commit()
+
+    def refresh_neighbors(self, document_id: int):
+        """Recompute the lists of every document currently pointing at document_id"""
+        referrers = [
+            row[0] for row in self.db.query(RelatedDocument.document_id)
+            .filter(RelatedDocument.related_document_id == document_id)
+            .distinct()
+            .all()
+        ]
+        for referrer_id in referrers:
+            self._store_list(referrer_id, self._score_candidates(referrer_id))
+        self.db.commit()
+
+    def remove_document(self, document_id: int):
+        """Drop a document's signals and lists, then repair lists that referenced it"""
+        self.db.query(RelatedDocument).filter(RelatedDocument.document_id == document_id).delete()
+        self.db.query(DocumentFeatures).filter(DocumentFeatures.document_id == document_id).delete()
+        self.db.commit()
+        self.refresh_neighbors(document_id)
+
+    def _update_features(self, document: Document):
+        text = document.extracted_text or ""
+        embedding = None
+        if text.strip() and self.embedding_service.available:
+            vectors = self.embedding_service.encode([text[:EMBEDDING_TEXT_CHARS]])
+            if vectors.size:
+                embedding = EmbeddingService.to_bytes(vectors[0])
+
+        features = self.db.query(DocumentFeatures).filter(
+            DocumentFeatures.document_id == document.id
+        ).first()
+        if not features:
+            features = DocumentFeatures(document_id=document.id)
+            self.db.add(features)
+        features.embedding = embedding
+        self.db.flush()
+
+    def _graph_neighbors(self, document_id: int) -> Set[int]:
+        if self.graph_service is None:
+            self.graph_service = GraphService()
+        neighbors = set()
+        with track_stage("graph_neighbors"):
+            related_documents = self.graph_service.find_related_documents(document_id)
+        for related in related_documents:
+            related_id = related["document"].get("id")
+            if isinstance(related_id, int) and related_id != document_id:
+                neighbors.add(related_id)
+        return neighbors
+
+    def _entity_overlap(self, document_id: int) -> Dict[int, float]:
+        """IDF-weighted cosine overlap between the document's entities and each other document's"""
+        def entity_keys(document_ids):
+            rows = (
+                self.db.query(DocumentEntity.document_id, DocumentEntity.label, DocumentEntity.normalized)
+                .filter(DocumentEntity.document_id.in_(document_ids))
+                .distinct()
+                .all()
+            )
+            keys: Dict[int, Set[tuple]] = {}
+            for row_document_id, label, normalized in rows:
+                keys.setdefault(row_document_id, set()).add((label, normalized))
+            return keys
+
+        target_keys = entity_keys([document_id]).get(document_id, set())
+        if not target_keys:
+            return {}
+
+        # Candidates are only the documents sharing at least one entity (index lookups)
+        candidate_ids = set()
+        for label, normalized in target_keys:
+            candidate_ids.update(
+                row[0] for row in self.db.query(DocumentEntity.document_id)
+                .filter(DocumentEntity.label == label, DocumentEntity.normalized == normalized)
+                .distinct()
+                .all()
+            )
+        candidate_ids.discard(document_id)
+        if not candidate_ids:
+            return {}
+
+        keys_by_document = entity_keys(list(candidate_ids))
+        keys_by_document[document_id] = target_keys
+        all_keys = set().union(*keys_by_document.values())
+
+        document_frequency: Dict[tuple, int] = {}
+        rows = (
+            self.db.query(DocumentEntity.label, DocumentEntity.normalized, func.count(func.distinct(DocumentEntity.document_id)))
+            .filter(DocumentEntity.normalized.in_({key[1] for key in all_keys}))
+            .group_by(DocumentEntity.label, DocumentEntity.normalized)
+            .all()
+        )
+        for label, normalized, count in rows:
+            document_frequency[(label, normalized)] = count
+
+        # BM25-style IDF: entities mentioned in nearly every document weigh almost nothing
+        total = self.db.query(func.count(func.distinct(DocumentEntity.document_id))).scalar() or 0
+        def idf(key):
+            df = document_frequency.get(key, 1)
+            return math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+        def norm(keys):
+            return math.sqrt(sum(idf(key) ** 2 for key in keys))
+
+        target_norm = norm(target_keys)
+        overlap: Dict[int, float] = {}
+        for candidate_id in candidate_ids:
+            candidate_keys = keys_by_document.get(candidate_id, set())
+            denominator = target_norm * norm(candidate_keys)
+            if denominator > 0:
+                shared = sum(idf(key) ** 2 for key in target_keys & candidate_keys)
+                overlap[candidate_id] = shared / denominator
+        return overlap
+
+    def _vector_candidates(self, embedding: np.ndarray) -> Set[int]:
+        """Documents owning the chunks nearest to `embedding` in the vector index"""
+        if not VectorIndex.available():
+            return set()
+        hits = VectorIndex.search(embedding, self.top_k * CANDIDATE_CHUNKS_PER_RESULT)
+        if not hits:
+            return set()
+        return {
+            row[0] for row in self.db.query(DocumentChunk.document_id)
+            .filter(DocumentChunk.id.in_([chunk_id for chunk_id, _ in hits]))
+            .distinct()
+        }
+
+    def _score_candidates(self, document_id: int) -> List[Dict]:
+        """Score the likely neighbors of document_id and keep the best top_k.
+
+        Candidates are the documents nearest to it in the vector index, those
+        sharing its entities and its graph neighbors; only their features are
+        read, so the cost does not grow with the corpus.
+        """
+        target = self.db.query(DocumentFeatures.embedding).filter(DocumentFeatures.document_id == document_id).first()
+        if target is None:
+            return []
+        query = EmbeddingService.from_bytes(target[0]) if target[0] is not None else None
+
+        entity_weights = self._entity_overlap(document_id)
+        graph_neighbors = self._graph_neighbors(document_id)
+        candidate_ids = set(entity_weights) | graph_neighbors
+        if query is not None:
+            candidate_ids |= self._vector_candidates(query)
+        candidate_ids.discard(document_id)
+        features = dict(
+            self.db.query(DocumentFeatures.document_id, DocumentFeatures.embedding)
+            .filter(DocumentFeatures.document_id.in_(candidate_ids))
+            .all()
+        ) if candidate_ids else {}
+
+        scores: Dict[int, float] = {}
+        sources: Dict[int, List[str]] = {}
+
+        def add(candidate_id: int, value: float, source: str):
+            scores[candidate_id] = scores.get(candidate_id, 0.0) + value
+            sources.setdefault(candidate_id, []).append(source)
+
+        # Embedding similarity, vectorized over the candidates
+        if query is not None:
+            with_vectors = [
+                (candidate_id, embedding) for candidate_id, embedding in features.items()
+                if embedding is not None and len(embedding) == len(target[0])
+            ]
+            if with_vectors:
+                matrix = np.vstack([EmbeddingService.from_bytes(embedding) for _, embedding in with_vectors])
+                similarities = matrix @ query
+                for (candidate_id, _), similarity in zip(with_vectors, similarities):
+                    if similarity > 0:
+                        add(candidate_id, EMBEDDING_WEIGHT * float(similarity), "embedding")
+
+        # Shared entities, weighted by inverse document frequency so that
+        # entities mentioned everywhere (e.g. "KMRL") contribute little
+        for candidate_id, weight in entity_weights.items():
+            if candidate_id in features and weight > 0:
+                add(candidate_id, ENTITY_WEIGHT * weight, "entities")
+
+        # Explicit graph edges, to documents still indexed here
+        for neighbor_id in graph_neighbors:
+            if neighbor_id in features:
+                add(neighbor_id, GRAPH_WEIGHT, "graph")
+
+        ranked = sorted(
+            (
+                {"related_document_id": candidate_id, "score": score, "sources": sources[candidate_id]}
+                for candidate_id, score in scores.items()
+                if score >= MIN_SCORE
+            ),
+            key=lambda item: item["score"],
+            reverse=True
+        )
+        return ranked[:self.top_k]
+
+    def _store_list(self, document_id: int, scored: List[Dict]):
+        self.db.query(RelatedDocument).filter(RelatedDocument.document_id == document_id).delete()
+        for rank, item in enumerate(scored):
+            self.db.add(RelatedDocument(
+                document_id=document_id,
+                related_document_id=item["related_document_id"],
+                rank=rank,
+                score=item["score"],
+                sources=",".join(item["sources"])
+            ))
+        self.db.flush()
+
+    def _propagate(self, document_id: int, scored: List[Dict]):
+        """Insert document_id into each neighbor's list if it beats their current top-K"""
+        for item in scored:
+            neighbor_id = item["related_document_id"]
+            current = (
+                self.db.query(RelatedDocument)
+                .filter(RelatedDocument.document_id == neighbor_id)
+                .order_by(RelatedDocument.rank)
+                .all()
+            )
+            already_listed = any(row.related_document_id == document_id for row in current)
+            entries = [
+                {
+                    "related_document_id": row.related_document_id,
+                    "score": row.score,
+                    "sources": row.sources.split(",") if row.sources else []
+                }
+                for row in current
+                if row.related_document_id != document_id
+            ]
+            if not already_listed and len(entries) >= self.top_k and entries[-1]["score"] >= item["score"]:
+                continue
+
+            entries.append({
+                "related_document_id": document_id,
+                "score": item["score"],
+                "sources": item["sources"]
+            })
+            entries.sort(key=lambda entry: entry["score"], reverse=True)
+            self._store_list(neighbor_id, entries[:self.top_k])
@@ -0,0 +1,303 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import re
+import threading
+import time
+import numpy as np
+
+from ..core.access import restrict
+from ..core.config import settings
+from ..core.invalidation import Invalidation
+from ..models.document import Document
+from ..models.search import DocumentChunk
+from .embedding_service import EmbeddingService
+from .vector_store import VectorIndex, clear_bits, set_bits, shard_key
+
+# Passage size for retrieval; small enough that several fit in a chat context
+CHUNK_CHARS = 800
+CHUNK_OVERLAP = 100
+
+# Reciprocal rank fusion constant
+RRF_K = 60
+
+FTS_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def split_pages(extracted_text: str) -> List[str]:
+    """Pages are separated by form feeds; text without them is a single page"""
+    return extracted_text.split("\f") if "\f" in extracted_text else [extracted_text]
+
+def chunk_text(extracted_text: str) -> List[Dict]:
+    """Split text into overlapping passages, never crossing a page boundary"""
+    chunks = []
+    offset = 0
+    for page_number, page in enumerate(split_pages(extracted_text), start=1):
+        position = 0
+        while position < len(page):
+            end = min(position + CHUNK_CHARS, len(page))
+            if end < len(page):
+                split = page.rfind(" ", position + CHUNK_CHARS // 2, end)
+                if split > position:
+                    end = split
+            passage = page[position:end].strip()
+            if passage:
+                chunks.append({"page": page_number, "char_start": offset + position, "text": passage})
+            if end >= len(page):
+                break
+            position = max(end - CHUNK_OVERLAP, position + 1)
+        offset += len(page) + 1
+    return chunks
+
+class ChunkAccessIndex:
+    """Bitmaps of chunk ids per department, for filtering inside the vector index.
+
+    Bit i of a department's bitmap is set when chunk i belongs to one of its
+    documents ('' for documents without a department). Loaded from the
+    database on first use and kept up to date as documents are indexed.
+    """
+
+    _bitmaps: Optional[Dict[str, np.ndarray]] = None
+    _watermark = 0  # every chunk up to this id has been read from the database
+    _refreshed_at = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _read(cls, db: Session) -> Dict[str, List[int]]:
+        """Chunk ids per department of the chunks after the watermark, which is moved past them"""
+        ids: Dict[str, List[int]] = {}
+        rows = db.execute(text(
+            "SELECT c.id, COALESCE(d.department, '') FROM document_chunks c JOIN documents d ON d.id = c.document_id "
+            "WHERE c.id > :watermark"
+        ), {"watermark": cls._watermark})
+        for chunk_id, department in rows:
+            ids.setdefault(department, []).append(chunk_id)
+            cls._watermark = max(cls._watermark, chunk_id)
+        return ids
+
+    @classmethod
+    def _load(cls, db: Session) -> Dict[str, np.ndarray]:
+        if cls._bitmaps is None:
+            cls._watermark = 0
+            cls._bitmaps = {
+                department: set_bits(np.zeros(0, dtype=np.uint8), np.asarray(chunk_ids, dtype=np.int64))
+                for department, chunk_ids in cls._read(db).items()
+            }
+            cls._refreshed_at = time.monotonic()
+        elif settings.cache_refresh_seconds > 0 and time.monotonic() - cls._refreshed_at >= settings.cache_refresh_seconds:
+            # Chunks added by processes on other hosts, whose messages do not reach this one
+            cls._refreshed_at = time.monotonic()
+            for department, chunk_ids in cls._read(db).items():
+                bitmap = cls._bitmaps.get(department, np.zeros(0, dtype=np.uint8))
+                cls._bitmaps[department] = set_bits(bitmap, np.asarray(chunk_ids, dtype=np.int64))
+        return cls._bitmaps
+
+    @classmethod
+    def _add(cls, department: Optional[str], ids: List[int]):
+        with cls._lock:
+            # Not loaded yet: the first load reads these chunks from the database
+            if cls._bitmaps is None or not ids:
+                return
+            bitmap = cls._bitmaps.get(department or "", np.zeros(0, dtype=np.uint8))
+            cls._bitmaps[department or ""] = set_bits(bitmap, np.asarray(ids, dtype=np.int64))
+
+    @classmethod
+    def _remove(cls, ids: List[int]):
+        with cls._lock:
+            if cls._bitmaps is None or not ids:
+                return
+            ids = np.asarray(ids, dtype=np.int64)
+            for bitmap in cls._bitmaps.values():
+                clear_bits(bitmap, ids)
+
+    @classmethod
+    def add(cls, department: Optional[str], ids: List[int]):
+        cls._add(department, ids)
+        if ids:
+            Invalidation.publish("chunks", {"department": department, "added": ids})
+
+    @classmethod
+    def remove(cls, ids: List[int]):
+        cls._remove(ids)
+        if ids:
+            Invalidation.publish("chunks", {"removed": ids})
+
+    @classmethod
+    def _invalidate(cls, message: Dict):
+        """Apply a change another process made; reload from the database after a reset"""
+        if message.get("reset"):
+            with cls._lock:
+                cls._bitmaps = None
+        elif "added" in message:
+            cls._add(message["department"], message["added"])
+        else:
+            cls._remove(message["removed"])
+
+    @classmethod
+    def allowed(cls, db: Session, departments: Tuple[str, ...]) -> np.ndarray:
+        """Union of the departments' bitmaps"""
+        with cls._lock:
+            bitmaps = [bitmap for department, bitmap in cls._load(db).items() if department in departments]
+            allowed = np.zeros(max((bitmap.size for bitmap in bitmaps), default=0), dtype=np.uint8)
+            for bitmap in bitmaps:
+                allowed[:bitmap.size] |= bitmap
+            return allowed
+
+Invalidation.subscribe("chunks", ChunkAccessIndex._invalidate)
+
+class SearchService:
+    """Hybrid lexical (FTS5) and vector (FAISS) retrieval over document chunks.
+
+    With `departments` (see core.access.visible_departments), both retrievers
+    only consider chunks of documents in those departments, so restricted
+    users get a full top-k rather than what is left of one after filtering.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        embedding_service: Optional[EmbeddingService] = None,
+        departments: Optional[Tuple[str, ...]] = None
+    ):
+        self.db = db
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.departments = departments
+
+    def index_document(self, document: Document):
+        """(Re)build the chunks and vectors of a document"""
+        self.remove_document(document.id)
+        if not document.extracted_text:
+            return
+
+        chunks = [
+            DocumentChunk(document_id=document.id, chunk_index=index, **chunk)
+            for index, chunk in enumerate(chunk_text(document.extracted_text))
+        ]
+        self.db.add_all(chunks)
+        self.db.commit()
+
+        if chunks and self.embedding_service.available:
+            vectors = self.embedding_service.encode([chunk.text for chunk in chunks])
+            VectorIndex.add([chunk.id for chunk in chunks], vectors, shard_key(document.department, document.created_at))
+        ChunkAccessIndex.add(document.department, [chunk.id for chunk in chunks])
+
+    def remove_document(self, document_id: int):
+        chunk_ids = [
+            row[0] for row in self.db.query(DocumentChunk.id)
+            .filter(DocumentChunk.document_id == document_id)
+            .all()
+        ]
+        if not chunk_ids:
+            return
+        VectorIndex.remove(chunk_ids)
+        ChunkAccessIndex.remove(chunk_ids)
+        self.db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
+        self.db.commit()
+
+    def encode_query(self, query: str) -> Optional[np.ndarray]:
+        if not self.embedding_service.available:
+            return None
+        vectors = self.embedding_service.encode([query])
+        return vectors[0] if vectors.size else None
+
+    def _lexical(self, query: str, k: int) -> List[int]:
+        terms = FTS_TOKEN_PATTERN.findall(query)
+        if not terms or self.db.bind.dialect.name != "sqlite":
+            return []
+        # Quote every term so user input cannot inject FTS5 syntax
+        match = " OR ".join('"' + term.replace('"', "") + '"' for term in terms)
+        if self.departments is None:
+            rows = self.db.execute(
+                text("SELECT rowid FROM document_chunks_fts WHERE document_chunks_fts MATCH :match ORDER BY rank LIMIT :k"),
+                {"match": match, "k": k}
+            ).fetchall()
+            return [row[0] for row in rows]
+
+        # Matches stream out of FTS5 in rank order; the department check is two
+        # primary key lookups each, and the scan stops at k allowed chunks
+        parameters = {"match": match, "k": k}
+        for position, department in enumerate(self.departments):
+            parameters[f"department_{position}"] = department
+        allowed = ", ".join(f":department_{position}" for position in range(len(self.departments)))
+        rows = self.db.execute(
+            text(f"""
+                SELECT f.rowid FROM document_chunks_fts f
+                JOIN document_chunks c ON c.id = f.rowid
+                JOIN documents d ON d.id = c.document_id
+                WHERE document_chunks_fts MATCH :match AND COALESCE(d.department, '') IN ({allowed or "NULL"})
+                ORDER BY f.rank LIMIT :k
+            """),
+            parameters
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def search_chunks(self, query: str, k: int = 8, query_vector: Optional[np.ndarray] = None) -> List[Dict]:
+        """Fuse lexical and vector rankings with reciprocal rank fusion"""
+        candidates = k * 4
+        fused: Dict[int, float] = {}
+        similarities: Dict[int, float] = {}
+        for rank, chunk_id in enumerate(self._lexical(query, candidates)):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        if query_vector is None:
+            query_vector = self.encode_query(query)
+        if query_vector is not None:
+            allowed = None if self.departments is None else ChunkAccessIndex.allowed(self.db, self.departments)
+            for rank, (chunk_id, similarity) in enumerate(VectorIndex.search(query_vector, candidates, allowed, self.departments)):
+                fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+                similarities[chunk_id] = similarity
+
+        top_ids = sorted(fused, key=fused.get, reverse=True)[:k]
+        if not top_ids:
+            return []
+        # Checked again here, since the bitmaps of this process may lag behind the database
+        rows = restrict(
+            self.db.query(DocumentChunk, Document.title)
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .filter(DocumentChunk.id.in_(top_ids)),
+            Document.department,
+            self.departments
+        ).all()
+        by_id = {chunk.id: (chunk, title) for chunk, title in rows}
+        return [
+            {
+                "chunk_id": chunk_id,
+                "document_id": by_id[chunk_id][0].document_id,
+                "title": by_id[chunk_id][1],
+                "page": by_id[chunk_id][0].page,
+                "text": by_id[chunk_id][0].text,
+                "score": fused[chunk_id],
+                "similarity": similarities.get(chunk_id)
+            }
+            for chunk_id in top_ids
+            if chunk_id in by_id
+        ]
+
+    def search_documents(self, query: str, limit: int = 10, collapse_versions: bool = True) -> List[Document]:
+        """Best chunk per document, in fused rank order.
+        
+        With collapse_versions, near-duplicate versions of a document are
+        represented by their best-ranked member only.
+        """
+        document_ids: List[int] = []
+        for chunk in self.search_chunks(query, k=limit * 4):
+            if chunk["document_id"] not in document_ids:
+                document_ids.append(chunk["document_id"])
+        documents = {
+            document.id: document
+            for document in self.db.query(Document).filter(Document.id.in_(document_ids)).all()
+        }
+        results: List[Document] = []
+        seen_groups = set()
+        for document_id in document_ids:
+            document = documents.get(document_id)
+            if document is None:
+                continue
+            if collapse_versions:
+                group = document.version_group_id or document.id
+                if group in seen_groups:
+                    continue
+                seen_groups.add(group)
+            results.append(document)
+            if len(results) == limit:
+                break
+        return results
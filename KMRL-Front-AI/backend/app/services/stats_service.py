@@ -0,0 +1,128 @@
+from datetime import date
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+
+from ..core.access import restrict
+from ..models.stats import ROLLUPS, STAT_DIMENSIONS, DocumentStat, DocumentStatTotal, rebuild_sql, recount_sql
+
+# SQLite expressions bucketing the rollup's day column
+INTERVALS = {
+    "day": lambda column: column,
+    "week": lambda column: func.date(column, "weekday 0", "-6 days"),  # weeks start on Monday
+    "month": lambda column: func.strftime("%Y-%m-01", column),
+}
+
+class StatsService:
+    """Dashboard counts read from the rollup tables.
+
+    document_stat_totals has one row per combination of dimension values and
+    answers all-time summaries; document_stats adds the creation day for date
+    ranges and series. Both are maintained by triggers on documents, so these
+    queries scan a bounded number of rows whatever the size of the corpus.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _filtered(
+        self,
+        query,
+        model,
+        filters: Dict[str, Optional[str]],
+        since: Optional[date],
+        until: Optional[date],
+        departments: Optional[Tuple[str, ...]] = None
+    ):
+        query = restrict(query, model.department, departments)
+        for dimension, value in filters.items():
+            if value is not None:
+                query = query.filter(getattr(model, dimension) == value)
+        if since is not None:
+            query = query.filter(DocumentStat.day >= since)
+        if until is not None:
+            query = query.filter(DocumentStat.day <= until)
+        return query
+
+    def summary(
+        self,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> Dict:
+        """Total and counts per value of every dimension, only over `departments` when given;
+        missing values are reported as null"""
+        # One pass over a rollup; each breakdown is then a small fold
+        model = DocumentStatTotal if since is None and until is None else DocumentStat
+        columns = [getattr(model, dimension) for dimension in STAT_DIMENSIONS]
+        rows = (
+            self._filtered(self.db.query(*columns, func.sum(model.count)), model, filters or {}, since, until, departments)
+            .group_by(*columns)
+            .all()
+        )
+        result = {"total": sum(row[-1] for row in rows)}
+        for position, dimension in enumerate(STAT_DIMENSIONS):
+            counts: Dict[str, int] = {}
+            for row in rows:
+                counts[row[position]] = counts.get(row[position], 0) + row[-1]
+            result[dimension] = [
+                {"value": value or None, "count": count}
+                for value, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)
+            ]
+        return result
+
+    def series(
+        self,
+        interval: str = "day",
+        group_by: Optional[str] = None,
+        filters: Optional[Dict[str, Optional[str]]] = None,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict]:
+        """Documents created per day, week or month, optionally split by one dimension, only over `departments` when given"""
+        bucket = INTERVALS[interval](DocumentStat.day).label("bucket")
+        columns = [bucket]
+        if group_by is not None:
+            columns.append(getattr(DocumentStat, group_by))
+        rows = (
+            self._filtered(
+                self.db.query(*columns, func.sum(DocumentStat.count)), DocumentStat, filters or {}, since, until, departments
+            )
+            .group_by(*columns)
+            .order_by(bucket)
+            .all()
+        )
+        return [
+            {
+                "bucket": str(row[0]),
+                **({group_by: row[1] or None} if group_by is not None else {}),
+                "count": row[-1]
+            }
+            for row in rows
+        ]
+
+    def rebuild(self) -> int:
+        """Recount the rollups from the documents table; returns the number of daily rollup rows"""
+        for table in ROLLUPS:
+            self.db.execute(text(f"DELETE FROM {table}"))
+            self.db.execute(text(rebuild_sql(table)))
+        self.db.commit()
+        return self.db.query(func.count()).select_from(DocumentStat).scalar()
+
+    def drift(self) -> List[Dict]:
+        """Rollup rows that disagree with a full recount of the documents table"""
+        drifted = []
+        for table, columns in ROLLUPS.items():
+            expected = {tuple(row[:-1]): row[-1] for row in self.db.execute(text(recount_sql(table))).all()}
+            actual = {
+                tuple(str(value) for value in row[:-1]): row[-1]
+                for row in self.db.execute(text(f"SELECT {', '.join(columns)}, count FROM {table}")).all()
+            }
+            drifted.extend(
+                {"table": table, "key": list(key), "expected": expected.get(key, 0), "actual": actual.get(key, 0)}
+                for key in set(expected) | set(actual)
+                if expected.get(key, 0) != actual.get(key, 0)
+            )
+        return drifted
@@ -0,0 +1,313 @@
+from contextlib import closing, contextmanager
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional
+from urllib.parse import quote
+import hashlib
+import os
+import tempfile
+import threading
+import anyio
+import anyio.to_thread
+
+from ..core.config import settings
+from ..core.tracing import span
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Local files are spread over 256 x 256 directories by the first characters of their key
+SHARD_LEVELS = 2
+
+# S3 rejects multipart parts below 5 MiB, except the last
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+class StoredFile(NamedTuple):
+    location: str  # what Document.file_path holds: a local path or s3://bucket/key
+    size: int
+    content_hash: str  # SHA-256 hex digest
+
+def content_disposition(filename: str, inline: bool = False) -> str:
+    return f"{'inline' if inline else 'attachment'}; filename*=utf-8''{quote(filename)}"
+
+def stream_hash(source: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class LocalStorage:
+    """Files on local disk under UPLOAD_DIR, in directories sharded by key.
+
+    A key "3f9c0d...pdf" is stored as 3f/9c/3f9c0d...pdf, so no directory
+    ends up with millions of entries. Uploads are written and hashed on
+    worker threads a chunk at a time, leaving the event loop free; downloads
+    hand the path to FileResponse or NGINX.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def owns(self, location: str) -> bool:
+        return "://" not in location
+
+    def location(self, key: str) -> str:
+        shards = [key[2 * level:2 * level + 2] for level in range(SHARD_LEVELS)]
+        return os.path.join(self.root, *shards, key)
+
+    async def save(self, key: str, source, content_type: Optional[str] = None) -> StoredFile:
+        """Copy an async readable (UploadFile, anyio AsyncFile) to `key`; the file appears whole or not at all"""
+        location = self.location(key)
+        temporary_path = f"{location}.{os.getpid()}.{threading.get_ident()}.tmp"
+        digest = hashlib.sha256()
+        size = 0
+
+        def open_destination() -> BinaryIO:
+            os.makedirs(os.path.dirname(location), exist_ok=True)
+            return open(temporary_path, "wb")
+
+        def write(destination: BinaryIO, chunk: bytes):
+            digest.update(chunk)
+            destination.write(chunk)
+
+        with span("storage.local.save"):
+            destination = await anyio.to_thread.run_sync(open_destination)
+            try:
+                with destination:
+                    while chunk := await source.read(COPY_CHUNK_SIZE):
+                        size += len(chunk)
+                        await anyio.to_thread.run_sync(write, destination, chunk)
+                await anyio.to_thread.run_sync(os.replace, temporary_path, location)
+            except BaseException:
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(self.delete, temporary_path)
+                raise
+        return StoredFile(location, size, digest.hexdigest())
+
+    def open(self, location: str) -> BinaryIO:
+        return open(location, "rb")
+
+    def exists(self, location: str) -> bool:
+        return os.path.isfile(location)
+
+    def delete(self, location: str):
+        try:
+            os.remove(location)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def local_copy(self, location: str) -> Iterator[str]:
+        yield location
+
+    def local_path(self, location: str) -> Optional[str]:
+        return location
+
+    def download_url(self, location: str, filename: str, content_type: Optional[str], inline: bool = False) -> Optional[str]:
+        """None: local files are served by the API (or NGINX)"""
+        return None
+
+class S3Storage:
+    """Objects in an S3-compatible bucket (AWS S3, MinIO, Ceph; moto or MinIO as a local stand-in).
+
+    Uploads are streamed to a multipart upload in S3_PART_SIZE parts, so
+    memory stays bounded whatever the file size. Downloads redirect to
+    presigned URLs, keeping file bytes out of the API process. Model code that
+    needs a real file (OCR, thumbnails) gets a temporary local copy. Needs the
+    boto3 package.
+    """
+
+    def __init__(self):
+        if not settings.s3_bucket:
+            raise ValueError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        self.bucket = settings.s3_bucket
+        self.prefix = settings.s3_prefix
+        self.part_size = max(settings.s3_part_size, S3_MIN_PART_SIZE)
+        self._client = None
+        self._public_client = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_client(endpoint_url: str):
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=settings.s3_region or None,
+            aws_access_key_id=settings.s3_access_key_id or None,
+            aws_secret_access_key=settings.s3_secret_access_key or None,
+            config=Config(
+                signature_version="s3v4",
+                s3={"addressing_style": settings.s3_addressing_style},
+                max_pool_connections=settings.threadpool_size,
+            ),
+        )
+
+    @property
+    def client(self):
+        # boto3 clients are thread-safe; one is shared by every worker thread
+        with self._lock:
+            if self._client is None:
+                self._client = self._make_client(settings.s3_endpoint_url)
+            return self._client
+
+    @property
+    def public_client(self):
+        """Signs download URLs for the endpoint browsers reach, which may differ from the API's"""
+        if not settings.s3_public_endpoint_url:
+            return self.client
+        with self._lock:
+            if self._public_client is None:
+                self._public_client = self._make_client(settings.s3_public_endpoint_url)
+            return self._public_client
+
+    def owns(self, location: str) -> bool:
+        return location.startswith("s3://")
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.prefix}{key}"
+
+    @staticmethod
+    def _split(location: str):
+        bucket, _, key = location[len("s3://"):].partition("/")
+        return bucket, key
+
+    @staticmethod
+    def _missing(error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    async def _read_part(self, source) -> bytes:
+        chunks = []
+        remaining = self.part_size
+        while remaining > 0:
+            chunk = await source.read(min(remaining, COPY_CHUNK_SIZE))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    async def save(self, key: str, source, content_type: Optional[str] = None) -> StoredFile:
+        """Stream an async readable (UploadFile, anyio AsyncFile) to `key`, one part in memory at a time"""
+        location = self.location(key)
+        bucket, object_key = self._split(location)
+        extra = {"ContentType": content_type} if content_type else {}
+        digest = hashlib.sha256()
+        size = 0
+
+        with span("storage.s3.save"):
+            part = await self._read_part(source)
+            if len(part) < self.part_size:
+                # Fits in one part: a single PUT
+                digest.update(part)
+                await anyio.to_thread.run_sync(
+                    lambda: self.client.put_object(Bucket=bucket, Key=object_key, Body=part, **extra)
+                )
+                return StoredFile(location, len(part), digest.hexdigest())
+
+            upload = await anyio.to_thread.run_sync(
+                lambda: self.client.create_multipart_upload(Bucket=bucket, Key=object_key, **extra)
+            )
+            parts = []
+
+            def upload_part(number: int, body: bytes):
+                digest.update(body)
+                with span("storage.s3.upload_part", part=number, size=len(body)):
+                    response = self.client.upload_part(
+                        Bucket=bucket, Key=object_key, UploadId=upload["UploadId"], PartNumber=number, Body=body
+                    )
+                parts.append({"ETag": response["ETag"], "PartNumber": number})
+
+            try:
+                while part:
+                    size += len(part)
+                    await anyio.to_thread.run_sync(upload_part, len(parts) + 1, part)
+                    part = await self._read_part(source)
+                await anyio.to_thread.run_sync(lambda: self.client.complete_multipart_upload(
+                    Bucket=bucket, Key=object_key, UploadId=upload["UploadId"], MultipartUpload={"Parts": parts}
+                ))
+            except BaseException:
+                # Otherwise the parts stay in the bucket, and are billed, until a lifecycle rule removes them
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(lambda: self.client.abort_multipart_upload(
+                        Bucket=bucket, Key=object_key, UploadId=upload["UploadId"]
+                    ))
+                raise
+        return StoredFile(location, size, digest.hexdigest())
+
+    def open(self, location: str):
+        from botocore.exceptions import ClientError
+
+        bucket, key = self._split(location)
+        try:
+            return closing(self.client.get_object(Bucket=bucket, Key=key)["Body"])
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(location)
+            raise
+
+    def exists(self, location: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        bucket, key = self._split(location)
+        try:
+            self.client.head_object(Bucket=bucket, Key=key)
+            return True
+        except ClientError as e:
+            if self._missing(e):
+                return False
+            raise
+
+    def delete(self, location: str):
+        bucket, key = self._split(location)
+        self.client.delete_object(Bucket=bucket, Key=key)
+
+    @contextmanager
+    def local_copy(self, location: str) -> Iterator[str]:
+        """Download to a temporary file with the same extension, which OCR dispatches on"""
+        bucket, key = self._split(location)
+        handle, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+        os.close(handle)
+        try:
+            with span("storage.s3.download"):
+                # Ranged, parallel GETs for large objects
+                self.client.download_file(bucket, key, path)
+            yield path
+        finally:
+            os.remove(path)
+
+    def local_path(self, location: str) -> Optional[str]:
+        return None
+
+    def download_url(self, location: str, filename: str, content_type: Optional[str], inline: bool = False) -> Optional[str]:
+        """Presigned GET valid for S3_URL_EXPIRY seconds, with the original filename and type"""
+        bucket, key = self._split(location)
+        parameters = {"Bucket": bucket, "Key": key, "ResponseContentDisposition": content_disposition(filename, inline)}
+        if content_type:
+            parameters["ResponseContentType"] = content_type
+        return self.public_client.generate_presigned_url("get_object", Params=parameters, ExpiresIn=settings.s3_url_expiry)
+
+BACKENDS = {
+    "local": lambda: LocalStorage(settings.upload_dir),
+    "s3": S3Storage,
+}
+
+_storages: Dict[str, object] = {}
+_storages_lock = threading.Lock()
+
+def _storage(name: str):
+    if name not in BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of: {', '.join(BACKENDS)}")
+    with _storages_lock:
+        if name not in _storages:
+            _storages[name] = BACKENDS[name]()
+        return _storages[name]
+
+def get_storage(location: Optional[str] = None):
+    """The backend holding `location`, or without one the backend new uploads go to (STORAGE_BACKEND).
+
+    Files stay readable where they were written when STORAGE_BACKEND changes;
+    migrate_storage.py moves them.
+    """
+    if location is None:
+        return _storage(settings.storage_backend)
+    return _storage("s3" if location.startswith("s3://") else "local")
@@ -0,0 +1,282 @@
+from datetime import datetime, timedelta, timezone
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set
+import asyncio
+import json
+import re
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+
+from ..core.access import can_view, visible_departments
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.tracing import span
+from ..models.document import Document
+from ..models.subscription import Notification, Subscription
+from ..models.user import User
+from .ocr_service import has_extracted_text
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Too common to narrow anything down; never required or used as an anchor
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "was", "were", "will", "with"
+}
+
+# Filters in the order they are preferred as anchors, most selective first
+FILTER_FIELDS = ("document_type", "department", "priority")
+
+# Keeps IN lists well under SQLite's bound-parameter limit
+ANCHOR_BATCH = 500
+
+# All that matching and queueing a notification need
+MATCH_COLUMNS = (
+    Subscription.id, Subscription.user_id, Subscription.terms,
+    Subscription.document_type, Subscription.department, Subscription.priority
+)
+
+def normalize_terms(query: str) -> List[str]:
+    return sorted({term for term in TERM_PATTERN.findall(query.lower()) if term not in STOPWORDS})
+
+def _filter_value(value: Optional[str]) -> Optional[str]:
+    return value.strip().lower() if value and value.strip() else None
+
+def compile_subscription(subscription: Subscription):
+    """Derive the percolator fields from the query and filters.
+
+    Each subscription is indexed under a single anchor that every matching
+    document must contain: its longest term (long terms are rarely common),
+    else its first filter, else "*". A document then only needs its own keys
+    looked up to find every subscription that could match it.
+    """
+    terms = normalize_terms(subscription.query or "")
+    subscription.terms = " ".join(terms)
+    if terms:
+        subscription.anchor = "term:" + max(terms, key=lambda term: (len(term), term))
+        return
+    for field in FILTER_FIELDS:
+        value = _filter_value(getattr(subscription, field))
+        if value:
+            subscription.anchor = f"{field}:{value}"
+            return
+    subscription.anchor = "*"
+
+def document_keys(document: Document, terms: Set[str]) -> List[str]:
+    keys = ["*"] + [f"term:{term}" for term in terms]
+    for field in FILTER_FIELDS:
+        value = _filter_value(getattr(document, field))
+        if value:
+            keys.append(f"{field}:{value}")
+    return keys
+
+class PercolatorService:
+    """Matches a new document against every saved search in one pass.
+
+    Instead of running each saved search, the document's terms and filter
+    values are looked up in the index of subscription anchors; only the
+    subscriptions found there are checked in full.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def match(self, document: Document) -> List:
+        """Matching subscriptions, as rows with the compiled fields rather than full entities"""
+        text = f"{document.title or ''}\n{document.extracted_text or ''}"
+        terms = set(TERM_PATTERN.findall(text.lower()))
+        keys = document_keys(document, terms)
+
+        candidates = []
+        with span("percolator.candidates", keys=len(keys)):
+            for start in range(0, len(keys), ANCHOR_BATCH):
+                candidates.extend(
+                    self.db.query(*MATCH_COLUMNS)
+                    .filter(Subscription.anchor.in_(keys[start:start + ANCHOR_BATCH]), Subscription.is_active.is_(True))
+                    .all()
+                )
+
+        matched = []
+        for subscription in candidates:
+            if any(
+                _filter_value(getattr(subscription, field)) not in (None, _filter_value(getattr(document, field)))
+                for field in FILTER_FIELDS
+            ):
+                continue
+            if all(term in terms for term in subscription.terms.split()):
+                matched.append(subscription)
+        return matched
+
+    def percolate(self, document: Document) -> int:
+        """Queue a notification for every matching subscription; returns how many were queued"""
+        # Nothing is known about a document whose text could not be extracted
+        if not has_extracted_text(document.extracted_text, document.ocr_confidence):
+            return 0
+        # Owners who may not see the document are not told about it
+        matched = self.match(document)
+        owners = {
+            user.id: user
+            for user in self.db.query(User).filter(User.id.in_({subscription.user_id for subscription in matched})).all()
+        }
+        matched = [
+            subscription for subscription in matched
+            if subscription.user_id in owners
+            and can_view(visible_departments(owners[subscription.user_id]), document.department)
+        ]
+        if not matched:
+            return 0
+        # Reprocessing a document must not notify twice
+        already_notified = {
+            row[0] for row in self.db.query(Notification.subscription_id)
+            .filter(Notification.document_id == document.id)
+            .all()
+        }
+        notifications = [
+            Notification(subscription_id=subscription.id, user_id=subscription.user_id, document_id=document.id)
+            for subscription in matched
+            if subscription.id not in already_notified
+        ]
+        self.db.add_all(notifications)
+        self.db.commit()
+        return len(notifications)
+
+def webhook_allowed(webhook_url: str) -> bool:
+    """Webhooks are POSTed from the server, so only http(s) URLs on WEBHOOK_ALLOWED_HOSTS are"""
+    allowed = {host.strip().lower() for host in settings.webhook_allowed_hosts.split(",") if host.strip()}
+    parsed = urlparse(webhook_url)
+    return parsed.scheme in ("http", "https") and (parsed.hostname or "").lower() in allowed
+
+class RefuseRedirects(urllib.request.HTTPRedirectHandler):
+    """An allowlisted host could otherwise redirect the relay to any address, internal ones included"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise urllib.error.HTTPError(req.full_url, code, f"webhook redirect to {newurl} refused", headers, fp)
+
+WEBHOOK_OPENER = urllib.request.build_opener(RefuseRedirects)
+
+class NotificationRelay:
+    """Delivers queued notifications from the outbox.
+
+    Every notification is visible in-app as soon as it is queued; the relay
+    marks it delivered, POSTing it first to the subscription's webhook if it
+    has one. Failed webhooks are retried with exponential backoff. Rows are
+    claimed with a conditional update, so several workers can relay at once.
+    A row whose relay died while sending goes back to pending after
+    OUTBOX_CLAIM_SECONDS, so a webhook may receive a notification twice; its
+    notification_id tells the copies apart.
+    """
+
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls):
+        if cls._task is None and settings.outbox_poll_seconds > 0:
+            cls._task = asyncio.get_running_loop().create_task(cls._run())
+
+    @classmethod
+    async def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            try:
+                await run_in_threadpool(cls.deliver_pending)
+            except Exception as e:
+                print(f"Notification relay error: {e}")
+            await asyncio.sleep(settings.outbox_poll_seconds)
+
+    @classmethod
+    def deliver_pending(cls, limit: int = 100) -> Dict[str, int]:
+        counts = {"delivered": 0, "retrying": 0, "failed": 0}
+        db = SessionLocal()
+        try:
+            now = datetime.now(timezone.utc)
+            cls._release_stale(db, now)
+            pending = (
+                db.query(Notification.id)
+                .filter(Notification.status == "pending")
+                .filter((Notification.next_attempt_at.is_(None)) | (Notification.next_attempt_at <= now))
+                .order_by(Notification.id)
+                .limit(limit)
+                .all()
+            )
+            for (notification_id,) in pending:
+                claimed = (
+                    db.query(Notification)
+                    .filter(Notification.id == notification_id, Notification.status == "pending")
+                    .update({Notification.status: "sending", Notification.claimed_at: now}, synchronize_session=False)
+                )
+                db.commit()
+                if not claimed:
+                    continue
+                counts[cls._deliver(db, db.get(Notification, notification_id))] += 1
+        finally:
+            db.close()
+        return counts
+
+    @staticmethod
+    def _release_stale(db: Session, now: datetime):
+        """Return to pending the rows claimed by relays that died before recording the outcome"""
+        released = (
+            db.query(Notification)
+            .filter(
+                Notification.status == "sending",
+                (Notification.claimed_at.is_(None))
+                | (Notification.claimed_at < now - timedelta(seconds=settings.outbox_claim_seconds))
+            )
+            .update({Notification.status: "pending", Notification.claimed_at: None}, synchronize_session=False)
+        )
+        db.commit()
+        if released:
+            print(f"Notification relay: {released} notification(s) left sending by a stopped relay queued again")
+
+    @classmethod
+    def _deliver(cls, db: Session, notification: Notification) -> str:
+        subscription = db.get(Subscription, notification.subscription_id)
+        try:
+            if subscription is not None and subscription.webhook_url:
+                cls._post(subscription, notification)
+        except Exception as e:
+            notification.attempts += 1
+            notification.last_error = str(e)[:500]
+            if notification.attempts >= settings.outbox_max_attempts:
+                notification.status = "failed"
+            else:
+                notification.status = "pending"
+                notification.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=2 ** notification.attempts * 30)
+            db.commit()
+            return "failed" if notification.status == "failed" else "retrying"
+
+        notification.status = "delivered"
+        notification.delivered_at = datetime.now(timezone.utc)
+        db.commit()
+        return "delivered"
+
+    @staticmethod
+    def _post(subscription: Subscription, notification: Notification):
+        # Checked again here: the allowlist may have shrunk since the subscription was saved
+        if not webhook_allowed(subscription.webhook_url):
+            raise ValueError("webhook_url host is no longer allowed")
+        body = json.dumps({
+            "notification_id": notification.id,
+            "subscription_id": subscription.id,
+            "subscription": subscription.name,
+            "document_id": notification.document_id,
+        }).encode("utf-8")
+        request = urllib.request.Request(
+            subscription.webhook_url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        with WEBHOOK_OPENER.open(request, timeout=settings.outbox_webhook_timeout) as response:
+            response.read()
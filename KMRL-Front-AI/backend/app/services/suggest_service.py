@@ -0,0 +1,490 @@
+from bisect import bisect_left
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set, Tuple
+import gc
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+
+from ..core.config import settings
+from ..core.invalidation import Invalidation
+from ..models.document import Document
+from ..models.entity import DocumentEntity
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Suggestions match from the start of any word of a phrase, up to this many characters in
+KEY_CHARS = 64
+
+# Catching up with more documents than this sorts the keys once rather than inserting each
+BULK_DOCUMENTS = 1000
+
+SNAPSHOT_VERSION = 1
+
+def normalize(text: str) -> str:
+    """Lowercase words separated by single spaces: "TS-07 brake" -> "ts 07 brake\""""
+    return " ".join(TERM_PATTERN.findall(text.lower()))
+
+def phrase_keys(normalized: str) -> List[str]:
+    """Index keys of a phrase: the phrase from each of its words on, so "aluva station" matches "sta\""""
+    keys = []
+    for match in TERM_PATTERN.finditer(normalized):
+        key = normalized[match.start():match.start() + KEY_CHARS]
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def document_phrases(document: Document, entities: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str, str]]:
+    """(kind, label, text, normalized) of everything a document contributes"""
+    phrases = []
+    if document.title:
+        phrases.append(("title", "", document.title, normalize(document.title)))
+    if document.original_filename and document.original_filename != document.title:
+        phrases.append(("filename", "", document.original_filename, normalize(document.original_filename)))
+    if document.department:
+        phrases.append(("department", "", document.department, normalize(document.department)))
+    for label, text, normalized in entities:
+        phrases.append(("entity", label, text, normalize(normalized)))
+    return [phrase for phrase in phrases if phrase[3]]
+
+class SuggestIndex:
+    """In-memory prefix index of titles, filenames, departments and entities.
+
+    Keys are kept in one sorted list, so the phrases starting with a prefix
+    are a contiguous range found by binary search. Each phrase counts the
+    documents it appears in per department; suggestions are ranked by that
+    count among the departments the user may see. The top phrases of each
+    prefix asked for are cached per set of departments and adjusted in place
+    as counts change, so popular prefixes stay answered from memory while
+    documents are ingested.
+
+    Updated as documents are ingested and snapshotted to disk on shutdown;
+    on startup the snapshot is loaded and documents added since are read
+    from the database, which is also done periodically so updates made by
+    other processes show up.
+    """
+
+    _phrases: Dict[int, Dict] = {}
+    _phrase_ids: Dict[Tuple[str, str, str], int] = {}
+    _keys: List[str] = []
+    _key_phrases: List[int] = []
+    _documents: Dict[int, Tuple[str, List[int]]] = {}
+    _top: Dict[str, Dict[Optional[Tuple[str, ...]], List[int]]] = {}  # prefix -> departments -> phrase ids
+    # Counts and text lengths indexed by phrase id, for ranking wide prefixes without a Python loop
+    _totals = np.zeros(0, dtype=np.int32)
+    _department_counts: Dict[str, np.ndarray] = {}
+    _text_lengths = np.zeros(0, dtype=np.int32)
+    _staged: Optional[List[Tuple[str, int]]] = None  # keys of phrases added during a bulk load
+    _next_id = 1
+    _watermark = 0  # every document up to this id has been read from the database
+    _pending: Set[int] = set()  # read while still being ingested; read again until they are done
+    _refreshed_at = 0.0
+    _loaded = False
+    _lock = threading.RLock()
+
+    @classmethod
+    def _reset(cls):
+        cls._phrases, cls._phrase_ids, cls._documents, cls._top = {}, {}, {}, {}
+        cls._totals, cls._department_counts, cls._text_lengths = np.zeros(0, dtype=np.int32), {}, np.zeros(0, dtype=np.int32)
+        cls._keys, cls._key_phrases, cls._staged = [], [], None
+        cls._next_id, cls._watermark, cls._pending = 1, 0, set()
+
+    @classmethod
+    def _weight(cls, phrase_id: int, departments: Optional[Tuple[str, ...]]) -> int:
+        phrase = cls._phrases[phrase_id]
+        if departments is None:
+            return phrase["total"]
+        counts = phrase["counts"]
+        return sum(counts.get(department, 0) for department in departments)
+
+    @classmethod
+    def _order(cls, phrase_ids, departments: Optional[Tuple[str, ...]]) -> List[int]:
+        """Most documents first, then shorter phrases, then older ones"""
+        return sorted(
+            phrase_ids,
+            key=lambda phrase_id: (-cls._weight(phrase_id, departments), len(cls._phrases[phrase_id]["text"]), phrase_id)
+        )
+
+    @classmethod
+    def _count(cls, phrase_id: int, department: str, change: int):
+        phrase = cls._phrases[phrase_id]
+        phrase["counts"][department] = phrase["counts"].get(department, 0) + change
+        if phrase["counts"][department] <= 0:
+            del phrase["counts"][department]
+        phrase["total"] += change
+
+        if phrase_id >= cls._totals.size:
+            capacity = max(1024, phrase_id * 2)
+            grow = lambda array: np.concatenate([array, np.zeros(capacity - array.size, dtype=np.int32)])
+            cls._totals, cls._text_lengths = grow(cls._totals), grow(cls._text_lengths)
+            cls._department_counts = {name: grow(array) for name, array in cls._department_counts.items()}
+        if department not in cls._department_counts:
+            cls._department_counts[department] = np.zeros(cls._totals.size, dtype=np.int32)
+        cls._department_counts[department][phrase_id] += change
+        cls._totals[phrase_id] += change
+        cls._text_lengths[phrase_id] = len(phrase["text"])
+
+    @classmethod
+    def _changed(cls, phrase_id: int, department: str, increased: bool):
+        """Adjust the cached top lists under a phrase whose count for `department` changed"""
+        if cls._staged is not None or not cls._top:
+            return
+        size = settings.suggest_cache_size
+        keys = phrase_keys(cls._phrases[phrase_id]["normalized"])
+        for prefix in {key[:length] for key in keys for length in range(1, len(key) + 1)}:
+            cached = cls._top.get(prefix)
+            if not cached:
+                continue
+            for departments, top in list(cached.items()):
+                if departments is not None and department not in departments:
+                    continue
+                weight = cls._weight(phrase_id, departments)
+                if phrase_id in top:
+                    if not increased and len(top) == size:
+                        # It may fall below a phrase that is not cached; recomputed on the next request
+                        del cached[departments]
+                        continue
+                    if weight == 0:
+                        top.remove(phrase_id)
+                    cached[departments] = cls._order(top, departments)
+                elif increased and weight > 0:
+                    cached[departments] = cls._order(top + [phrase_id], departments)[:size]
+
+    @classmethod
+    def _add_phrase(cls, kind: str, label: str, text: str, normalized: str, department: str) -> int:
+        phrase_id = cls._phrase_ids.get((kind, label, normalized))
+        if phrase_id is None:
+            phrase_id = cls._next_id
+            cls._next_id += 1
+            cls._phrase_ids[(kind, label, normalized)] = phrase_id
+            cls._phrases[phrase_id] = {
+                "kind": kind, "label": label, "text": text, "normalized": normalized, "counts": {}, "total": 0
+            }
+            for key in phrase_keys(normalized):
+                if cls._staged is not None:
+                    cls._staged.append((key, phrase_id))
+                    continue
+                position = bisect_left(cls._keys, key)
+                cls._keys.insert(position, key)
+                cls._key_phrases.insert(position, phrase_id)
+        cls._count(phrase_id, department, 1)
+        cls._changed(phrase_id, department, increased=True)
+        return phrase_id
+
+    @classmethod
+    def _remove_phrase(cls, phrase_id: int, department: str):
+        phrase = cls._phrases.get(phrase_id)
+        if phrase is None:
+            return
+        cls._count(phrase_id, department, -1)
+        cls._changed(phrase_id, department, increased=False)
+        if phrase["counts"]:
+            return
+        del cls._phrases[phrase_id]
+        del cls._phrase_ids[(phrase["kind"], phrase["label"], phrase["normalized"])]
+        if cls._staged is not None:
+            return  # phrase ids are never reused, so the merge drops its keys
+        for key in phrase_keys(phrase["normalized"]):
+            position = bisect_left(cls._keys, key)
+            while cls._key_phrases[position] != phrase_id:
+                position += 1
+            del cls._keys[position]
+            del cls._key_phrases[position]
+
+    @classmethod
+    def _index(cls, document: Document, entities: List[Tuple[str, str, str]]):
+        """Count the document's phrases, changing only what differs from when it was last indexed"""
+        old_department, old_ids = cls._documents.get(document.id, (None, []))
+        old_ids = set(old_ids)
+        department = document.department or ""
+        seen = set()
+        phrase_ids = []
+        for kind, label, text, normalized in document_phrases(document, entities):
+            # Counted once per document, however often an entity is mentioned
+            if (kind, label, normalized) in seen:
+                continue
+            seen.add((kind, label, normalized))
+            phrase_id = cls._phrase_ids.get((kind, label, normalized))
+            if phrase_id is None or phrase_id not in old_ids or department != old_department:
+                phrase_id = cls._add_phrase(kind, label, text, normalized, department)
+            phrase_ids.append(phrase_id)
+        for phrase_id in old_ids:
+            if phrase_id not in phrase_ids or department != old_department:
+                cls._remove_phrase(phrase_id, old_department)
+        cls._documents[document.id] = (department, phrase_ids)
+
+    @classmethod
+    def _remove(cls, document_id: int):
+        department, phrase_ids = cls._documents.pop(document_id, ("", []))
+        for phrase_id in phrase_ids:
+            cls._remove_phrase(phrase_id, department)
+
+    @classmethod
+    def _merge_staged(cls):
+        pairs = [pair for pair in zip(cls._keys, cls._key_phrases) if pair[1] in cls._phrases]
+        pairs.extend(pair for pair in cls._staged if pair[1] in cls._phrases)
+        pairs.sort()
+        cls._keys = [key for key, _ in pairs]
+        cls._key_phrases = [phrase_id for _, phrase_id in pairs]
+        cls._staged = None
+        cls._top = {}
+
+    @staticmethod
+    def _entities(db: Session, document_ids: List[int]) -> Dict[int, List[Tuple[str, str, str]]]:
+        entities: Dict[int, List[Tuple[str, str, str]]] = {}
+        rows = (
+            db.query(DocumentEntity.document_id, DocumentEntity.label, DocumentEntity.text, DocumentEntity.normalized)
+            .filter(DocumentEntity.document_id.in_(document_ids))
+            .order_by(DocumentEntity.document_id, DocumentEntity.start)
+        )
+        for document_id, label, text, normalized in rows:
+            entities.setdefault(document_id, []).append((label, text, normalized))
+        return entities
+
+    @classmethod
+    def _read_documents(cls, db: Session, documents: List[Document]):
+        entities = cls._entities(db, [document.id for document in documents])
+        for document in documents:
+            cls._index(document, entities.get(document.id, []))
+            # Their entities may not be extracted yet
+            if document.processing_status in ("pending", "processing"):
+                cls._pending.add(document.id)
+            else:
+                cls._pending.discard(document.id)
+
+    @classmethod
+    def _catch_up(cls, db: Session, batch_size: int = 500) -> int:
+        """Index documents added since the watermark, and those read while pending; returns how many were read"""
+        if db.query(Document.id).filter(Document.id > cls._watermark).offset(BULK_DOCUMENTS).first() is not None:
+            cls._staged = []
+        try:
+            return cls._read_new(db, batch_size)
+        finally:
+            if cls._staged is not None:
+                cls._merge_staged()
+
+    @classmethod
+    def _read_new(cls, db: Session, batch_size: int) -> int:
+        read = 0
+        if cls._pending:
+            pending = db.query(Document).filter(Document.id.in_(list(cls._pending))).all()
+            cls._pending -= {document.id for document in pending}  # the rest no longer exist
+            cls._read_documents(db, pending)
+            read += len(pending)
+        while True:
+            documents = (
+                db.query(Document)
+                .filter(Document.id > cls._watermark)
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                return read
+            cls._read_documents(db, documents)
+            cls._watermark = documents[-1].id
+            read += len(documents)
+
+    @classmethod
+    def load(cls, db: Session):
+        """Load the snapshot, if any, then catch up with the database"""
+        with cls._lock:
+            if cls._loaded:
+                return
+            cls._reset()
+            if os.path.exists(settings.suggest_snapshot_path):
+                # Hundreds of thousands of small objects; collections midway would only rescan them
+                collecting = gc.isenabled()
+                gc.disable()
+                try:
+                    cls._read_snapshot()
+                except Exception as e:
+                    print(f"Suggestion snapshot unreadable, rebuilding: {e}")
+                    cls._reset()
+                finally:
+                    if collecting:
+                        gc.enable()
+            read = cls._catch_up(db)
+            cls._loaded = True
+            cls._refreshed_at = time.monotonic()
+            print(f"Suggestion index loaded: {len(cls._phrases)} phrases, {read} documents read from the database")
+
+    @classmethod
+    def rebuild(cls, db: Session) -> int:
+        """Index every document from scratch and write a snapshot; returns the number of phrases"""
+        with cls._lock:
+            cls._reset()
+            cls._catch_up(db)
+            cls._loaded = True
+            cls._refreshed_at = time.monotonic()
+            cls.save()
+            return len(cls._phrases)
+
+    @classmethod
+    def refresh(cls, db: Session):
+        if not cls._loaded:
+            cls.load(db)
+        elif time.monotonic() - cls._refreshed_at >= settings.suggest_refresh_seconds:
+            with cls._lock:
+                cls._refreshed_at = time.monotonic()
+                cls._catch_up(db)
+
+    @classmethod
+    def index_document(cls, db: Session, document: Document):
+        """(Re)index one document's phrases; done at ingestion, once entities are extracted"""
+        # Not loaded in an ingest worker: its first load would read it from the database,
+        # but the API workers still need to hear about it
+        if cls._loaded:
+            entities = cls._entities(db, [document.id]).get(document.id, [])
+            with cls._lock:
+                cls._index(document, entities)
+        Invalidation.publish("suggest", {"document_id": document.id})
+
+    @classmethod
+    def remove_document(cls, document_id: int):
+        with cls._lock:
+            cls._remove(document_id)
+        Invalidation.publish("suggest", {"removed": document_id})
+
+    @classmethod
+    def _invalidate(cls, message: Dict):
+        """Another process changed a document: read it again on the next request rather than waiting for
+        SUGGEST_REFRESH_SECONDS. This thread has no database session of its own."""
+        with cls._lock:
+            if not cls._loaded:
+                return
+            if "removed" in message:
+                cls._remove(message["removed"])
+                return
+            if "document_id" in message:
+                cls._pending.add(message["document_id"])
+            cls._refreshed_at = 0.0
+
+    @classmethod
+    def _ranked(cls, prefix: str, departments: Optional[Tuple[str, ...]], limit: int) -> List[int]:
+        start = bisect_left(cls._keys, prefix)
+        end = bisect_left(cls._keys, prefix + "\U0010ffff", start)
+        if start == end:
+            return []
+        phrase_ids = np.unique(np.asarray(cls._key_phrases[start:end], dtype=np.int64))
+        if departments is None:
+            weights = cls._totals[phrase_ids]
+        else:
+            weights = np.zeros(phrase_ids.size, dtype=np.int32)
+            for department in departments:
+                if department in cls._department_counts:
+                    weights += cls._department_counts[department][phrase_ids]
+        keep = weights > 0
+        phrase_ids, weights = phrase_ids[keep], weights[keep]
+        if phrase_ids.size > limit:
+            # Only phrases tied with or above the limit-th count need the full ordering
+            keep = weights >= np.partition(weights, -limit)[-limit]
+            phrase_ids, weights = phrase_ids[keep], weights[keep]
+        # Same order as _order: most documents, shorter text, lower id
+        order = np.lexsort((phrase_ids, cls._text_lengths[phrase_ids], -weights))[:limit]
+        return phrase_ids[order].tolist()
+
+    @classmethod
+    def suggest(
+        cls,
+        db: Session,
+        query: str,
+        limit: int = 10,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict]:
+        """Phrases with a word starting with `query`, most frequent first, counted over `departments` when given"""
+        cls.refresh(db)
+        prefix = normalize(query)[:KEY_CHARS]
+        if not prefix:
+            return []
+        with cls._lock:
+            if limit > settings.suggest_cache_size:
+                phrase_ids = cls._ranked(prefix, departments, limit)
+            else:
+                cached = cls._top.pop(prefix, {})
+                # Most recently used last, so the oldest prefix is evicted first
+                cls._top[prefix] = cached
+                if departments not in cached:
+                    cached[departments] = cls._ranked(prefix, departments, settings.suggest_cache_size)
+                phrase_ids = cached[departments][:limit]
+                while len(cls._top) > settings.suggest_cached_prefixes:
+                    del cls._top[next(iter(cls._top))]
+            return [
+                {
+                    "text": cls._phrases[phrase_id]["text"],
+                    "kind": cls._phrases[phrase_id]["kind"],
+                    "label": cls._phrases[phrase_id]["label"] or None,
+                    "count": cls._weight(phrase_id, departments)
+                }
+                for phrase_id in phrase_ids
+            ]
+
+    @classmethod
+    def _read_snapshot(cls):
+        with open(settings.suggest_snapshot_path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"snapshot version {snapshot.get('version')}")
+        cls._watermark = snapshot["watermark"]
+        cls._pending = set(snapshot["pending"])
+        cls._next_id = snapshot["next_id"]
+        cls._keys, cls._key_phrases = snapshot["keys"], snapshot["key_phrases"]
+        department_ids: Dict[str, List[List[int]]] = {}
+        for phrase_id, kind, label, text, normalized, counts in snapshot["phrases"]:
+            cls._phrases[phrase_id] = {
+                "kind": kind, "label": label, "text": text, "normalized": normalized,
+                "counts": counts, "total": sum(counts.values())
+            }
+            cls._phrase_ids[(kind, label, normalized)] = phrase_id
+            for department, count in counts.items():
+                ids, values = department_ids.setdefault(department, [[], []])
+                ids.append(phrase_id)
+                values.append(count)
+
+        # The arrays in one pass rather than phrase by phrase
+        capacity = max(1024, cls._next_id * 2)
+        cls._totals = np.zeros(capacity, dtype=np.int32)
+        cls._text_lengths = np.zeros(capacity, dtype=np.int32)
+        phrase_ids = np.fromiter(cls._phrases, dtype=np.int64, count=len(cls._phrases))
+        cls._text_lengths[phrase_ids] = [len(phrase["text"]) for phrase in cls._phrases.values()]
+        for department, (ids, values) in department_ids.items():
+            counts = np.zeros(capacity, dtype=np.int32)
+            counts[ids] = values
+            cls._department_counts[department] = counts
+            cls._totals += counts
+        cls._documents = {
+            int(document_id): (department, phrase_ids)
+            for document_id, (department, phrase_ids) in snapshot["documents"].items()
+        }
+
+    @classmethod
+    def save(cls):
+        """Write a snapshot, atomically replacing the previous one"""
+        with cls._lock:
+            if not cls._loaded:
+                return
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "watermark": cls._watermark,
+                "pending": sorted(cls._pending),
+                "next_id": cls._next_id,
+                "phrases": [
+                    [phrase_id, phrase["kind"], phrase["label"], phrase["text"], phrase["normalized"], dict(phrase["counts"])]
+                    for phrase_id, phrase in cls._phrases.items()
+                ],
+                # Already sorted, so loading does not sort them again
+                "keys": list(cls._keys),
+                "key_phrases": list(cls._key_phrases),
+                "documents": dict(cls._documents),
+            }
+        os.makedirs(os.path.dirname(settings.suggest_snapshot_path) or ".", exist_ok=True)
+        # Per process: every server worker writes its snapshot on shutdown
+        temporary_path = f"{settings.suggest_snapshot_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temporary_path, settings.suggest_snapshot_path)
+
+Invalidation.subscribe("suggest", SuggestIndex._invalidate)
@@ -0,0 +1,211 @@
+from collections import Counter
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import re
+
+from ..models.document import Document, DocumentSummary, SummaryCache
+from ..core.metrics import record_cache
+from .ai_service import AIService
+from .translation_service import TranslationService, TranslationUnavailable
+
+# Generation settings per summary type; changing them changes the cache key
+SUMMARY_PARAMS = {
+    "abstractive": {"max_length": 150, "min_length": 30, "max_input_chars": 1000},
+    "extractive": {"sentences": 3},
+}
+
+# Bump when the extractive algorithm changes so existing summaries become stale
+EXTRACTIVE_MODEL_ID = "extractive-v1"
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?।])\s+")
+WORD_PATTERN = re.compile(r"\w+")
+
+class SummaryUnavailable(Exception):
+    """Raised when a summary cannot be generated right now; nothing is cached"""
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def params_hash(params: Dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def extractive_summary(text: str, sentences: int = 3) -> str:
+    """Highest-scoring sentences by average word frequency, in document order"""
+    candidates = [sentence.strip() for sentence in SENTENCE_PATTERN.split(text) if len(sentence.split()) >= 5]
+    if not candidates:
+        return text[:500].strip()
+    frequencies = Counter(word.lower() for word in WORD_PATTERN.findall(text) if len(word) > 3)
+    scored = []
+    for position, sentence in enumerate(candidates):
+        words = [word.lower() for word in WORD_PATTERN.findall(sentence)]
+        scored.append((sum(frequencies[word] for word in words) / len(words), position))
+    chosen = sorted(position for _, position in sorted(scored, reverse=True)[:sentences])
+    return " ".join(candidates[position] for position in chosen)
+
+class SummaryService:
+    """Document summaries memoized by (text hash, model id, generation params)"""
+
+    def __init__(
+        self,
+        db: Session,
+        ai_service: Optional[AIService] = None,
+        translation_service: Optional[TranslationService] = None
+    ):
+        self.db = db
+        self.ai_service = ai_service or AIService()
+        self.translation_service = translation_service or TranslationService(db)
+
+    @staticmethod
+    def _summary_language(summary_type: str, source_language: str) -> str:
+        """BART only summarizes English, so abstractive summaries pivot through it"""
+        return "en" if summary_type == "abstractive" else source_language
+
+    def _model_id(self, summary_type: str, source_language: str, language: str) -> str:
+        """Every model on the path from document text to summary, in order"""
+        summary_language = self._summary_language(summary_type, source_language)
+        parts = []
+        if summary_type == "abstractive":
+            if source_language != summary_language:
+                parts.append(TranslationService.model_id(source_language, summary_language))
+            parts.append(self.ai_service.summarizer_model_id)
+        else:
+            parts.append(EXTRACTIVE_MODEL_ID)
+        if language != summary_language:
+            parts.append(TranslationService.model_id(summary_language, language))
+        return "+".join(parts)
+
+    def cache_key(self, text: str, summary_type: str, source_language: str = "en", language: str = "en") -> Tuple[str, str, str]:
+        if summary_type not in SUMMARY_PARAMS:
+            raise ValueError(f"Unknown summary type: {summary_type}")
+        return text_hash(text), self._model_id(summary_type, source_language, language), params_hash(SUMMARY_PARAMS[summary_type])
+
+    def is_stale(self, summary: DocumentSummary, document: Document) -> bool:
+        if not document.extracted_text:
+            return False
+        return (summary.text_hash, summary.model_id, summary.params_hash) != self.cache_key(
+            document.extracted_text, summary.summary_type, document.language or "en", summary.language
+        )
+
+    def _generate(self, text: str, summary_type: str, source_language: str, language: str) -> Tuple[str, Optional[float]]:
+        params = SUMMARY_PARAMS[summary_type]
+        summary_language = self._summary_language(summary_type, source_language)
+        try:
+            if summary_type == "extractive":
+                summary_text, confidence = extractive_summary(text, **params), None
+            else:
+                # Only the part the summarizer reads is worth translating
+                text = self.translation_service.translate(text[:params["max_input_chars"]], source_language, summary_language)
+                summary_text, confidence = self.ai_service.summarize_text(text, **params)
+                # A zero confidence means the model failed or is not loaded; never cache that text
+                if not confidence:
+                    raise SummaryUnavailable(summary_text)
+            summary_text = self.translation_service.translate(summary_text, summary_language, language)
+        except TranslationUnavailable as e:
+            raise SummaryUnavailable(str(e))
+        return summary_text, confidence
+
+    def _cached(self, text: str, summary_type: str, source_language: str, language: str) -> SummaryCache:
+        """Look up the shared cache, generating and storing on a miss"""
+        key = self.cache_key(text, summary_type, source_language, language)
+        lookup = self.db.query(SummaryCache).filter(
+            SummaryCache.text_hash == key[0],
+            SummaryCache.model_id == key[1],
+            SummaryCache.params_hash == key[2]
+        )
+        entry = lookup.first()
+        record_cache("summary", hits=int(entry is not None), misses=int(entry is None))
+        if entry is not None:
+            entry.hits = (entry.hits or 0) + 1
+            return entry
+
+        summary_text, confidence = self._generate(text, summary_type, source_language, language)
+        entry = SummaryCache(
+            text_hash=key[0],
+            model_id=key[1],
+            params_hash=key[2],
+            summary_text=summary_text,
+            confidence_score=confidence,
+            hits=0
+        )
+        self.db.add(entry)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Another request generated the same summary concurrently
+            self.db.rollback()
+            entry = lookup.first()
+        return entry
+
+    def get_or_create(
+        self,
+        document: Document,
+        summary_type: str = "abstractive",
+        language: Optional[str] = None,
+        refresh: bool = False
+    ) -> DocumentSummary:
+        """Fresh summary variant for a document, generated lazily on first request"""
+        if not document.extracted_text:
+            raise SummaryUnavailable("Document text not available")
+        source_language = document.language or "en"
+        language = language or source_language
+
+        summary = self.db.query(DocumentSummary).filter(
+            DocumentSummary.document_id == document.id,
+            DocumentSummary.summary_type == summary_type,
+            DocumentSummary.language == language
+        ).first()
+        if summary is not None and not refresh and not self.is_stale(summary, document):
+            return summary
+
+        entry = self._cached(document.extracted_text, summary_type, source_language, language)
+        if summary is None:
+            summary = DocumentSummary(document_id=document.id, summary_type=summary_type, language=language)
+            self.db.add(summary)
+        summary.summary_text = entry.summary_text
+        summary.confidence_score = entry.confidence_score
+        summary.text_hash = entry.text_hash
+        summary.model_id = entry.model_id
+        summary.params_hash = entry.params_hash
+        self.db.commit()
+        self.db.refresh(summary)
+        return summary
+
+    def list_summaries(self, document_id: int) -> List[DocumentSummary]:
+        return (
+            self.db.query(DocumentSummary)
+            .filter(DocumentSummary.document_id == document_id)
+            .order_by(DocumentSummary.summary_type, DocumentSummary.language)
+            .all()
+        )
+
+    def refresh_stale(self, chunk_size: int = 100) -> Dict[str, int]:
+        """Regenerate only the summaries whose text, model or params changed"""
+        counts = {"checked": 0, "refreshed": 0, "failed": 0}
+        last_id = 0
+        while True:
+            rows = (
+                self.db.query(DocumentSummary, Document)
+                .join(Document, Document.id == DocumentSummary.document_id)
+                .filter(DocumentSummary.id > last_id)
+                .order_by(DocumentSummary.id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+            for summary, document in rows:
+                counts["checked"] += 1
+                if summary.summary_type not in SUMMARY_PARAMS or not self.is_stale(summary, document):
+                    continue
+                try:
+                    self.get_or_create(document, summary.summary_type, summary.language, refresh=True)
+                    counts["refreshed"] += 1
+                except SummaryUnavailable as e:
+                    print(f"Could not refresh summary {summary.id}: {e}")
+                    counts["failed"] += 1
+            last_id = rows[-1][0].id
+            self.db.expunge_all()
+        return counts
@@ -0,0 +1,130 @@
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import zlib
+
+from ..core.config import settings
+from ..core.tracing import span
+from ..models.document import DocumentTextSegment
+from .search_service import split_pages
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def compress(text: str) -> Tuple[str, bytes]:
+    """Compress with the configured codec; zstd falls back to zlib when zstandard is missing"""
+    data = text.encode("utf-8")
+    if settings.text_compression == "zstd":
+        zstandard = _zstd()
+        if zstandard is not None:
+            return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+def decompress(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("Text was stored with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown text codec: {codec}")
+
+def segment_text(text: str, max_chars: int) -> List[Dict]:
+    """Split text into page-sized segments, long pages into sections of at most max_chars.
+
+    Every page gets at least one segment, even when empty, so page numbers and
+    the form feeds between pages survive a round trip.
+    """
+    segments = []
+    offset = 0
+    for page_number, page in enumerate(split_pages(text), start=1):
+        position = 0
+        while True:
+            section = page[position:position + max_chars]
+            segments.append({"page": page_number, "char_start": offset + position, "text": section})
+            position += max_chars
+            if position >= len(page):
+                break
+        offset += len(page) + 1
+    return segments
+
+class TextStore:
+    """Extracted text, stored outside the documents row as compressed page or section segments"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def write(self, document_id: int, text: Optional[str]) -> Optional[int]:
+        """Replace a document's text; returns its length, or None when there is no text.
+
+        Adds the segments to the session without committing, so they land in the
+        same transaction as the document's other changes.
+        """
+        self.delete(document_id)
+        if text is None:
+            return None
+        with span("text_store.write", chars=len(text)):
+            for index, segment in enumerate(segment_text(text, settings.text_segment_chars)):
+                codec, data = compress(segment["text"])
+                self.db.add(DocumentTextSegment(
+                    document_id=document_id,
+                    segment_index=index,
+                    page=segment["page"],
+                    char_start=segment["char_start"],
+                    char_length=len(segment["text"]),
+                    codec=codec,
+                    data=data
+                ))
+        return len(text)
+
+    def read(self, document_id: int) -> Optional[str]:
+        """The whole text, reassembled from every segment"""
+        rows = (
+            self.db.query(DocumentTextSegment.page, DocumentTextSegment.codec, DocumentTextSegment.data)
+            .filter(DocumentTextSegment.document_id == document_id)
+            .order_by(DocumentTextSegment.segment_index)
+            .all()
+        )
+        if not rows:
+            return None
+        pages: List[List[str]] = []
+        with span("text_store.read", segments=len(rows)):
+            for page, codec, data in rows:
+                while len(pages) < page:
+                    pages.append([])
+                pages[page - 1].append(decompress(codec, data))
+        return "\f".join("".join(sections) for sections in pages)
+
+    def read_page(self, document_id: int, page: int) -> Optional[str]:
+        """One page, decompressing only that page's segments"""
+        rows = (
+            self.db.query(DocumentTextSegment.codec, DocumentTextSegment.data)
+            .filter(DocumentTextSegment.document_id == document_id, DocumentTextSegment.page == page)
+            .order_by(DocumentTextSegment.segment_index)
+            .all()
+        )
+        if not rows:
+            return None
+        return "".join(decompress(codec, data) for codec, data in rows)
+
+    def page_count(self, document_id: int) -> int:
+        last_page = (
+            self.db.query(DocumentTextSegment.page)
+            .filter(DocumentTextSegment.document_id == document_id)
+            .order_by(DocumentTextSegment.segment_index.desc())
+            .limit(1)
+            .scalar()
+        )
+        return last_page or 0
+
+    def delete(self, document_id: int):
+        self.db.query(DocumentTextSegment).filter(
+            DocumentTextSegment.document_id == document_id
+        ).delete(synchronize_session=False)
@@ -0,0 +1,208 @@
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Dict, List, Tuple
+import hashlib
+import re
+import threading
+import time
+
+from ..core.config import settings
+from ..core.metrics import record_cache, record_model_load, track_stage
+from ..models.translation import TranslationSegment
+from .model_backend import configure_threads
+
+# Sentence ends (including the Devanagari danda) and line breaks delimit segments
+SEPARATOR_PATTERN = re.compile(r"((?<=[.!?।])\s+|\n+)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# Bound variables per statement on SQLite builds before 3.32
+SQLITE_MAX_VARIABLES = 999
+
+# Marian models handle 512 tokens; longer runs without punctuation are split on spaces
+MAX_SEGMENT_CHARS = 400
+
+class TranslationUnavailable(Exception):
+    """Raised when no model is available for a language pair"""
+
+def supported_languages() -> List[str]:
+    return [language.strip() for language in settings.translation_languages.split(",") if language.strip()]
+
+def translation_model_name(source: str, target: str) -> str:
+    return settings.translation_model_template.format(source=source, target=target)
+
+def normalize_segment(segment: str) -> str:
+    return WHITESPACE_PATTERN.sub(" ", segment).strip()
+
+def segment_hash(segment: str) -> str:
+    return hashlib.sha256(normalize_segment(segment).encode("utf-8")).hexdigest()
+
+def split_segments(text: str) -> List[str]:
+    """Alternating [segment, separator, segment, ...] so the text can be reassembled"""
+    pieces = SEPARATOR_PATTERN.split(text)
+    result: List[str] = []
+    for index, piece in enumerate(pieces):
+        if index % 2 == 1 or len(piece) <= MAX_SEGMENT_CHARS:
+            result.append(piece)
+            continue
+        # Keep the alternation by joining oversized parts with a space separator
+        parts = []
+        while len(piece) > MAX_SEGMENT_CHARS:
+            split = piece.rfind(" ", 0, MAX_SEGMENT_CHARS)
+            split = split if split > 0 else MAX_SEGMENT_CHARS
+            parts.append(piece[:split])
+            piece = piece[split:].lstrip()
+        parts.append(piece)
+        for part_index, part in enumerate(parts):
+            if part_index:
+                result.append(" ")
+            result.append(part)
+    return result
+
+class Translator:
+    """MarianMT models per language pair, loaded once per process"""
+
+    _models: Dict[Tuple[str, str], tuple] = {}
+    _failed: set = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def load(cls, source: str, target: str):
+        pair = (source, target)
+        with cls._lock:
+            if pair in cls._models or pair in cls._failed:
+                return cls._models.get(pair)
+            started = time.perf_counter()
+            try:
+                from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+                configure_threads()
+                name = translation_model_name(source, target)
+                tokenizer = AutoTokenizer.from_pretrained(name, cache_dir=settings.huggingface_cache_dir)
+                model = AutoModelForSeq2SeqLM.from_pretrained(name, cache_dir=settings.huggingface_cache_dir)
+                model.eval()
+                cls._models[pair] = (tokenizer, model)
+                print(f"Translation model {name} loaded successfully")
+            except Exception as e:
+                print(f"Error loading translation model {source}->{target}: {e}")
+                cls._failed.add(pair)
+            record_model_load(f"translation-{source}-{target}", started, pair in cls._models)
+            return cls._models.get(pair)
+
+    @classmethod
+    def translate_batch(cls, segments: List[str], source: str, target: str) -> List[str]:
+        loaded = cls.load(source, target)
+        if loaded is None:
+            raise TranslationUnavailable(f"Translation from '{source}' to '{target}' is not available")
+        import torch
+
+        tokenizer, model = loaded
+        translations: List[str] = []
+        for start in range(0, len(segments), settings.translation_batch_size):
+            batch = segments[start:start + settings.translation_batch_size]
+            inputs = tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512)
+            with torch.no_grad():
+                outputs = model.generate(**inputs, num_beams=2, max_new_tokens=512)
+            translations.extend(tokenizer.batch_decode(outputs, skip_special_tokens=True))
+        return translations
+
+class TranslationService:
+    """Text translation with a segment-level cache shared across documents.
+
+    Repeated boilerplate (circular headers, safety disclaimers) is translated
+    once; only segments never seen before reach the model, in batches.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def model_id(source: str, target: str) -> str:
+        return translation_model_name(source, target)
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if source == target or not text.strip():
+            return text
+
+        pieces = split_segments(text)
+        segments = {
+            segment_hash(piece): normalize_segment(piece)
+            for index, piece in enumerate(pieces)
+            if index % 2 == 0 and piece.strip()
+        }
+        translated = self._lookup(list(segments), source, target)
+
+        missing = [key for key in segments if key not in translated]
+        record_cache("translation_segments", hits=len(translated), misses=len(missing))
+        if missing:
+            with track_stage("translate"):
+                outputs = Translator.translate_batch([segments[key] for key in missing], source, target)
+            new_entries = dict(zip(missing, outputs))
+            self._store(new_entries, segments, source, target)
+            translated.update(new_entries)
+
+        return "".join(
+            translated.get(segment_hash(piece), piece) if index % 2 == 0 and piece.strip() else piece
+            for index, piece in enumerate(pieces)
+        )
+
+    def _lookup(self, hashes: List[str], source: str, target: str) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        model_id = self.model_id(source, target)
+        # Bounded IN lists keep each query under SQLite's variable limit
+        for start in range(0, len(hashes), 500):
+            rows = self.db.query(
+                TranslationSegment.id, TranslationSegment.segment_hash, TranslationSegment.translated_text
+            ).filter(
+                TranslationSegment.segment_hash.in_(hashes[start:start + 500]),
+                TranslationSegment.source_language == source,
+                TranslationSegment.target_language == target,
+                TranslationSegment.model_id == model_id
+            ).all()
+            if not rows:
+                continue
+            # One UPDATE per batch, counted in SQL so concurrent hits are not lost
+            self.db.query(TranslationSegment).filter(
+                TranslationSegment.id.in_([row.id for row in rows])
+            ).update({TranslationSegment.hits: func.coalesce(TranslationSegment.hits, 0) + 1}, synchronize_session=False)
+            found.update((row.segment_hash, row.translated_text) for row in rows)
+        if found:
+            # A request served entirely from the cache stores nothing after this
+            self.db.commit()
+        return found
+
+    def _store(self, entries: Dict[str, str], segments: Dict[str, str], source: str, target: str):
+        model_id = self.model_id(source, target)
+        rows = [
+            {
+                "segment_hash": key,
+                "source_language": source,
+                "target_language": target,
+                "model_id": model_id,
+                "source_text": segments[key],
+                "translated_text": translation,
+                "hits": 0
+            }
+            for key, translation in entries.items()
+        ]
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            # Segments a concurrent request cached meanwhile are skipped; the rest are still stored
+            insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+            # Every column of every row is a bound variable; older SQLite builds allow 999
+            batch = SQLITE_MAX_VARIABLES // len(rows[0])
+            for start in range(0, len(rows), batch):
+                self.db.execute(insert(TranslationSegment).values(rows[start:start + batch]).on_conflict_do_nothing(
+                    index_elements=["segment_hash", "source_language", "target_language", "model_id"]
+                ))
+        else:
+            for row in rows:
+                try:
+                    with self.db.begin_nested():
+                        self.db.add(TranslationSegment(**row))
+                except IntegrityError:
+                    # Cached by a concurrent request; ours is equivalent
+                    pass
+        self.db.commit()
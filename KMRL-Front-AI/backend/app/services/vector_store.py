@@ -0,0 +1,826 @@
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+import glob
+import heapq
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+
+from ..core.config import settings
+from ..core.invalidation import Invalidation
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: one process per data directory, so in-process locks suffice
+    fcntl = None
+
+# Vectors read from the log per batch when rebuilding
+BATCH_VECTORS = 65536
+
+# Shards are named after their key; "s-" keeps the empty key a valid file name
+SHARD_PREFIX = "s-"
+
+# Restrictive filters widen the IVF/HNSW search by up to this factor so enough allowed vectors are visited
+MAX_FILTER_WIDENING = 32
+
+# Set bits per byte value
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+# Whether an index factory string takes vectors without training, per dimension
+_TRAINED: Dict[Tuple[int, str], bool] = {}
+
+def _faiss():
+    try:
+        import faiss
+        return faiss
+    except ImportError:
+        return None
+
+def record_dtype(dimension: int) -> np.dtype:
+    """One log record: a chunk id (or -1 - id for a removal) and its float16 vector"""
+    return np.dtype([("id", "<i8"), ("vector", "<f2", (dimension,))])
+
+def shard_key(department: Optional[str], created_at) -> Optional[str]:
+    """Shard a chunk's vector goes to under FAISS_SHARD_BY; None when unsharded"""
+    if settings.faiss_shard_by == "department":
+        return department or ""
+    if settings.faiss_shard_by == "year":
+        return str(created_at)[:4] if created_at else ""
+    return None
+
+def set_bits(bitmap: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Set bit i for each id i in a little-endian packed bitmap, growing it as needed"""
+    if not ids.size:
+        return bitmap
+    size = int(ids.max()) // 8 + 1
+    if size > bitmap.size:
+        # Grow with headroom so a run of new chunks does not reallocate every time
+        bitmap = np.concatenate([bitmap, np.zeros(max(size - bitmap.size, bitmap.size // 4), dtype=np.uint8)])
+    np.bitwise_or.at(bitmap, ids >> 3, (1 << (ids & 7)).astype(np.uint8))
+    return bitmap
+
+def clear_bits(bitmap: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    present = ids[(ids >> 3) < bitmap.size]
+    np.bitwise_and.at(bitmap, present >> 3, (~(1 << (present & 7))).astype(np.uint8))
+    return bitmap
+
+def test_bits(bitmap: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    inside = (ids >> 3) < bitmap.size
+    result = np.zeros(ids.size, dtype=bool)
+    result[inside] = (bitmap[ids[inside] >> 3] >> (ids[inside] & 7)) & 1 == 1
+    return result
+
+def live_positions(ids: np.ndarray) -> np.ndarray:
+    """Positions of the log records still in effect: the last record of each id, if it is an add"""
+    if not ids.size:
+        return np.zeros(0, dtype=np.int64)
+    keys = np.where(ids < 0, -1 - ids, ids)
+    last = keys.size - 1 - np.unique(keys[::-1], return_index=True)[1]
+    return np.sort(last[ids[last] >= 0])
+
+class VectorShard:
+    """One FAISS index and the append-only log of the vectors it holds.
+
+    <path>.log has one record per added vector (chunk id and float16 vector)
+    or removal (id -1 - chunk id), in order. It is the shard's record of
+    truth and what rebuilds read, so the index may be lossy (PQ, SQ). Every
+    process serving the shard appends to it while holding <path>.lock and
+    replays what the others appended, so all of them hold the same vectors.
+
+    The index file is the shard's base: it is written every FAISS_SAVE_EVERY
+    records and never changed afterwards, so it is memory-mapped
+    (FAISS_MMAP) and worker processes share one copy in the page cache.
+    <path>.meta.json names it and the number of log records it holds. Later
+    records go to a small flat delta index in each process; base vectors
+    removed or replaced since are tombstones, excluded when searching. Saves
+    and rebuilds write a new base in the background, one process at a time,
+    and swap it in.
+    """
+
+    def __init__(self, key: Optional[str], path: str):
+        self.key = key
+        self.path = path
+        self.base = None
+        self.delta = None  # None until the shard is loaded
+        self.meta: Optional[Dict] = None
+        self.meta_stamp: Optional[Tuple[int, int]] = None  # inode and mtime of the metadata in effect
+        self.rows = 0  # log records applied
+        self.live = 0  # ids in the shard
+        # Ids whose base vectors were removed or replaced; excluded when searching the base
+        self.tombstones: frozenset = frozenset()
+        self.members = np.zeros(0, dtype=np.uint8)  # ids in the shard, so removals skip other shards
+        self.rebuilding = False  # a save or rebuild is running in this process
+        self.failed: Optional[str] = None  # factory whose last rebuild failed; not retried automatically
+        self.lock = threading.RLock()
+
+    @property
+    def meta_path(self) -> str:
+        return self.path + ".meta.json"
+
+    @property
+    def log_path(self) -> str:
+        return self.path + ".log"
+
+    @property
+    def loaded(self) -> bool:
+        return self.delta is not None
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path) or os.path.exists(self.path)
+
+    @contextmanager
+    def _file_lock(self, suffix: str, exclusive: bool = True, blocking: bool = True) -> Iterator[bool]:
+        """flock on <path><suffix>, shared between processes; yields False if not blocking and it is held"""
+        if fcntl is None:
+            yield True
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # A new descriptor each time: flock does not exclude holders of the same one
+        with open(self.path + suffix, "a") as handle:
+            try:
+                fcntl.flock(handle, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | (0 if blocking else fcntl.LOCK_NB))
+                acquired = True
+            except BlockingIOError:
+                acquired = False
+            yield acquired
+
+    def _log(self, rows: Optional[int] = None) -> np.ndarray:
+        """The first `rows` log records (all of them by default), memory-mapped"""
+        dtype = record_dtype(self.meta["dimension"])
+        available = os.path.getsize(self.log_path) // dtype.itemsize if os.path.exists(self.log_path) else 0
+        rows = available if rows is None else min(rows, available)
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.log_path, dtype=dtype, mode="r", shape=(rows,))
+
+    def _append(self, records: np.ndarray):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.log_path, "ab") as log:
+            log.write(records.tobytes())
+        self.rows += len(records)
+
+    def _new_index(self, factory: str):
+        faiss = _faiss()
+        index = faiss.index_factory(self.meta["dimension"], factory, faiss.METRIC_INNER_PRODUCT)
+        # IVF stores ids itself; IndexIDMap would get them wrong after remove_ids
+        return index if isinstance(index, faiss.IndexIVF) else faiss.IndexIDMap(index)
+
+    def _trained(self, factory: str) -> bool:
+        """Whether `factory` can take vectors without training (Flat, HNSW, SQfp16)"""
+        key = (self.meta["dimension"], factory)
+        if key not in _TRAINED:
+            _TRAINED[key] = self._new_index(factory).is_trained
+        return _TRAINED[key]
+
+    @staticmethod
+    def _inner(index):
+        """The index an IndexIDMap wraps, or the index itself"""
+        faiss = _faiss()
+        if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            return faiss.downcast_index(index.index)
+        return index
+
+    @classmethod
+    def _removable(cls, index) -> bool:
+        return not isinstance(cls._inner(index), _faiss().IndexHNSW)
+
+    @classmethod
+    def _ids(cls, index) -> np.ndarray:
+        """Chunk ids held by an index"""
+        faiss = _faiss()
+        if hasattr(index, "id_map"):
+            return faiss.vector_to_array(index.id_map)
+        inner = cls._inner(index)
+        if isinstance(inner, faiss.IndexIVF):
+            lists = inner.invlists
+            return np.concatenate([np.zeros(0, dtype=np.int64)] + [
+                faiss.rev_swig_ptr(lists.get_ids(number), lists.list_size(number)).copy()
+                for number in range(inner.nlist)
+                if lists.list_size(number)
+            ])
+        return np.arange(index.ntotal, dtype=np.int64)
+
+    def _read_base(self, name: str, mapped: bool = True):
+        faiss = _faiss()
+        flags = 0
+        if mapped and settings.faiss_mmap:
+            # Read-only views of the file; older FAISS maps IVF lists only and reads the rest
+            flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        return faiss.read_index(os.path.join(os.path.dirname(self.path), name), flags)
+
+    @staticmethod
+    def _delta_index(dimension: int):
+        faiss = _faiss()
+        return faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+
+    def _replay(self, index, records: np.ndarray, tombstones: frozenset) -> frozenset:
+        """Apply log records to a whole index being written as a base; returns its tombstones"""
+        if not len(records):
+            return tombstones
+        ids = np.asarray(records["id"])
+        # Consecutive runs of adds or removals, in log order
+        for run in np.split(np.arange(ids.size), np.flatnonzero(np.diff(ids < 0)) + 1):
+            run_ids = ids[run]
+            if run_ids[0] >= 0:
+                index.add_with_ids(np.asarray(records["vector"][run[0]:run[-1] + 1], dtype=np.float32), run_ids)
+                if tombstones:
+                    tombstones = tombstones - set(run_ids.tolist())
+            else:
+                removed = -1 - run_ids
+                if self._removable(index):
+                    index.remove_ids(removed)
+                else:
+                    tombstones = tombstones | set(removed.tolist())
+        return tombstones
+
+    def _drop(self, ids: np.ndarray):
+        """Take the current vectors of `ids` out of the delta, and out of the base by tombstoning them"""
+        if not ids.size:
+            return
+        self.delta.remove_ids(ids)
+        if self.base is not None:
+            self.tombstones = self.tombstones | set(ids.tolist())
+
+    def _apply(self, records: np.ndarray):
+        """Apply log records on top of the base"""
+        if not len(records):
+            return
+        ids = np.asarray(records["id"])
+        for run in np.split(np.arange(ids.size), np.flatnonzero(np.diff(ids < 0)) + 1):
+            run_ids = ids[run]
+            if run_ids[0] >= 0:
+                present = test_bits(self.members, run_ids)
+                self._drop(run_ids[present])
+                self.delta.add_with_ids(np.asarray(records["vector"][run[0]:run[-1] + 1], dtype=np.float32), run_ids)
+                self.members = set_bits(self.members, run_ids)
+                self.live += int(run_ids.size - present.sum())
+            else:
+                removed = -1 - run_ids
+                removed = removed[test_bits(self.members, removed)]
+                self._drop(removed)
+                self.members = clear_bits(self.members, removed)
+                self.live -= int(removed.size)
+
+    def _read_meta(self) -> bool:
+        """Read the metadata from disk; False when the shard has none yet"""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return False
+        with open(self.meta_path) as meta:
+            self.meta = json.load(meta)
+        self.meta_stamp = (stat.st_ino, stat.st_mtime_ns)
+        return True
+
+    def _reload(self):
+        """Map the base the metadata names and apply the log records after it"""
+        self.base = self._read_base(self.meta["index"]) if self.meta["index"] else None
+        self.delta = self._delta_index(self.meta["dimension"])
+        self.tombstones = frozenset(self.meta.get("tombstones", []))
+        self.members = np.zeros(0, dtype=np.uint8)
+        self.live = 0
+        if self.base is not None and self.base.ntotal:
+            ids = self._ids(self.base)
+            if self.tombstones:
+                ids = ids[~np.isin(ids, np.fromiter(self.tombstones, dtype=np.int64))]
+            self.members = set_bits(self.members, ids)
+            self.live = int(POPCOUNT[self.members].sum())
+        records = self._log()
+        self.rows = len(records)
+        self._apply(records[self.meta["rows"]:])
+
+    def _catch_up(self):
+        """Apply what other processes appended, or reload if one of them wrote a new base; holds the file lock"""
+        try:
+            stat = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns) != self.meta_stamp:
+            self._read_meta()
+            self._reload()
+            return
+        records = self._log()
+        if len(records) > self.rows:
+            self._apply(records[self.rows:])
+            self.rows = len(records)
+
+    def _adopt(self, index):
+        """Take over an index file written before the log existed, copying its vectors into the log"""
+        faiss = _faiss()
+        self.meta = {"dimension": index.d, "factory": "Flat", "index": os.path.basename(self.path), "rows": 0, "tombstones": []}
+        inner = self._inner(index)
+        if isinstance(inner, faiss.IndexFlat) and index.ntotal:
+            ids = self._ids(index)
+            for start in range(0, index.ntotal, BATCH_VECTORS):
+                count = min(BATCH_VECTORS, index.ntotal - start)
+                records = np.zeros(count, dtype=record_dtype(index.d))
+                records["id"] = ids[start:start + count]
+                records["vector"] = inner.reconstruct_n(start, count)
+                self._append(records)
+            self.meta["rows"] = self.rows
+        else:
+            print(f"Vector index {self.path} is not flat; its vectors cannot be copied into the log, reindex to rebuild it")
+        self._write_meta()
+
+    def load(self, dimension: Optional[int] = None) -> bool:
+        """Load the shard on first use; it is created when `dimension` is given. False if there is none"""
+        faiss = _faiss()
+        if faiss is None:
+            return False
+        with self.lock:
+            if self.delta is not None:
+                return True
+            # Exclusive: this may create the metadata, which another process may be doing too
+            with self._file_lock(".lock"):
+                if not self._read_meta():
+                    if os.path.exists(self.path):
+                        self._adopt(faiss.read_index(self.path))
+                    elif dimension:
+                        self.meta = {"dimension": dimension, "factory": "Flat", "index": None, "rows": 0, "tombstones": []}
+                        # Quantized indexes need training data; until then the shard is flat
+                        if self._trained(settings.faiss_index_factory):
+                            self.meta["factory"] = settings.faiss_index_factory
+                        self._write_meta()
+                    else:
+                        return False
+                    self._read_meta()
+                self._reload()
+            return True
+
+    def refresh(self):
+        """Pick up changes other processes made to the shard"""
+        with self.lock:
+            if self.delta is None:
+                return  # loading reads everything
+            with self._file_lock(".lock", exclusive=False):
+                self._catch_up()
+
+    def add(self, ids: List[int], vectors: np.ndarray):
+        with self.lock:
+            if not self.load(vectors.shape[1]):
+                return
+            records = np.zeros(len(ids), dtype=record_dtype(self.meta["dimension"]))
+            records["id"] = ids
+            records["vector"] = vectors
+            with self._file_lock(".lock"):
+                # Others' records first, so every process applies the log in file order
+                self._catch_up()
+                self._append(records)
+                self._apply(records)
+        Invalidation.publish("vectors", {"shard": self.key})
+        self._maintain()
+
+    def remove(self, ids: List[int]):
+        with self.lock:
+            if not self.load():
+                return
+            with self._file_lock(".lock"):
+                self._catch_up()
+                ids = np.asarray(ids, dtype=np.int64)
+                ids = ids[test_bits(self.members, ids)]
+                if not ids.size:
+                    return
+                records = np.zeros(ids.size, dtype=record_dtype(self.meta["dimension"]))
+                records["id"] = -1 - ids
+                self._append(records)
+                self._apply(records)
+        Invalidation.publish("vectors", {"shard": self.key})
+        self._maintain()
+
+    def _parameters(self, index, selector, widening: float):
+        faiss = _faiss()
+        inner = self._inner(index)
+        if isinstance(inner, faiss.IndexIVF):
+            parameters = faiss.SearchParametersIVF()
+            parameters.nprobe = min(int(settings.faiss_nprobe * widening), inner.nlist)
+        elif isinstance(inner, faiss.IndexHNSW):
+            parameters = faiss.SearchParametersHNSW()
+            parameters.efSearch = int(settings.faiss_ef_search * widening)
+        else:
+            parameters = faiss.SearchParameters()
+        if selector is not None:
+            parameters.sel = selector
+        return parameters
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+        allowed_count: int = 0
+    ) -> List[Tuple[int, float]]:
+        """Top-k chunks, only among the chunk ids set in the `allowed` bitmap (of `allowed_count` ids) when given"""
+        faiss = _faiss()
+        if self.delta is None and not self.load():
+            return []
+        query = vector.reshape(1, -1).astype(np.float32)
+        results: List[Tuple[int, float]] = []
+
+        # Not under the lock: a base is never modified, only replaced along with its tombstones
+        base, tombstones = self.base, self.tombstones
+        if base is not None and base.ntotal:
+            selector = None
+            widening = 1.0
+            if allowed is not None:
+                # An approximate index only visits part of the shard; with few allowed ids it must visit more
+                widening = min(max(base.ntotal / max(allowed_count, 1), 1.0), MAX_FILTER_WIDENING)
+                if tombstones:
+                    allowed = clear_bits(allowed.copy(), np.fromiter(tombstones, dtype=np.int64))
+                selector = faiss.IDSelectorBitmap(allowed.size, faiss.swig_ptr(allowed))
+            elif tombstones:
+                removed = np.fromiter(tombstones, dtype=np.int64)
+                batch = faiss.IDSelectorBatch(removed.size, faiss.swig_ptr(removed))
+                selector = faiss.IDSelectorNot(batch)
+            # Filtered during the scan, so restricted searches still get k results
+            scores, ids = base.search(query, k, params=self._parameters(base, selector, widening))
+            results += zip(ids[0].tolist(), scores[0].tolist())
+
+        # The delta is added to in place, but it is small and exact
+        with self.lock:
+            if self.delta.ntotal:
+                parameters = None
+                if allowed is not None:
+                    parameters = faiss.SearchParameters()
+                    parameters.sel = faiss.IDSelectorBitmap(allowed.size, faiss.swig_ptr(allowed))
+                scores, ids = self.delta.search(query, k, params=parameters)
+                results += zip(ids[0].tolist(), scores[0].tolist())
+        return [(chunk_id, score) for chunk_id, score in results if chunk_id != -1]
+
+    def _write_meta(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary_path = self.meta_path + ".tmp"
+        with open(temporary_path, "w") as meta:
+            json.dump(self.meta, meta)
+        os.replace(temporary_path, self.meta_path)
+
+    def _write_base(self, index) -> str:
+        """Write a new base file; only the holder of the build lock writes them"""
+        faiss = _faiss()
+        name = f"{os.path.basename(self.path)}.{self.meta.get('generation', 0) + 1}.index"
+        directory = os.path.dirname(self.path) or "."
+        temporary_path = os.path.join(directory, name + ".tmp")
+        faiss.write_index(index, temporary_path)
+        os.replace(temporary_path, os.path.join(directory, name))
+        return name
+
+    def _swap_base(self, name: str, rows: int, tombstones: frozenset, **changes):
+        """Point the metadata at a new base holding the first `rows` log records; holds the file lock"""
+        previous = self.meta["index"]
+        self.meta.update(changes, index=name, rows=rows, tombstones=sorted(tombstones), generation=self.meta.get("generation", 0) + 1)
+        self._write_meta()
+        self._read_meta()
+        if self.delta is not None:
+            self._reload()
+        # Processes still searching the old file keep their mapping of it
+        if previous and previous != name and os.path.exists(os.path.join(os.path.dirname(self.path), previous)):
+            os.remove(os.path.join(os.path.dirname(self.path), previous))
+
+    def save(self) -> bool:
+        """Write the base and the records after it to a new base and swap it in.
+
+        False if there was nothing to write, or a save or rebuild is running
+        here or in another process.
+        """
+        with self.lock:
+            if self.delta is None or self.rebuilding:
+                return False
+            self.rebuilding = True
+        try:
+            with self._file_lock(".build.lock", blocking=False) as acquired:
+                if not acquired:
+                    return False
+                with self.lock, self._file_lock(".lock", exclusive=False):
+                    self._catch_up()
+                    meta, rows = dict(self.meta), self.rows
+                if meta["index"] and rows == meta["rows"]:
+                    return False
+                # A private copy: the mapped base is read-only
+                index = self._read_base(meta["index"], mapped=False) if meta["index"] else self._new_index(meta["factory"])
+                tombstones = self._replay(index, self._log(rows)[meta["rows"]:], frozenset(meta.get("tombstones", [])))
+                name = self._write_base(index)
+                del index
+                with self.lock, self._file_lock(".lock"):
+                    self._swap_base(name, rows, tombstones)
+            Invalidation.publish("vectors", {"shard": self.key})
+            return True
+        finally:
+            self.rebuilding = False
+
+    def _wanted_factory(self, live: int) -> str:
+        """The configured factory, or Flat while there are too few vectors to train it"""
+        factory = settings.faiss_index_factory
+        if factory == self.meta["factory"] or live >= settings.faiss_train_size or self._trained(factory):
+            return factory
+        return "Flat"
+
+    def _maintain(self):
+        """Start a background rebuild when the index type should change or the log is mostly dead
+        records, or a save when FAISS_SAVE_EVERY records are not in the base"""
+        with self.lock:
+            if self.delta is None or self.rebuilding:
+                return
+            factory = self._wanted_factory(self.live)
+            if factory != self.failed and (
+                factory != self.meta["factory"] or self.rows - self.live > max(self.live, settings.faiss_save_every)
+            ):
+                self.start_rebuild()
+            elif self.rows - self.meta["rows"] >= settings.faiss_save_every:
+                threading.Thread(target=self.save, name=f"vector-save-{self.key or 'main'}", daemon=True).start()
+
+    def start_rebuild(self, factory: Optional[str] = None):
+        threading.Thread(target=self.rebuild, args=(factory,), name=f"vector-rebuild-{self.key or 'main'}", daemon=True).start()
+
+    def rebuild(self, factory: Optional[str] = None) -> bool:
+        """Build a new base from the live log records and swap it in.
+
+        The log is compacted to the live records along the way. Vectors added
+        or removed meanwhile, by any process, are appended to the compacted
+        log before the swap, which is the only step that holds the file lock;
+        queries keep using the old base until then. Returns False if there
+        was nothing to rebuild or another save or rebuild is running.
+        """
+        with self.lock:
+            if self.rebuilding:
+                return False
+            self.rebuilding = True
+        try:
+            with self._file_lock(".build.lock", blocking=False) as acquired:
+                if not acquired:
+                    return False
+                # After taking the build lock, so the metadata names the latest base
+                with self.lock, self._file_lock(".lock", exclusive=False):
+                    if self.delta is not None:
+                        self._catch_up()
+                    elif not self._read_meta():
+                        return False
+                    start = len(self._log())
+                records = self._log(start)
+                live = live_positions(np.asarray(records["id"]))
+                factory = factory or self._wanted_factory(live.size)
+                index = self._new_index(factory)
+                if not index.is_trained:
+                    # Trained on a sample; IVF centroids and PQ codebooks need far fewer vectors than the corpus
+                    sample = np.random.default_rng(0).choice(live, min(live.size, settings.faiss_train_size), replace=False)
+                    index.train(np.asarray(records["vector"][np.sort(sample)], dtype=np.float32))
+
+                temporary_path = self.log_path + ".tmp"
+                with open(temporary_path, "wb") as log:
+                    for batch in range(0, live.size, BATCH_VECTORS):
+                        chunk = records[live[batch:batch + BATCH_VECTORS]]
+                        index.add_with_ids(np.asarray(chunk["vector"], dtype=np.float32), chunk["id"])
+                        log.write(chunk.tobytes())
+                name = self._write_base(index)
+                vectors = index.ntotal
+                del index
+
+                with self.lock, self._file_lock(".lock"):
+                    tail = np.array(self._log()[start:])
+                    with open(temporary_path, "ab") as log:
+                        log.write(tail.tobytes())
+                    os.replace(temporary_path, self.log_path)
+                    self._swap_base(name, live.size, frozenset(), factory=factory)
+            Invalidation.publish("vectors", {"shard": self.key})
+            print(f"Rebuilt vector index {self.path}: {vectors} vectors, {factory}")
+            return True
+        except Exception:
+            self.failed = factory
+            raise
+        finally:
+            self.rebuilding = False
+
+class VectorIndex:
+    """FAISS inner-product search over chunk embeddings, keyed by chunk id.
+
+    Vectors live in one shard per key of FAISS_SHARD_BY (department or
+    creation year), or in a single shard at FAISS_INDEX_PATH; a search runs
+    on each shard and merges the results by score. FAISS_INDEX_FACTORY picks
+    the index type, e.g. "HNSW32,SQfp16" or "IVF4096,PQ32" to hold millions
+    of vectors in a fraction of the memory of a flat float32 index.
+    """
+
+    _shards: Optional[Dict[Optional[str], VectorShard]] = None
+    _refreshed_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _path(key: Optional[str]) -> str:
+        if key is None:
+            return settings.faiss_index_path
+        return os.path.join(settings.faiss_index_path + ".shards", SHARD_PREFIX + quote(key, safe=""))
+
+    @classmethod
+    def _stored_keys(cls) -> List[Optional[str]]:
+        # The main index is kept when FAISS_SHARD_BY is turned on, until reshard moves its vectors
+        keys = [None] if VectorShard(None, cls._path(None)).exists() else []
+        for meta_path in glob.glob(os.path.join(glob.escape(settings.faiss_index_path + ".shards"), "*.meta.json")):
+            keys.append(unquote(os.path.basename(meta_path)[len(SHARD_PREFIX):-len(".meta.json")]))
+        return keys
+
+    @classmethod
+    def _load_shards(cls) -> Dict[Optional[str], VectorShard]:
+        with cls._lock:
+            if cls._shards is None:
+                cls._shards = {key: VectorShard(key, cls._path(key)) for key in cls._stored_keys()}
+                cls._refreshed_at = time.monotonic()
+            return cls._shards
+
+    @classmethod
+    def _refresh(cls):
+        """Pick up shards created and vectors written by processes on other hosts, whose messages do not reach this one"""
+        if settings.cache_refresh_seconds <= 0 or time.monotonic() - cls._refreshed_at < settings.cache_refresh_seconds:
+            return
+        cls._refreshed_at = time.monotonic()
+        for key in cls._stored_keys():
+            cls._shard(key)
+        for shard in list(cls._load_shards().values()):
+            shard.refresh()
+
+    @classmethod
+    def _shard(cls, key: Optional[str]) -> VectorShard:
+        shards = cls._load_shards()
+        with cls._lock:
+            if key not in shards:
+                shards[key] = VectorShard(key, cls._path(key))
+            return shards[key]
+
+    @classmethod
+    def available(cls) -> bool:
+        return _faiss() is not None
+
+    @classmethod
+    def add(cls, ids: List[int], vectors: np.ndarray, key: Optional[str] = None):
+        """Add vectors to the shard for `key` (see shard_key)"""
+        if ids and cls.available():
+            cls._shard(key).add(ids, vectors)
+
+    @classmethod
+    def remove(cls, ids: List[int]):
+        if not ids or not cls.available():
+            return
+        for shard in list(cls._load_shards().values()):
+            shard.remove(ids)
+
+    @classmethod
+    def search(
+        cls,
+        vector: np.ndarray,
+        k: int,
+        allowed: Optional[np.ndarray] = None,
+        departments: Optional[Tuple[str, ...]] = None
+    ) -> List[Tuple[int, float]]:
+        """Top-k chunks over all shards, only among the chunk ids set in the `allowed` bitmap when given.
+
+        With department shards, `departments` skips the shards of the others.
+        """
+        if not cls.available() or (allowed is not None and not allowed.any()):
+            return []
+        cls._refresh()
+        allowed_count = int(POPCOUNT[allowed].sum()) if allowed is not None else 0
+        results: Dict[int, float] = {}
+        for shard in list(cls._load_shards().values()):
+            if departments is not None and settings.faiss_shard_by == "department" and shard.key is not None and shard.key not in departments:
+                continue
+            for chunk_id, score in shard.search(vector, k, allowed, allowed_count):
+                # An id re-added to an index that keeps tombstoned vectors can appear twice
+                if score > results.get(chunk_id, float("-inf")):
+                    results[chunk_id] = score
+        return heapq.nlargest(k, results.items(), key=lambda item: item[1])
+
+    @classmethod
+    def save(cls):
+        """Write every index with records not yet in its file; the logs are always current"""
+        if cls._shards is None or not cls.available():
+            return
+        for shard in list(cls._shards.values()):
+            shard.save()
+
+    @classmethod
+    def status(cls) -> List[Dict]:
+        return [
+            {
+                "shard": shard.key,
+                "factory": shard.meta["factory"],
+                "vectors": shard.live,
+                "log_records": shard.rows,
+                "base_vectors": shard.base.ntotal - len(shard.tombstones) if shard.base is not None else 0,
+                "delta_vectors": shard.delta.ntotal,
+                "mapped": settings.faiss_mmap and shard.base is not None,
+                "rebuilding": shard.rebuilding,
+            }
+            for shard in list(cls._load_shards().values())
+            if shard.load()
+        ] if cls.available() else []
+
+    @classmethod
+    def preload(cls) -> int:
+        """Load every shard without starting background work; the server master calls this before forking
+        workers, which then share the mapped bases. Returns the number of vectors loaded."""
+        if not cls.available():
+            return 0
+        return sum(shard.live for shard in list(cls._load_shards().values()) if shard.load())
+
+    @classmethod
+    def _invalidate(cls, message: Dict):
+        """Another process changed a shard: catch up with its log, or rescan after a reshard"""
+        if message.get("reset"):
+            with cls._lock:
+                cls._shards = None
+            return
+        if "shard" in message:
+            # Creates the shard here if another process added it
+            cls._shard(message["shard"]).refresh()
+            return
+        for shard in list(cls._load_shards().values()):
+            shard.refresh()
+
+    @classmethod
+    def start_rebuild(cls, factory: Optional[str] = None):
+        """Rebuild every shard in the background; queries keep using the current indexes meanwhile"""
+        if cls.available():
+            for shard in list(cls._load_shards().values()):
+                shard.start_rebuild(factory)
+
+    @classmethod
+    def rebuild(cls, factory: Optional[str] = None) -> int:
+        """Rebuild every shard in this thread; returns the number rebuilt"""
+        if not cls.available():
+            return 0
+        return sum(shard.rebuild(factory) for shard in list(cls._load_shards().values()))
+
+    @classmethod
+    def reshard(cls, db: Session) -> Dict[Optional[str], int]:
+        """Move every vector to the shard FAISS_SHARD_BY now assigns it, then build the shards.
+
+        Vectors of chunks that no longer exist are dropped. Meant for the
+        rebuild script; changes made while it runs may be lost.
+        """
+        if not cls.available():
+            return {}
+        shards = cls._load_shards()
+        rows = db.execute(text(
+            "SELECT c.id, d.department, d.created_at FROM document_chunks c JOIN documents d ON d.id = c.document_id ORDER BY c.id"
+        )).all()
+        chunk_ids = np.asarray([row[0] for row in rows], dtype=np.int64)
+        keys = [shard_key(row[1], row[2]) for row in rows]
+        names = sorted(set(keys), key=lambda key: (key is not None, key or ""))
+        positions = {key: position for position, key in enumerate(names)}
+        codes = np.asarray([positions[key] for key in keys], dtype=np.int64)
+
+        # Copied into new logs beside the old shards first, so nothing is lost if this fails
+        staging = settings.faiss_index_path + ".reshard"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        targets = [VectorShard(key, os.path.join(staging, str(position))) for position, key in enumerate(names)]
+        dimension = None
+        for shard in shards.values():
+            # Keeps loading from starting a background rebuild of a shard about to be replaced
+            shard.rebuilding = True
+            if not shard.load():
+                continue
+            dimension = shard.meta["dimension"]
+            with shard.lock:
+                records = shard._log()
+                live = live_positions(np.asarray(records["id"]))
+                for batch in range(0, live.size, BATCH_VECTORS):
+                    chunk = records[live[batch:batch + BATCH_VECTORS]]
+                    positions = np.minimum(np.searchsorted(chunk_ids, chunk["id"]), max(chunk_ids.size - 1, 0))
+                    known = chunk_ids[positions] == chunk["id"] if chunk_ids.size else np.zeros(len(chunk), dtype=bool)
+                    for code, target in enumerate(targets):
+                        selected = chunk[known & (codes[positions] == code)]
+                        if len(selected):
+                            target._append(selected)
+
+        with cls._lock:
+            for shard in shards.values():
+                for path in glob.glob(glob.escape(shard.path) + ".*") + [shard.path]:
+                    if os.path.isfile(path):
+                        os.remove(path)
+            shutil.rmtree(settings.faiss_index_path + ".shards", ignore_errors=True)
+            cls._shards = {}
+            counts = {}
+            for target in targets:
+                if not target.rows:
+                    continue
+                shard = VectorShard(target.key, cls._path(target.key))
+                os.makedirs(os.path.dirname(shard.path) or ".", exist_ok=True)
+                os.replace(target.log_path, shard.log_path)
+                shard.meta = {"dimension": dimension, "factory": "Flat", "index": None, "rows": 0, "tombstones": []}
+                shard.rows = target.rows
+                shard._write_meta()
+                cls._shards[target.key] = shard
+                counts[target.key] = target.rows
+        shutil.rmtree(staging, ignore_errors=True)
+
+        for shard in list(cls._shards.values()):
+            shard.rebuild()
+        Invalidation.publish("vectors", {"reset": True})
+        return counts
+
+Invalidation.subscribe("vectors", VectorIndex._invalidate)
@@ -0,0 +1,210 @@
+"""Generate a synthetic KMRL document corpus for benchmarks.
+
+Documents are built from templates with stations, trainsets, departments and
+dates drawn from a seeded RNG, so the same seed always gives the same corpus.
+Each document is written as plain text, a scanned-image fixture (grayscale
+PNG) or a PDF; manifest.json records the ground-truth text of every file,
+which the stub OCR returns for image fixtures.
+
+    python -m benchmarks.corpus --output bench-corpus --documents 200 --text-kb 2 16 64
+    python -m benchmarks.corpus --output bench-corpus --formats txt png --image-size 1240x1754
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import struct
+import zlib
+
+STATIONS = [
+    "Aluva", "Pulinchodu", "Companypady", "Ambattukavu", "Muttom", "Kalamassery", "Cochin University",
+    "Pathadipalam", "Edapally", "Changampuzha Park", "Palarivattom", "JLN Stadium", "Kaloor",
+    "Town Hall", "M.G Road", "Maharaja's College", "Ernakulam South", "Kadavanthra",
+    "Elamkulam", "Vyttila", "Thaikoodam", "Petta", "Vadakkekotta", "SN Junction", "Thrippunithura",
+]
+DEPARTMENTS = ["Operations", "Engineering", "Finance", "Safety", "HR", "Procurement"]
+EQUIPMENT = ["escalator", "lift", "platform screen door", "fire alarm panel", "signalling relay", "traction transformer", "CCTV camera", "ticket vending machine"]
+
+TEMPLATES = {
+    "safety": (
+        "Safety",
+        "Safety circular {number}: {equipment} inspection at {station}",
+        [
+            "Station staff at {station} reported that the {equipment} failed a routine inspection on {date}.",
+            "All station controllers must verify the {equipment} at the start of every shift until further notice.",
+            "Any fault must be logged with the Operations Control Centre and reported to the safety officer within one hour.",
+            "An evacuation drill will be conducted at {station} and {other_station} before the end of the month.",
+            "Passengers must be guided away from the affected area and public address announcements made every ten minutes.",
+        ],
+    ),
+    "maintenance": (
+        "Engineering",
+        "Maintenance report {number}: {trainset} withdrawn at {station}",
+        [
+            "Trainset {trainset} was withdrawn from service at {station} on {date} after a brake fault alarm.",
+            "Inspection at Muttom depot found a worn pad on the second bogie and the {equipment} needed recalibration.",
+            "The pad was replaced and the train returned to service after a successful brake test.",
+            "Preventive inspection intervals for {trainset} will be reviewed with the rolling stock supplier.",
+            "Depot staff are asked to log pad thickness readings at every weekly check.",
+        ],
+    ),
+    "budget": (
+        "Finance",
+        "Budget review {number}: capital works at {station}",
+        [
+            "The annual budget review for capital works at {station} will be held on {date}.",
+            "Department heads must submit revised expenditure estimates of Rs. {amount} lakh for the {equipment} replacement.",
+            "Pending tender details and procurement plans are to be sent to the finance office.",
+            "Projects will be prioritised by safety impact and expected ridership benefit at {station} and {other_station}.",
+            "Invoices above Rs. {amount} lakh require approval from the director of finance.",
+        ],
+    ),
+    "tender": (
+        "Procurement",
+        "Tender notice {number}: supply of {equipment} spares",
+        [
+            "Kochi Metro Rail Limited invites sealed bids for the supply of {equipment} spares for {station}.",
+            "The estimated contract value is Rs. {amount} lakh and the bid validity is ninety days.",
+            "Bidders must submit an earnest money deposit before {date}.",
+            "A pre-bid meeting will be held at the {other_station} depot conference hall.",
+            "Technical queries may be addressed to the procurement cell in writing.",
+        ],
+    ),
+    "hr": (
+        "HR",
+        "HR notice {number}: training schedule for {station} staff",
+        [
+            "Refresher training on evacuation procedures for {station} staff begins on {date}.",
+            "Station controllers, customer relations staff and security personnel must attend.",
+            "Attendance will be recorded and staff absent without leave will be rescheduled.",
+            "Training on the {equipment} will be delivered by the engineering department at {other_station}.",
+            "Leave applications for the training period will not be approved except in emergencies.",
+        ],
+    ),
+}
+
+def document_text(rng, number, target_chars):
+    document_type, (department, title_template, sentences) = rng.choice(list(TEMPLATES.items()))
+    values = {
+        "number": f"KMRL/{department[:3].upper()}/{number:05d}",
+        "station": rng.choice(STATIONS),
+        "other_station": rng.choice(STATIONS),
+        "equipment": rng.choice(EQUIPMENT),
+        "trainset": f"TS-{rng.randint(1, 25):02d}",
+        "date": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024",
+        "amount": rng.randint(5, 900),
+    }
+    title = title_template.format(**values)
+    paragraphs = [title]
+    while sum(len(paragraph) for paragraph in paragraphs) < target_chars:
+        values["station"] = rng.choice(STATIONS)
+        values["date"] = f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024"
+        paragraph = " ".join(sentence.format(**values) for sentence in rng.sample(sentences, 3))
+        paragraphs.append(paragraph)
+    return {
+        "title": title,
+        "department": department,
+        "document_type": document_type,
+        "text": "\n\n".join(paragraphs),
+    }
+
+def write_png(path, width, height, seed):
+    """Grayscale page with scan noise; the content is irrelevant to the stub OCR"""
+    import numpy as np
+
+    generator = np.random.default_rng(seed)
+    pixels = np.full((height, width), 245, dtype=np.uint8)
+    # Dark bands where text lines would be, plus sensor noise
+    for top in range(height // 10, height - height // 10, 24):
+        pixels[top:top + 10, width // 12:width - width // 12] = 40
+    pixels = np.clip(pixels.astype(np.int16) + generator.integers(-12, 12, pixels.shape), 0, 255).astype(np.uint8)
+    raw = b"".join(b"\x00" + row.tobytes() for row in pixels)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+def write_pdf(path, text):
+    """Single-page PDF with the text as a Helvetica content stream"""
+    def escape(line):
+        return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    lines = [line[i:i + 90] for line in text.splitlines() for i in range(0, max(len(line), 1), 90)][:60]
+    stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({escape(line)}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream.encode('latin-1', 'replace'))} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1", "replace")
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(output)
+
+def generate(output, documents=100, text_kb=(2, 16), formats=("txt", "png", "pdf"), image_size=(1240, 1754), seed=42):
+    """Write the corpus and its manifest; returns the manifest entries"""
+    os.makedirs(output, exist_ok=True)
+    rng = random.Random(seed)
+    entries = []
+    for number in range(documents):
+        file_format = formats[number % len(formats)]
+        size_kb = text_kb[number % len(text_kb)]
+        document = document_text(rng, number, size_kb * 1024)
+        filename = f"doc-{number:05d}-{size_kb}kb.{file_format}"
+        path = os.path.join(output, filename)
+        if file_format == "txt":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(document["text"])
+        elif file_format == "png":
+            write_png(path, image_size[0], image_size[1], seed + number)
+        elif file_format == "pdf":
+            write_pdf(path, document["text"])
+        else:
+            raise ValueError(f"Unknown format: {file_format}")
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        entries.append({"filename": filename, "format": file_format, "size_kb": size_kb, "sha256": digest, **document})
+
+    with open(os.path.join(output, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "documents": entries}, f, indent=2)
+    return entries
+
+def load_manifest(corpus_dir):
+    with open(os.path.join(corpus_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)["documents"]
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--text-kb", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--formats", nargs="+", choices=["txt", "png", "pdf"], default=["txt", "png", "pdf"])
+    parser.add_argument("--image-size", type=parse_size, default=(1240, 1754), help="WIDTHxHEIGHT of image fixtures")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    entries = generate(args.output, args.documents, args.text_kb, args.formats, args.image_size, args.seed)
+    total_mb = sum(os.path.getsize(os.path.join(args.output, entry["filename"])) for entry in entries) / 1024 / 1024
+    print(f"Wrote {len(entries)} documents ({total_mb:.1f} MB) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Compare summarization/embedding inference backends on CPU.
+
+Each backend runs in its own subprocess so RSS numbers are not polluted by
+the others. Summaries are scored with ROUGE against --references if given,
+otherwise against the pytorch backend's output (agreement with baseline).
+
+    python -m benchmarks.inference_benchmark --task summarize --backends pytorch quantized onnx
+    python -m benchmarks.inference_benchmark --task embed --threads 4 --output results.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+SAMPLE_TEXTS = [
+    "Kochi Metro Rail Limited conducted an emergency evacuation drill at Aluva station on Monday. "
+    "Station staff guided passengers from the platforms to the concourse within four minutes. "
+    "The fire alarm panel and public address system performed as expected, but two emergency exit "
+    "signs on the southern stairway were found to be faulty and have been scheduled for replacement. "
+    "All station controllers must complete refresher training on evacuation procedures by the end of the month.",
+    "The maintenance division reports that trainset TS-07 was withdrawn from service after a brake "
+    "fault alarm during the morning peak. Inspection at Muttom depot found a worn pad on the second "
+    "bogie. The pad was replaced and the train returned to service after a successful brake test. "
+    "Preventive inspection intervals for brake pads across the fleet will be reviewed with the rolling "
+    "stock supplier, and depot staff are asked to log pad thickness readings at every weekly check.",
+    "This circular informs all departments that the annual budget review for the financial year will "
+    "be held next week. Department heads must submit revised expenditure estimates, pending tender "
+    "details and procurement plans to the finance office. Capital projects, including escalator "
+    "replacement at Vyttila and platform screen door trials, will be prioritised based on safety impact "
+    "and expected ridership benefit.",
+]
+
+def load_texts(input_dir):
+    if not input_dir:
+        return SAMPLE_TEXTS
+    texts = []
+    for path in sorted(glob.glob(os.path.join(input_dir, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read())
+    return texts
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def _tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+def _ngrams(tokens, n):
+    return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap or not candidate_total or not reference_total:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+def rouge(candidate, reference):
+    """ROUGE-1/2/L F1 on lowercased word tokens"""
+    candidate_tokens, reference_tokens = _tokens(candidate), _tokens(reference)
+    scores = {}
+    for n in (1, 2):
+        c, r = _ngrams(candidate_tokens, n), _ngrams(reference_tokens, n)
+        scores[f"rouge{n}"] = _f1(sum((c & r).values()), sum(c.values()), sum(r.values()))
+
+    # Longest common subsequence, O(n*m) with a rolling row
+    previous = [0] * (len(reference_tokens) + 1)
+    for token in candidate_tokens:
+        current = [0]
+        for j, reference_token in enumerate(reference_tokens):
+            current.append(previous[j] + 1 if token == reference_token else max(previous[j + 1], current[j]))
+        previous = current
+    scores["rougeL"] = _f1(previous[-1], len(candidate_tokens), len(reference_tokens))
+    return scores
+
+def run_worker(task, backend, texts, repeat):
+    """Runs inside the subprocess for one backend"""
+    from app.services.model_backend import load_embedder, load_summarizer
+
+    baseline_rss = current_rss_mb()
+    started = time.perf_counter()
+    model = load_summarizer(backend) if task == "summarize" else load_embedder(backend)
+    load_seconds = time.perf_counter() - started
+
+    # Warm-up call so one-time graph/kernel setup is not counted as latency
+    if task == "summarize":
+        model(texts[0], max_length=150, min_length=30, do_sample=False, truncation=True)
+    else:
+        model.encode(texts[:1])
+
+    latencies = []
+    outputs = []
+    for _ in range(repeat):
+        outputs = []
+        for text in texts:
+            started = time.perf_counter()
+            if task == "summarize":
+                outputs.append(model(text, max_length=150, min_length=30, do_sample=False, truncation=True)[0]["summary_text"])
+            else:
+                outputs.append(model.encode([text], normalize_embeddings=True)[0].tolist())
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+        },
+        "throughput_per_second": round(len(latencies) / sum(latencies), 3),
+        "rss_mb": {
+            "before_load": baseline_rss,
+            "after_run": current_rss_mb(),
+            "peak": round(peak_rss_mb(), 1),
+        },
+        "outputs": outputs,
+    }
+
+def quality(task, result, references):
+    if task == "summarize":
+        scores = [rouge(candidate, reference) for candidate, reference in zip(result["outputs"], references)]
+        return {key: round(statistics.mean(score[key] for score in scores), 4) for key in ("rouge1", "rouge2", "rougeL")}
+    similarities = [
+        sum(a * b for a, b in zip(candidate, reference))
+        for candidate, reference in zip(result["outputs"], references)
+    ]
+    return {"cosine_to_reference": round(statistics.mean(similarities), 4)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--task", choices=["summarize", "embed"], default="summarize")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "quantized", "onnx"])
+    parser.add_argument("--input-dir", help="directory of .txt documents; defaults to built-in KMRL samples")
+    parser.add_argument("--references", help="JSON list of reference summaries, one per input text")
+    parser.add_argument("--threads", type=int, default=0, help="sets INFERENCE_THREADS for every backend")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    texts = load_texts(args.input_dir)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.task, args.worker, texts, args.repeat)))
+        return
+
+    environment = dict(os.environ)
+    if args.threads:
+        environment["INFERENCE_THREADS"] = str(args.threads)
+
+    results = []
+    for backend in args.backends:
+        command = [sys.executable, "-m", "benchmarks.inference_benchmark", "--task", args.task,
+                   "--repeat", str(args.repeat), "--worker", backend]
+        if args.input_dir:
+            command += ["--input-dir", args.input_dir]
+        completed = subprocess.run(command, capture_output=True, text=True, env=environment)
+        if completed.returncode != 0:
+            print(f"[FAIL] {backend}: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'no output'}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        return
+
+    if args.references:
+        with open(args.references, encoding="utf-8") as f:
+            references = json.load(f)
+    else:
+        baseline = next((result for result in results if result["backend"] == "pytorch"), results[0])
+        references = baseline["outputs"]
+
+    print(f"{'backend':<10} {'load s':>8} {'p50 ms':>9} {'p95 ms':>9} {'per s':>7} {'rss MB':>8} {'peak MB':>8}  quality")
+    for result in results:
+        result["quality"] = quality(args.task, result, references)
+        print(
+            f"{result['backend']:<10} {result['load_seconds']:>8} {result['latency_ms']['p50']:>9} "
+            f"{result['latency_ms']['p95']:>9} {result['throughput_per_second']:>7} "
+            f"{result['rss_mb']['after_run'] or 0:>8.0f} {result['rss_mb']['peak']:>8.0f}  {result['quality']}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"task": args.task, "threads": args.threads, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
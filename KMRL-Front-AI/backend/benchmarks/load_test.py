@@ -0,0 +1,127 @@
+"""Concurrent load test against a running API server.
+
+Sweeps client concurrency and reports throughput and latency per level. When
+blocking work runs on the event loop, throughput stays flat as concurrency
+grows and latency of cheap endpoints tracks the slowest call; with blocking
+work on executors, cheap endpoints keep their latency under load. Run it
+against two builds to compare, and check the server's event-loop stats.
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.load_test --email admin@kmrl.co.in --password admin123 --concurrency 1 8 32
+    python -m benchmarks.load_test --mix slow --duration 30 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import httpx
+
+# (method, path, body); {document_id} is filled from the document list
+MIXES = {
+    # Pure DB reads: the threadpool should scale these with concurrency
+    "fast": [
+        ("GET", "/api/v1/documents/?limit=10", None),
+        ("GET", "/api/v1/documents/{document_id}", None),
+        ("GET", "/api/v1/documents/{document_id}/related", None),
+        ("GET", "/api/v1/auth/profile", None),
+    ],
+    # Model work on the inference pool mixed with cheap reads
+    "slow": [
+        ("GET", "/api/v1/documents/?limit=10", None),
+        ("GET", "/api/v1/documents/{document_id}", None),
+        ("POST", "/api/v1/documents/search", {"query": "safety inspection", "limit": 5}),
+        ("POST", "/api/v1/ai/classify-document?document_id={document_id}", None),
+        ("POST", "/api/v1/documents/{document_id}/summarize?summary_type=extractive", None),
+    ],
+}
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+async def login(client, email, password):
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def worker(client, headers, requests, document_ids, deadline, results):
+    while time.perf_counter() < deadline:
+        method, path, body = random.choice(requests)
+        path = path.format(document_id=random.choice(document_ids))
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body, headers=headers)
+            ok = response.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        results.append((path.split("?")[0], time.perf_counter() - started, ok))
+
+async def run_level(args, headers, document_ids, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        results = []
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            worker(client, headers, MIXES[args.mix], document_ids, deadline, results)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+        health = (await client.get("/health")).json()
+
+    latencies = [latency for _, latency, _ in results]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "throughput_per_second": round(len(results) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+            "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+        },
+        "event_loop": {
+            key: value for key, value in health.get("event_loop", {}).items() if key != "recent_stalls"
+        },
+    }
+
+async def main_async(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        headers = await login(client, args.email, args.password)
+        documents = (await client.get("/api/v1/documents/?limit=100", headers=headers)).json()
+    document_ids = [document["id"] for document in documents] or [1]
+
+    levels = []
+    for concurrency in args.concurrency:
+        levels.append(await run_level(args, headers, document_ids, concurrency))
+        level = levels[-1]
+        speedup = level["throughput_per_second"] / (levels[0]["throughput_per_second"] or 1)
+        print(
+            f"concurrency {concurrency:>4}: {level['throughput_per_second']:>8} req/s "
+            f"(x{speedup:.2f})  p50 {level['latency_ms']['p50']} ms  p95 {level['latency_ms']['p95']} ms  "
+            f"errors {level['errors']}  max loop lag {level['event_loop'].get('max_lag_ms')} ms"
+        )
+    return levels
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@kmrl.co.in")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="fast")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    levels = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "mix": args.mix, "duration": args.duration, "levels": levels}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Memory per worker and throughput scaling of the gunicorn deployment.
+
+Seeds a scratch data directory (synthetic corpus uploaded through the app,
+plus --vectors padding vectors written to a saved FAISS base), then starts
+gunicorn with gunicorn.conf.py for each worker count, with and without
+preloading, and for each:
+
+- drives a search/get/suggest mix over HTTP at --concurrency and reports
+  throughput, p50/p95 latency and scaling against one worker;
+- reads /proc/<pid>/smaps_rollup of the master and every worker: USS is what
+  a worker adds on its own, PSS summed over all processes is what the
+  deployment costs in total;
+- uploads a probe document through one worker and checks that every worker
+  then suggests its title and counts its vectors (cache invalidation).
+
+Models are stubs (see benchmarks/stubs.py); --model-mb of ballast stands in
+for their weights so preloading has something to share. Linux only.
+
+    python -m benchmarks.multiworker
+    python -m benchmarks.multiworker --workers 1 2 4 8 --vectors 500000 --model-mb 800 --output multiworker.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import corpus as corpus_module
+from .suite import Context, SEARCH_TERMS, environment, percentile, prepare_environment, upload
+
+PROBE_TITLE = "Zephyrine coherence probe"
+
+def served_app():
+    """App factory gunicorn loads: the real app with stub models holding --model-mb of weights"""
+    import numpy as np
+    from app.main import app
+    from app.services.embedding_service import EmbeddingService
+    from . import stubs
+
+    stubs.install(stubs.ModelCost(float(os.environ.get("BENCH_MODEL_COST_MS", "2")), 0.0))
+    # Written once, then only read, like loaded weights
+    model_mb = int(os.environ.get("BENCH_MODEL_MB", "0"))
+    EmbeddingService._model.weights = np.random.default_rng(0).random(model_mb * 1024 * 1024 // 8)
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def seed(args, entries, corpus_dir):
+    """Upload the corpus, pad the vector index, and save everything for the servers to load"""
+    import httpx
+    import numpy as np
+    from app.main import app
+    from app.services.vector_store import VectorIndex
+    from . import stubs
+
+    async with app.router.lifespan_context(app):
+        stubs.install(stubs.ModelCost(0.0, 0.0))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            await client.post("/api/v1/auth/register", json={
+                "email": "bench@kmrl.co.in", "name": "Benchmark", "password": "bench", "role": "admin", "department": "Operations"
+            })
+            token = (await client.post("/api/v1/auth/login", json={"email": "bench@kmrl.co.in", "password": "bench"})).json()["access_token"]
+            context = Context({"Authorization": f"Bearer {token}"}, entries, corpus_dir, random.Random(args.seed))
+            for _ in entries:
+                await upload(client, context)
+
+        def pad():
+            # Non-positive components, so they never outscore a real chunk for the stub's non-negative queries
+            rng = np.random.default_rng(args.seed)
+            first_id = 10_000_000
+            for start in range(0, args.vectors, 10000):
+                count = min(10000, args.vectors - start)
+                vectors = -np.abs(rng.standard_normal((count, 384))).astype(np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                VectorIndex.add(list(range(first_id + start, first_id + start + count)), vectors)
+            VectorIndex.save()
+
+        await asyncio.to_thread(pad)
+    return context.document_ids
+
+def worker_pids(master):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as f:
+                if any(line.split()[1:] == [str(master)] for line in f if line.startswith("PPid:")):
+                    pids.append(int(entry))
+        except OSError:
+            continue
+    return sorted(pids)
+
+def memory_mb(pid):
+    """RSS, PSS and USS (private pages) of a process, in MB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": round(fields.get("Rss", 0) / 1024, 1),
+        "pss": round(fields.get("Pss", 0) / 1024, 1),
+        "uss": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+def start_server(backend_dir, port, workers, preload, args):
+    env = dict(
+        os.environ,
+        PYTHONPATH=backend_dir,
+        BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD="1" if preload else "0",
+        BENCH_MODEL_MB=str(args.model_mb),
+        BENCH_MODEL_COST_MS=str(args.model_cost_ms),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(backend_dir, "gunicorn.conf.py"), "benchmarks.multiworker:served_app()"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+
+async def wait_ready(client, server, workers, timeout):
+    """Until the server answers and every worker has joined the invalidation channel"""
+    from app.core.config import settings
+
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise SystemExit(f"gunicorn exited with code {server.returncode}; is it installed? (--verbose shows its log)")
+        try:
+            ready = (await client.get("/health/ready")).status_code == 200
+        except Exception:
+            ready = False
+        directory = settings.invalidation_dir
+        sockets = len([name for name in os.listdir(directory) if name.endswith(".sock")]) if os.path.isdir(directory) else 0
+        if ready and sockets >= workers:
+            return round(time.perf_counter() - started, 2)
+        await asyncio.sleep(0.2)
+    raise SystemExit(f"Server not ready after {timeout}s")
+
+async def drive(client, headers, document_ids, concurrency, requests, rng):
+    async def one():
+        choice = rng.random()
+        if choice < 0.5:
+            return await client.post("/api/v1/documents/search", json={"query": rng.choice(SEARCH_TERMS), "limit": 10}, headers=headers)
+        if choice < 0.8:
+            return await client.get(f"/api/v1/documents/{rng.choice(document_ids)}", headers=headers)
+        return await client.get(f"/api/v1/documents/suggest?q={rng.choice(SEARCH_TERMS)[:3]}", headers=headers)
+
+    remaining = list(range(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while remaining:
+            remaining.pop()
+            started = time.perf_counter()
+            try:
+                errors += (await one()).status_code >= 400
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_per_second": round(len(latencies) / elapsed, 2),
+        "latency_ms": {"p50": round(percentile(latencies, 0.5) * 1000, 2), "p95": round(percentile(latencies, 0.95) * 1000, 2)},
+    }
+
+async def probe(base_url, headers, workers, corpus_dir):
+    """Upload a document through one worker; the fraction of fresh connections (spread over the
+    workers) that then suggest its title, and that count its vectors"""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        before = sum(shard["vectors"] for shard in (await client.get("/api/v1/admin/vector-index", headers=headers)).json())
+        path = os.path.join(corpus_dir, "probe.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"{PROBE_TITLE}. Zephyrine relay cabinets at Aluva were inspected.\n")
+        with open(path, "rb") as f:
+            response = await client.post(
+                "/api/v1/documents/upload", files={"file": ("probe.txt", f.read(), "text/plain")}, data={"title": PROBE_TITLE}, headers=headers
+            )
+        response.raise_for_status()
+    await asyncio.sleep(0.2)
+
+    suggested = counted = 0
+    attempts = max(8, workers * 4)
+    # No keep-alive: each request is accepted by whichever worker gets to it
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        for _ in range(attempts):
+            suggestions = (await client.get("/api/v1/documents/suggest?q=zephyrine", headers=headers)).json()
+            suggested += any(suggestion["text"] == PROBE_TITLE for suggestion in suggestions)
+            status = (await client.get("/api/v1/admin/vector-index", headers=headers)).json()
+            counted += sum(shard["vectors"] for shard in status) > before
+    return {"suggested": round(suggested / attempts, 3), "vectors": round(counted / attempts, 3)}
+
+async def measure(backend_dir, args, workers, preload, document_ids, corpus_dir):
+    import httpx
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(backend_dir, port, workers, preload, args)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+            startup_s = await wait_ready(client, server, workers, args.timeout)
+            token = (await client.post("/api/v1/auth/login", json={"email": "bench@kmrl.co.in", "password": "bench"})).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            rng = random.Random(args.seed)
+            # Warms every worker's caches and touches the pages the requests use
+            await drive(client, headers, document_ids, args.concurrency, args.concurrency * 4, rng)
+            result = await drive(client, headers, document_ids, args.concurrency, args.requests, rng)
+
+        pids = worker_pids(server.pid)
+        master = memory_mb(server.pid)
+        per_worker = [memory_mb(pid) for pid in pids]
+        result.update({
+            "workers": workers,
+            "preload": preload,
+            "startup_s": startup_s,
+            "memory_mb": {
+                "master": master,
+                "worker_uss": round(sum(memory["uss"] for memory in per_worker) / max(len(per_worker), 1), 1),
+                "worker_rss": round(sum(memory["rss"] for memory in per_worker) / max(len(per_worker), 1), 1),
+                "total_pss": round(master["pss"] + sum(memory["pss"] for memory in per_worker), 1),
+            },
+            "coherence": await probe(base_url, headers, workers, corpus_dir) if args.probe else None,
+        })
+        return result
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+async def run(args, backend_dir, entries, corpus_dir):
+    document_ids = await seed(args, entries, corpus_dir)
+    results = []
+    for preload in args.preload:
+        baseline = None
+        for workers in args.workers:
+            result = await measure(backend_dir, args, workers, preload, document_ids, corpus_dir)
+            baseline = baseline or result["throughput_per_second"] / workers
+            result["scaling_efficiency"] = round(result["throughput_per_second"] / (baseline * workers), 2)
+            results.append(result)
+            memory = result["memory_mb"]
+            coherence = result["coherence"] or {}
+            print(
+                f"preload={'on ' if preload else 'off'} workers={workers:<3} {result['throughput_per_second']:>8} req/s "
+                f"(x{result['scaling_efficiency']} of linear)  p50 {result['latency_ms']['p50']:>7} ms  p95 {result['latency_ms']['p95']:>7} ms  "
+                f"worker USS {memory['worker_uss']:>7} MB  total PSS {memory['total_pss']:>7} MB  "
+                f"errors {result['errors']}  coherent {coherence.get('suggested', '-')}/{coherence.get('vectors', '-')}"
+            )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--preload", type=lambda value: value == "on", nargs="+", default=[True, False], metavar="on|off")
+    parser.add_argument("--documents", type=int, default=60)
+    parser.add_argument("--text-kb", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--vectors", type=int, default=100000, help="padding vectors in the index, beside the corpus chunks")
+    parser.add_argument("--model-mb", type=int, default=256, help="stand-in model weights loaded by each process")
+    parser.add_argument("--model-cost-ms", type=float, default=2.0, help="simulated cost of each model call")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per worker count")
+    parser.add_argument("--no-probe", dest="probe", action="store_false", help="skip the cache invalidation check")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="show gunicorn's log")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    output_path = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="kmrl-multiworker-")
+    corpus_dir = os.path.join(workdir, "corpus")
+    entries = corpus_module.generate(corpus_dir, args.documents, args.text_kb, ["txt"], (0, 0), args.seed)
+    # The servers are started with this environment too
+    prepare_environment(workdir)
+
+    results = asyncio.run(run(args, backend_dir, entries, corpus_dir))
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "environment": environment(backend_dir),
+                "config": {key: getattr(args, key) for key in ("workers", "documents", "vectors", "model_mb", "model_cost_ms", "concurrency", "requests")},
+                "results": results,
+            }, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Benchmark of saved-search matching against a large number of subscriptions.
+
+Creates a scratch database with the given numbers of subscriptions and
+matches synthetic documents against them two ways: the anchor-indexed
+percolator used at ingestion, and a brute force pass that reads and evaluates
+every active subscription (a lower bound for re-running each saved search).
+Both must return the same matches.
+
+Subscription terms follow a skewed distribution over the corpus vocabulary;
+--foreign-terms sets the share drawn from words the synthetic corpus never
+contains, standing in for saved searches on other topics, which in a real
+corpus are most of them. Filters on type, department and priority are random.
+
+    python -m benchmarks.percolator --subscriptions 1000 10000 50000 --documents 200
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from . import corpus as corpus_module
+from .suite import percentile, prepare_environment
+
+PRIORITIES = ["low", "medium", "high", "critical"]
+
+def vocabulary():
+    """Words of the corpus templates, most frequent first"""
+    import re
+
+    counts = {}
+    texts = [title for _, title, _ in corpus_module.TEMPLATES.values()]
+    texts += [sentence for _, _, sentences in corpus_module.TEMPLATES.values() for sentence in sentences]
+    texts += corpus_module.STATIONS + corpus_module.EQUIPMENT
+    for text in texts:
+        for word in re.findall(r"[a-z]{3,}", text.lower()):
+            counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=counts.get, reverse=True)
+
+def make_subscriptions(rng, count, words, foreign_terms, user_id):
+    from app.models.subscription import Subscription
+    from app.services.subscription_service import compile_subscription
+
+    # Zipf-like: popular words are chosen far more often, as in real saved searches
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    foreign_words = [f"topic{number:04d}" for number in range(5000)]
+    subscriptions = []
+    for number in range(count):
+        term_count = 0 if rng.random() < 0.05 else rng.randint(1, 3)
+        terms = [
+            rng.choice(foreign_words) if rng.random() < foreign_terms else rng.choices(words, weights=weights)[0]
+            for _ in range(term_count)
+        ]
+        subscription = Subscription(
+            user_id=user_id,
+            name=f"saved search {number}",
+            query=" ".join(terms),
+            document_type=rng.choice(list(corpus_module.TEMPLATES)) if rng.random() < 0.3 else None,
+            department=rng.choice(corpus_module.DEPARTMENTS) if rng.random() < 0.2 else None,
+            priority=rng.choice(PRIORITIES) if rng.random() < 0.1 else None,
+        )
+        compile_subscription(subscription)
+        subscriptions.append(subscription)
+    return subscriptions
+
+def brute_force(db, document):
+    from app.models.subscription import Subscription
+    from app.services.subscription_service import FILTER_FIELDS, MATCH_COLUMNS, TERM_PATTERN, _filter_value
+
+    subscriptions = db.query(*MATCH_COLUMNS).filter(Subscription.is_active.is_(True)).all()
+    terms = set(TERM_PATTERN.findall(f"{document.title or ''}\n{document.extracted_text or ''}".lower()))
+    return {
+        subscription.id for subscription in subscriptions
+        if all(
+            _filter_value(getattr(subscription, field)) in (None, _filter_value(getattr(document, field)))
+            for field in FILTER_FIELDS
+        )
+        and all(term in terms for term in subscription.terms.split())
+    }
+
+def run(subscription_count, documents, foreign_terms, seed):
+    from app.core.database import SessionLocal
+    from app.models.document import Document
+    from app.models.subscription import Subscription
+    from app.models.user import User
+    from app.services.subscription_service import PercolatorService
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    db.query(Subscription).delete()
+    user = db.query(User).first()
+    if user is None:
+        user = User(email="bench@kmrl.local", name="Bench", hashed_password="-", role="user")
+        db.add(user)
+        db.commit()
+
+    started = time.perf_counter()
+    db.add_all(make_subscriptions(rng, subscription_count, vocabulary(), foreign_terms, user.id))
+    db.commit()
+    load_seconds = time.perf_counter() - started
+
+    percolator = PercolatorService(db)
+    percolator_ms, brute_force_ms, matches = [], [], []
+    for document in documents:
+        started = time.perf_counter()
+        matched = {subscription.id for subscription in percolator.match(document)}
+        percolator_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        expected = brute_force(db, document)
+        brute_force_ms.append((time.perf_counter() - started) * 1000)
+
+        if matched != expected:
+            raise AssertionError(f"Percolator disagrees with brute force on document {document.id}")
+        matches.append(len(matched))
+    db.close()
+
+    return {
+        "subscriptions": subscription_count,
+        "documents": len(documents),
+        "insert_seconds": round(load_seconds, 2),
+        "matches_per_document": round(statistics.mean(matches), 1),
+        "percolator_p50_ms": round(percentile(percolator_ms, 0.5), 2),
+        "percolator_p95_ms": round(percentile(percolator_ms, 0.95), 2),
+        "brute_force_p50_ms": round(percentile(brute_force_ms, 0.5), 2),
+        "brute_force_p95_ms": round(percentile(brute_force_ms, 0.95), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscriptions", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--text-kb", type=int, default=8)
+    parser.add_argument("--foreign-terms", type=float, default=0.5, help="share of terms absent from the corpus")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    prepare_environment(tempfile.mkdtemp(prefix="kmrl-percolator-"))
+    from app.core.database import SessionLocal, init_db
+    from app.models.document import Document
+
+    init_db()
+    rng = random.Random(args.seed)
+    db = SessionLocal()
+    documents = []
+    for number in range(args.documents):
+        generated = corpus_module.document_text(rng, number, args.text_kb * 1024)
+        document = Document(
+            filename=f"doc-{number}.txt", original_filename=f"doc-{number}.txt", file_path="-", file_size=0,
+            mime_type="text/plain", title=generated["title"], document_type=generated["document_type"],
+            department=generated["department"], priority=rng.choice(PRIORITIES), uploaded_by=None,
+            processing_status="completed"
+        )
+        db.add(document)
+        db.flush()
+        document.extracted_text = generated["text"]
+        documents.append(document)
+    db.commit()
+    for document in documents:
+        document.extracted_text  # load the text now, outside the timed section
+    db.expunge_all()
+    db.close()
+
+    results = []
+    for count in args.subscriptions:
+        result = run(count, documents, args.foreign_terms, args.seed)
+        results.append(result)
+        print(
+            f"{result['subscriptions']:>7} subscriptions  "
+            f"percolator p50 {result['percolator_p50_ms']:>8} ms  p95 {result['percolator_p95_ms']:>8} ms  "
+            f"brute force p50 {result['brute_force_p50_ms']:>8} ms  p95 {result['brute_force_p95_ms']:>8} ms  "
+            f"matches/doc {result['matches_per_document']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Measure import time and cold start of the API process.
+
+Import time comes from `python -X importtime` in a fresh interpreter, grouped
+by top-level package, and flags heavy ML packages that should not be imported
+at startup. Cold start launches uvicorn and polls /health/ready until it
+reports ready, then prints the server's own per-phase startup profile.
+
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --module app.models --no-server
+    WARMUP_MODELS=embedding,classifier python -m benchmarks.startup_profile --output startup.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+# Packages that must only be imported on first use
+HEAVY_PACKAGES = ("torch", "transformers", "sentence_transformers", "cv2", "pytesseract", "neo4j", "faiss", "onnxruntime")
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def profile_imports(module, top):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    by_package = defaultdict(int)
+    total_us = 0
+    imported = set()
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        imported.add(name.split(".")[0])
+        by_package[name.split(".")[0]] += self_us
+        if name == module and len(indent) == 1:
+            total_us = cumulative_us
+
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "top_packages_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "heavy_imported": sorted(package for package in HEAVY_PACKAGES if package in imported),
+    }
+
+def measure_cold_start(port, timeout):
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}/health/ready"
+    try:
+        first_response = None
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise SystemExit(f"Server exited with code {server.returncode}; is uvicorn installed?")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    body = json.loads(response.read())
+                    return {
+                        "first_response_s": round((first_response or time.perf_counter()) - started, 3),
+                        "ready_s": round(time.perf_counter() - started, 3),
+                        "server_profile": body.get("startup"),
+                        "models": body.get("models"),
+                    }
+            except urllib.error.HTTPError as e:
+                # 503 while warming up: the server is answering but not ready
+                first_response = first_response or time.perf_counter()
+                e.close()
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.05)
+        raise SystemExit(f"Server not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to profile imports for")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--no-server", action="store_true", help="only measure import time")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    result = {"imports": profile_imports(args.module, args.top)}
+    imports = result["imports"]
+    print(f"import {imports['module']}: {imports['total_ms']} ms")
+    for package, ms in imports["top_packages_ms"].items():
+        print(f"  {package:<28} {ms:>8} ms")
+    if imports["heavy_imported"]:
+        print(f"  heavy packages imported at startup: {', '.join(imports['heavy_imported'])}")
+
+    if not args.no_server:
+        result["cold_start"] = measure_cold_start(args.port, args.timeout)
+        cold_start = result["cold_start"]
+        print(f"cold start: first response {cold_start['first_response_s']} s, ready {cold_start['ready_s']} s")
+        print(f"  server phases: {cold_start['server_profile']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Offline stand-ins for the models and the graph database.
+
+The benchmark measures the backend's own overhead (routing, DB, caching,
+indexing, queuing), so model calls are replaced by deterministic stubs with a
+configurable simulated cost. The cost is a sleep, which like native inference
+releases the GIL, so concurrency behaves as it does with real models. The
+stubs are installed on the services' process-wide singletons; nothing in the
+app changes.
+"""
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+
+class ModelCost:
+    """Simulated inference time: a fixed cost per call plus a cost per 1000 input chars"""
+
+    def __init__(self, per_call_ms=5.0, per_kchar_ms=1.0):
+        self.per_call_ms = per_call_ms
+        self.per_kchar_ms = per_kchar_ms
+
+    def spend(self, chars=0):
+        time.sleep((self.per_call_ms + self.per_kchar_ms * chars / 1000) / 1000)
+
+class StubSummarizer:
+    """Same call shape as a transformers summarization pipeline"""
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def __call__(self, text, max_length=150, min_length=30, do_sample=False):
+        self.cost.spend(len(text))
+        sentences = SENTENCE_PATTERN.split(text.strip())
+        return [{"summary_text": " ".join(sentences[:2])[:max_length * 6]}]
+
+class StubEmbedder:
+    """Hashed bag-of-words vectors, L2-normalized like the real encoder's output"""
+
+    def __init__(self, cost, dimension=384):
+        self.cost = cost
+        self.dimension = dimension
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False):
+        self.cost.spend(sum(len(text) for text in texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                bucket = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=4).digest(), "little")
+                vectors[row, bucket % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+class StubNER:
+    """Capitalized word runs as ORG entities, in the aggregated pipeline's format"""
+
+    PATTERN = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)+\b")
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def __call__(self, chunks, batch_size=8):
+        self.cost.spend(sum(len(chunk) for chunk in chunks))
+        return [
+            [
+                {"word": match.group(0), "entity_group": "ORG", "start": match.start(), "end": match.end()}
+                for match in self.PATTERN.finditer(chunk)
+            ]
+            for chunk in chunks
+        ]
+
+class StubOCR:
+    """Returns the manifest text of known image fixtures, after a cost per megapixel"""
+
+    def __init__(self, texts_by_hash, ms_per_megapixel=200.0):
+        self.texts_by_hash = texts_by_hash
+        self.ms_per_megapixel = ms_per_megapixel
+
+    def extract(self, file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        text = self.texts_by_hash.get(hashlib.sha256(data).hexdigest())
+        if text is None:
+            return None
+        width, height = int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+        time.sleep(width * height / 1_000_000 * self.ms_per_megapixel / 1000)
+        return text, 0.9
+
+def install(cost, texts_by_hash=None, ocr_ms_per_megapixel=200.0):
+    """Replace every model and the Neo4j driver in this process with stubs"""
+    from app.services.ai_service import AIService
+    from app.services.chat_service import Generator
+    from app.services.embedding_service import EmbeddingService
+    from app.services.entity_service import EntityService
+    from app.services.graph_service import GraphService
+    from app.services.ocr_service import OCRService
+    from app.services.translation_service import Translator
+
+    AIService._summarizer = StubSummarizer(cost)
+    EmbeddingService._model = StubEmbedder(cost)
+    EntityService._ner = StubNER(cost)
+
+    def stream(cls, prompt):
+        cost.spend(len(prompt))
+        question = prompt.rsplit("Question:", 1)[-1]
+        for word in ("Based on the sources, " + question.replace("Answer:", "").strip() + " [1]").split(" "):
+            yield word + " "
+
+    Generator._model = Generator._tokenizer = object()
+    Generator.stream = classmethod(stream)
+
+    def translate_batch(cls, segments, source, target):
+        cost.spend(sum(len(segment) for segment in segments))
+        return [f"[{target}] {segment}" for segment in segments]
+
+    Translator.translate_batch = classmethod(translate_batch)
+
+    ocr = StubOCR(texts_by_hash or {}, ocr_ms_per_megapixel)
+    extract_text = OCRService._extract_text
+
+    def stub_extract_text(self, file_path):
+        if file_path.lower().endswith((".png", ".jpg", ".jpeg", ".tiff", ".bmp")):
+            result = ocr.extract(file_path)
+            if result is not None:
+                return result
+        return extract_text(self, file_path)
+
+    OCRService._extract_text = stub_extract_text
+    GraphService._driver = InMemoryGraphDriver()
+
+class _Record(dict):
+    def data(self):
+        return dict(self)
+
+class _Session:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        return self.graph.run(query, {**(parameters or {}), **kwargs})
+
+class InMemoryGraphDriver:
+    """The subset of the Neo4j driver that GraphService's write and lookup methods use.
+
+    Queries are recognized by their shape rather than parsed; arbitrary Cypher
+    (the /graph/query endpoint) is not supported and raises.
+    """
+
+    CREATE_DOCUMENT = re.compile(r"CREATE \(d:Document")
+    MERGE_USER = re.compile(r"MERGE \(u:User")
+    CREATE_RELATIONSHIP = re.compile(r"MATCH \(a:(\w+) \{id: \$from_id\}\)\s*MATCH \(b:(\w+) \{id: \$to_id\}\)\s*CREATE \(a\)-\[r:(\w+)")
+    ALL_NODES = re.compile(r"MATCH \(n\)\s*RETURN n, labels\(n\)")
+    ALL_EDGES = re.compile(r"MATCH \(a\)-\[r\]->\(b\)")
+    LINK_VERSIONS = re.compile(r"MERGE \(new:Document \{id: \$doc_id\}\)")
+    RELATED_DOCUMENTS = re.compile(r"MATCH \(d:Document \{id: \$doc_id\}\)-\[r\]-\(related:Document\)")
+
+    def __init__(self):
+        self.nodes = {}
+        self.edges = []
+        self.adjacency = {}
+        self._lock = threading.Lock()
+
+    def session(self, **kwargs):
+        return _Session(self)
+
+    def verify_connectivity(self):
+        return None
+
+    def close(self):
+        return None
+
+    def run(self, query, parameters):
+        with self._lock:
+            if self.CREATE_DOCUMENT.search(query):
+                self.nodes[("Document", parameters["doc_id"])] = {
+                    "id": parameters["doc_id"],
+                    "title": parameters["title"],
+                    "type": parameters["doc_type"],
+                    "department": parameters["department"],
+                }
+                return []
+            if self.MERGE_USER.search(query):
+                node = self.nodes.setdefault(("User", parameters["user_id"]), {"id": parameters["user_id"]})
+                node.update(name=parameters["name"], role=parameters["role"], department=parameters["department"])
+                return []
+            match = self.CREATE_RELATIONSHIP.search(query)
+            if match:
+                source = (match.group(1), parameters["from_id"])
+                target = (match.group(2), parameters["to_id"])
+                if source in self.nodes and target in self.nodes:
+                    self.edges.append((source, target, match.group(3)))
+                    self.adjacency.setdefault(source, []).append((target, match.group(3)))
+                    self.adjacency.setdefault(target, []).append((source, match.group(3)))
+                return []
+            if self.LINK_VERSIONS.search(query):
+                source = ("Document", parameters["doc_id"])
+                target = ("Document", parameters["previous_id"])
+                for key in (source, target):
+                    self.nodes.setdefault(key, {"id": key[1]})
+                if (source, target, "VERSION_OF") not in self.edges:
+                    self.edges.append((source, target, "VERSION_OF"))
+                    self.adjacency.setdefault(source, []).append((target, "VERSION_OF"))
+                    self.adjacency.setdefault(target, []).append((source, "VERSION_OF"))
+                return []
+            if self.ALL_NODES.search(query):
+                return [_Record(n=dict(node), labels=[label]) for (label, _), node in self.nodes.items()]
+            if self.ALL_EDGES.search(query):
+                return [
+                    _Record(source=source[1], target=target[1], relationship=relationship)
+                    for source, target, relationship in self.edges
+                ]
+            if self.RELATED_DOCUMENTS.search(query):
+                return [
+                    _Record(related=dict(self.nodes[neighbor]), relationship=relationship)
+                    for neighbor, relationship in self.adjacency.get(("Document", parameters["doc_id"]), [])
+                    if neighbor[0] == "Document"
+                ]
+        raise NotImplementedError(f"In-memory graph does not support this query: {query.strip()[:80]}")
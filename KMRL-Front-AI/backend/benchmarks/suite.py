@@ -0,0 +1,324 @@
+"""Reproducible end-to-end benchmark of the backend, fully offline and in-process.
+
+Generates (or reuses) a synthetic corpus, starts the app in this process
+against a fresh database with stub models and an in-memory graph, and drives
+upload, list, search, summarize, chat, graph and related-document requests
+through the ASGI interface at each concurrency level. Every scenario sends a
+fixed number of requests chosen by a seeded RNG, so two runs on the same
+machine do the same work.
+
+Results (throughput and latency percentiles per scenario and level) can be
+saved as a JSON baseline; later runs compared against it flag any scenario
+whose p95 latency rose or whose throughput fell by more than --threshold, and
+exit with status 1 so CI can fail the build.
+
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.suite --scenarios search chat --concurrency 1 16 --requests 500 --model-cost-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import corpus as corpus_module
+
+SEARCH_TERMS = ["brake", "escalator inspection", "Aluva", "budget review", "tender", "evacuation drill", "TS-07", "signalling relay", "training"]
+CHAT_QUESTIONS = [
+    "Which trainset was withdrawn after a brake fault?",
+    "When is the evacuation drill?",
+    "What is the estimated contract value of the escalator tender?",
+    "Who must attend refresher training?",
+]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def prepare_environment(workdir):
+    """Point every path setting into the scratch directory; must run before the app is imported"""
+    data = os.path.join(workdir, "data")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(data, 'bench.db')}",
+        "UPLOAD_DIR": os.path.join(data, "uploads"),
+        "HUGGINGFACE_CACHE_DIR": os.path.join(data, "models"),
+        "FAISS_INDEX_PATH": os.path.join(data, "faiss_index"),
+        "CLASSIFIER_MODEL_PATH": os.path.join(data, "models", "document_classifier.npz"),
+        "WARMUP_MODELS": "",
+        "TRACE_FILE": "",
+    })
+    # Admission control would turn load into 429/503s; set these explicitly to benchmark it
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "")
+    os.environ.setdefault("BULKHEADS", "")
+    # create_directories() also creates the default ./data tree
+    os.chdir(workdir)
+
+class Context:
+    """State shared by the scenarios: auth headers, corpus and uploaded document ids"""
+
+    def __init__(self, headers, entries, corpus_dir, rng):
+        self.headers = headers
+        self.entries = entries
+        self.corpus_dir = corpus_dir
+        self.rng = rng
+        self.document_ids = []
+        self.upload_index = 0
+
+    def document_id(self):
+        return self.rng.choice(self.document_ids)
+
+async def upload(client, context):
+    entry = context.entries[context.upload_index % len(context.entries)]
+    context.upload_index += 1
+    with open(os.path.join(context.corpus_dir, entry["filename"]), "rb") as f:
+        content = f.read()
+    mime_type = {"txt": "text/plain", "png": "image/png", "pdf": "application/pdf"}[entry["format"]]
+    response = await client.post(
+        "/api/v1/documents/upload",
+        files={"file": (entry["filename"], content, mime_type)},
+        data={"title": entry["title"], "department": entry["department"]},
+        headers=context.headers
+    )
+    if response.status_code == 200:
+        context.document_ids.append(response.json()["id"])
+    return response
+
+async def list_documents(client, context):
+    skip = context.rng.randint(0, max(0, len(context.document_ids) - 20))
+    return await client.get(f"/api/v1/documents/?skip={skip}&limit=20", headers=context.headers)
+
+async def get_document(client, context):
+    return await client.get(f"/api/v1/documents/{context.document_id()}", headers=context.headers)
+
+async def search(client, context):
+    return await client.post(
+        "/api/v1/documents/search",
+        json={"query": context.rng.choice(SEARCH_TERMS), "limit": 10},
+        headers=context.headers
+    )
+
+async def summarize(client, context):
+    summary_type = context.rng.choice(["abstractive", "extractive"])
+    return await client.post(
+        f"/api/v1/documents/{context.document_id()}/summarize?summary_type={summary_type}",
+        headers=context.headers
+    )
+
+async def chat(client, context):
+    return await client.post(
+        "/api/v1/ai/chat",
+        json={"message": context.rng.choice(CHAT_QUESTIONS)},
+        headers=context.headers
+    )
+
+async def graph(client, context):
+    return await client.get("/api/v1/graph/relationships", headers=context.headers)
+
+async def related(client, context):
+    return await client.get(f"/api/v1/documents/{context.document_id()}/related", headers=context.headers)
+
+# Upload runs first so the other scenarios have documents to read
+SCENARIOS = {
+    "upload": upload,
+    "list": list_documents,
+    "get": get_document,
+    "search": search,
+    "summarize": summarize,
+    "chat": chat,
+    "graph": graph,
+    "related": related,
+}
+
+async def run_scenario(client, context, scenario, concurrency, requests):
+    remaining = list(range(requests))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while remaining:
+            remaining.pop()
+            started = time.perf_counter()
+            try:
+                response = await SCENARIOS[scenario](client, context)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_per_second": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.5) * 1000, 2),
+            "p90": round(percentile(latencies, 0.9) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        },
+    }
+
+def seed_graph(context):
+    """Document nodes plus edges between documents of the same department"""
+    from app.services.graph_service import GraphService
+
+    graph_service = GraphService()
+    by_department = {}
+    for document_id, entry in zip(context.document_ids, context.entries):
+        graph_service.create_document_node(document_id, entry["title"], entry["document_type"], entry["department"])
+        by_department.setdefault(entry["department"], []).append(document_id)
+    for document_ids in by_department.values():
+        for previous, current in zip(document_ids, document_ids[1:]):
+            graph_service.create_relationship(current, previous, "REFERENCES", "Document", "Document")
+
+async def run_suite(args, entries, corpus_dir):
+    import httpx
+    from app.main import app
+    from . import stubs
+
+    rng = random.Random(args.seed)
+    async with app.router.lifespan_context(app):
+        stubs.install(
+            stubs.ModelCost(args.model_cost_ms, args.model_cost_per_kchar_ms),
+            {entry["sha256"]: entry["text"] for entry in entries},
+            args.ocr_ms_per_megapixel
+        )
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            await client.post("/api/v1/auth/register", json={
+                "email": "bench@kmrl.co.in", "name": "Benchmark", "password": "bench", "role": "admin", "department": "Operations"
+            })
+            token = (await client.post("/api/v1/auth/login", json={"email": "bench@kmrl.co.in", "password": "bench"})).json()["access_token"]
+            context = Context({"Authorization": f"Bearer {token}"}, entries, corpus_dir, rng)
+
+            # Load the corpus once so read scenarios see a populated database
+            for _ in entries:
+                await upload(client, context)
+            await asyncio.to_thread(seed_graph, context)
+
+            results = {}
+            for scenario in args.scenarios:
+                results[scenario] = {}
+                for concurrency in args.concurrency:
+                    # One untimed request absorbs first-use costs (model stubs, caches, plans)
+                    await SCENARIOS[scenario](client, context)
+                    level = await run_scenario(client, context, scenario, concurrency, args.requests)
+                    results[scenario][str(concurrency)] = level
+                    print(
+                        f"{scenario:<10} c={concurrency:<4} {level['throughput_per_second']:>9} req/s  "
+                        f"p50 {level['latency_ms']['p50']:>8} ms  p95 {level['latency_ms']['p95']:>8} ms  "
+                        f"p99 {level['latency_ms']['p99']:>8} ms  errors {level['errors']}"
+                    )
+    return results
+
+def environment(backend_dir):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit or None,
+    }
+
+def compare(results, baseline, threshold, noise_floor_ms):
+    """Scenarios and levels whose p95 latency or throughput regressed beyond the threshold"""
+    regressions = []
+    for scenario, levels in results.items():
+        for concurrency, current in levels.items():
+            previous = baseline.get("results", {}).get(scenario, {}).get(concurrency)
+            if previous is None:
+                continue
+            p95, previous_p95 = current["latency_ms"]["p95"], previous["latency_ms"]["p95"]
+            if p95 > previous_p95 * (1 + threshold) and p95 - previous_p95 > noise_floor_ms:
+                regressions.append(f"{scenario} c={concurrency}: p95 {previous_p95} -> {p95} ms")
+            throughput, previous_throughput = current["throughput_per_second"], previous["throughput_per_second"]
+            if throughput < previous_throughput * (1 - threshold):
+                regressions.append(f"{scenario} c={concurrency}: throughput {previous_throughput} -> {throughput} req/s")
+            if current["errors"] > previous["errors"]:
+                regressions.append(f"{scenario} c={concurrency}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="existing corpus directory (generated if omitted)")
+    parser.add_argument("--documents", type=int, default=60)
+    parser.add_argument("--text-kb", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--formats", nargs="+", choices=["txt", "png", "pdf"], default=["txt", "png", "pdf"])
+    parser.add_argument("--image-size", type=corpus_module.parse_size, default=(1240, 1754))
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--model-cost-ms", type=float, default=5.0, help="simulated cost of each model call")
+    parser.add_argument("--model-cost-per-kchar-ms", type=float, default=1.0)
+    parser.add_argument("--ocr-ms-per-megapixel", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="write this run's results as the new baseline")
+    parser.add_argument("--baseline", help="compare against a baseline and exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--noise-floor-ms", type=float, default=2.0, help="ignore p95 increases smaller than this")
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, backend_dir)
+    workdir = tempfile.mkdtemp(prefix="kmrl-bench-")
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    output_paths = [os.path.abspath(path) for path in (args.output, args.save_baseline) if path]
+
+    corpus_dir = os.path.abspath(args.corpus) if args.corpus else os.path.join(workdir, "corpus")
+    if args.corpus:
+        entries = corpus_module.load_manifest(corpus_dir)
+    else:
+        entries = corpus_module.generate(corpus_dir, args.documents, args.text_kb, args.formats, args.image_size, args.seed)
+
+    prepare_environment(workdir)
+    started = time.perf_counter()
+    results = asyncio.run(run_suite(args, entries, corpus_dir))
+    report = {
+        "environment": environment(backend_dir),
+        "config": {
+            key: getattr(args, key) for key in (
+                "documents", "text_kb", "formats", "scenarios", "concurrency", "requests",
+                "model_cost_ms", "model_cost_per_kchar_ms", "ocr_ms_per_megapixel", "seed"
+            )
+        },
+        "duration_s": round(time.perf_counter() - started, 1),
+        "results": results,
+    }
+    for path in output_paths:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was recorded with a different configuration")
+        regressions = compare(results, baseline, args.threshold, args.noise_floor_ms)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Recall, latency and memory of the FAISS vector store at 1M+ vectors.
+
+Generates (or reuses) a seeded set of clustered unit vectors, written directly
+as a vector log, and computes the exact top-k of held-out queries by brute
+force, also for a filter that allows 10% of the ids (a restricted user's
+search). Each index type then runs in its own subprocess so RSS numbers do not
+mix: the store rebuilds the index from the log (training on a sample where the
+index type needs it), reloads it from disk, and answers the queries one at a
+time. Queries are also timed while a background rebuild runs, to show that
+rebuilds do not block search.
+
+    python -m benchmarks.vector_store --vectors 1000000 10000000
+    python -m benchmarks.vector_store --vectors 1000000 --factories "HNSW32,SQfp16" "IVF4096,PQ48" --shards 4
+    python -m benchmarks.vector_store --vectors 200000 --dimension 64 --factories Flat "IVF256,PQ16" --train-size 20000
+
+Flat at 10M x 384 needs about 15 GB of RAM; leave it out of --factories there.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from .inference_benchmark import current_rss_mb
+from .suite import percentile
+
+# Vectors generated or scanned per batch
+BATCH = 100000
+
+# Ids allowed by the filtered queries: every FILTER_MODULUS-th
+FILTER_MODULUS = 10
+
+def dataset_path(workdir, count, dimension, clusters, seed):
+    return os.path.join(workdir, f"vectors-{count}-{dimension}-{clusters}-{seed}.log")
+
+def generate(path, count, dimension, clusters, seed, queries):
+    """Clustered unit vectors as log records with ids 1..count, plus held-out queries"""
+    from app.services.vector_store import record_dtype
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    def sample(rng, size):
+        vectors = centers[rng.integers(0, clusters, size)] + rng.standard_normal((size, dimension)).astype(np.float32) * 0.08
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    if not os.path.exists(path):
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as log:
+            for start in range(0, count, BATCH):
+                size = min(BATCH, count - start)
+                records = np.zeros(size, dtype=record_dtype(dimension))
+                records["id"] = np.arange(start + 1, start + size + 1)
+                records["vector"] = sample(rng, size)
+                log.write(records.tobytes())
+        os.replace(temporary_path, path)
+    # From their own generator, so they are the same whether or not the vectors were regenerated
+    return sample(np.random.default_rng(seed + 1), queries)
+
+def ground_truth(path, dimension, queries, k):
+    """Exact top-k ids of every query, unfiltered and among the filter's ids"""
+    from app.services.vector_store import record_dtype
+
+    records = np.memmap(path, dtype=record_dtype(dimension), mode="r")
+    best = {
+        name: (np.full((len(queries), 0), -np.inf, dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64))
+        for name in ("all", "filtered")
+    }
+    for start in range(0, len(records), BATCH):
+        batch = records[start:start + BATCH]
+        scores = queries @ np.asarray(batch["vector"], dtype=np.float32).T
+        ids = np.asarray(batch["id"])
+        for name, mask in (("all", None), ("filtered", ids % FILTER_MODULUS == 0)):
+            batch_scores, batch_ids = (scores, ids) if mask is None else (scores[:, mask], ids[mask])
+            merged_scores = np.concatenate([best[name][0], batch_scores], axis=1)
+            merged_ids = np.concatenate([best[name][1], np.broadcast_to(batch_ids, batch_scores.shape)], axis=1)
+            keep = np.argpartition(-merged_scores, min(k, merged_scores.shape[1] - 1), axis=1)[:, :k]
+            best[name] = (np.take_along_axis(merged_scores, keep, axis=1), np.take_along_axis(merged_ids, keep, axis=1))
+    return {name: ids for name, (_, ids) in best.items()}
+
+def recall(results, truth):
+    return float(np.mean([len(set(found) & set(expected)) / len(expected) for found, expected in zip(results, truth)]))
+
+def run_worker(args, count, factory):
+    """Runs inside the subprocess for one index type"""
+    from app.services.vector_store import VectorIndex, VectorShard, record_dtype, set_bits
+
+    path = dataset_path(args.workdir, count, args.dimension, args.clusters, args.seed)
+    queries = generate(path, count, args.dimension, args.clusters, args.seed, args.queries)
+    truth = {name: np.load(os.path.join(args.workdir, f"truth-{count}-{args.k}-{name}.npy")) for name in ("all", "filtered")}
+    rss_start = current_rss_mb()
+
+    # The dataset is already a log; shards get every --shards-th vector
+    keys = [None] if args.shards == 1 else [str(number) for number in range(args.shards)]
+    for number, key in enumerate(keys):
+        shard = VectorShard(key, VectorIndex._path(key))
+        os.makedirs(os.path.dirname(shard.path) or ".", exist_ok=True)
+        if key is None:
+            os.link(path, shard.log_path)
+        else:
+            records = np.memmap(path, dtype=record_dtype(args.dimension), mode="r")
+            with open(shard.log_path, "wb") as log:
+                for start in range(0, len(records), BATCH):
+                    batch = records[start:start + BATCH]
+                    log.write(batch[np.asarray(batch["id"]) % args.shards == number].tobytes())
+        shard.meta = {"dimension": args.dimension, "factory": "Flat", "index": None, "rows": 0, "tombstones": []}
+        shard._write_meta()
+
+    started = time.perf_counter()
+    VectorIndex.rebuild(factory)
+    build_seconds = time.perf_counter() - started
+    rss_built = current_rss_mb()
+
+    # Reload from disk, as a restarted worker would
+    VectorIndex._shards = None
+    rss_before_load = current_rss_mb()
+    started = time.perf_counter()
+    status = VectorIndex.status()
+    load_seconds = time.perf_counter() - started
+    index_bytes = sum(
+        os.path.getsize(os.path.join(os.path.dirname(shard.path) or ".", shard.meta["index"]))
+        for shard in VectorIndex._shards.values()
+    )
+    rss_loaded = current_rss_mb()
+
+    allowed = set_bits(np.zeros(0, dtype=np.uint8), np.arange(FILTER_MODULUS, count + 1, FILTER_MODULUS, dtype=np.int64))
+
+    def measure(filtered, limit=None, stop=None):
+        latencies, found = [], []
+        for number, query in enumerate(queries):
+            if (limit is not None and number >= limit) or (stop is not None and stop()):
+                break
+            started = time.perf_counter()
+            results = VectorIndex.search(query, args.k, allowed if filtered else None)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found.append([chunk_id for chunk_id, _ in results])
+        return latencies, found
+
+    measure(False, limit=10)  # warm up
+    latencies, found = measure(False)
+    filtered_latencies, filtered_found = measure(True)
+
+    # Queries served while every shard rebuilds in the background
+    VectorIndex.start_rebuild()
+    time.sleep(0.05)
+    finished = lambda: not any(shard.rebuilding for shard in VectorIndex._shards.values())
+    rebuild_latencies = []
+    while not finished():
+        batch, _ = measure(False, stop=finished)
+        rebuild_latencies += batch
+    for thread in threading.enumerate():
+        if thread.name.startswith("vector-rebuild"):
+            thread.join()
+
+    def summary(values):
+        if not values:
+            return None
+        return {"p50": round(percentile(values, 0.5), 3), "p95": round(percentile(values, 0.95), 3), "p99": round(percentile(values, 0.99), 3)}
+
+    return {
+        "vectors": count,
+        "factory": factory,
+        "shards": len(status),
+        "build_seconds": round(build_seconds, 1),
+        "load_seconds": round(load_seconds, 2),
+        "index_mb": round(index_bytes / 2 ** 20, 1),
+        "bytes_per_vector": round(index_bytes / count, 1),
+        "rss_mb": {
+            "start": rss_start,
+            "after_build": rss_built,
+            "index_loaded": None if rss_loaded is None else round(rss_loaded - rss_before_load, 1),
+        },
+        "recall": round(recall(found, truth["all"][:len(found)]), 4),
+        "recall_filtered": round(recall(filtered_found, truth["filtered"][:len(filtered_found)]), 4),
+        "latency_ms": summary(latencies),
+        "filtered_latency_ms": summary(filtered_latencies),
+        "during_rebuild_latency_ms": summary(rebuild_latencies),
+        "queries_during_rebuild": len(rebuild_latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--factories", nargs="+", default=["HNSW32,SQfp16", "IVF4096,PQ48", "IVF4096,SQ8"])
+    parser.add_argument("--dimension", type=int, default=384, help="all-MiniLM-L6-v2 embeddings have 384")
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--train-size", type=int, default=200000)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="keeps generated vectors and ground truth between runs")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.workdir = args.workdir or os.path.join(tempfile.gettempdir(), "kmrl-vector-store")
+    os.makedirs(args.workdir, exist_ok=True)
+
+    if args.worker:
+        print(json.dumps(run_worker(args, int(args.worker[0]), args.worker[1])))
+        return
+
+    results = []
+    for count in args.vectors:
+        path = dataset_path(args.workdir, count, args.dimension, args.clusters, args.seed)
+        started = time.perf_counter()
+        queries = generate(path, count, args.dimension, args.clusters, args.seed, args.queries)
+        truth_paths = {name: os.path.join(args.workdir, f"truth-{count}-{args.k}-{name}.npy") for name in ("all", "filtered")}
+        if not all(os.path.exists(truth_path) for truth_path in truth_paths.values()):
+            for name, ids in ground_truth(path, args.dimension, queries, args.k).items():
+                np.save(truth_paths[name], ids)
+        print(f"{count} vectors ready in {time.perf_counter() - started:.0f}s")
+
+        for factory in args.factories:
+            indexdir = tempfile.mkdtemp(prefix="index-", dir=args.workdir)
+            environment = dict(
+                os.environ,
+                FAISS_INDEX_PATH=os.path.join(indexdir, "faiss_index"),
+                FAISS_INDEX_FACTORY=factory,
+                FAISS_TRAIN_SIZE=str(args.train_size),
+                FAISS_NPROBE=str(args.nprobe),
+                FAISS_EF_SEARCH=str(args.ef_search),
+                FAISS_SAVE_EVERY=str(count),
+            )
+            command = [sys.executable, "-m", "benchmarks.vector_store", "--worker", str(count), factory]
+            command += ["--dimension", str(args.dimension), "--clusters", str(args.clusters), "--queries", str(args.queries)]
+            command += ["--k", str(args.k), "--shards", str(args.shards), "--seed", str(args.seed), "--workdir", args.workdir]
+            completed = subprocess.run(command, capture_output=True, text=True, env=environment)
+            shutil.rmtree(indexdir, ignore_errors=True)
+            if completed.returncode != 0:
+                print(f"[FAIL] {factory}: {completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'no output'}")
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{count:>9} {factory:<16} recall@{args.k} {result['recall']:.3f} (filtered {result['recall_filtered']:.3f})  "
+                f"p50 {result['latency_ms']['p50']:>7} ms  p95 {result['latency_ms']['p95']:>7} ms  "
+                f"filtered p95 {result['filtered_latency_ms']['p95']:>7} ms  "
+                f"during rebuild p95 {(result['during_rebuild_latency_ms'] or {}).get('p95', '-'):>7} ms  "
+                f"index {result['index_mb']:>8} MB ({result['bytes_per_vector']} B/vector)  "
+                f"rss +{result['rss_mb']['index_loaded']} MB  build {result['build_seconds']}s"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "dimension": args.dimension, "k": args.k, "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+
+from app.core.database import SessionLocal, init_db
+from app.models.dedup import DocumentSignature, LSHBucket
+from app.models.document import Document
+from app.services.dedup_service import DedupService
+
+parser = argparse.ArgumentParser(description="Build MinHash signatures and link near-duplicate versions")
+parser.add_argument("--chunk-size", type=int, default=256)
+parser.add_argument("--rebuild", action="store_true", help="drop every signature and version link first")
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+
+if args.rebuild:
+    db.query(LSHBucket).delete()
+    db.query(DocumentSignature).delete()
+    db.query(Document).update(
+        {Document.version_group_id: None, Document.previous_version_id: None, Document.version_similarity: None},
+        synchronize_session=False
+    )
+    db.commit()
+    print("Cleared signatures and version links")
+
+dedup_service = DedupService(db)
+
+# In id order, so each document is only compared with earlier ones, as at ingestion
+processed = 0
+linked = 0
+last_id = 0
+while True:
+    documents = (
+        db.query(Document)
+        .outerjoin(DocumentSignature, DocumentSignature.document_id == Document.id)
+        .filter(Document.id > last_id, Document.text_length.isnot(None), DocumentSignature.document_id.is_(None))
+        .order_by(Document.id)
+        .limit(args.chunk_size)
+        .all()
+    )
+    if not documents:
+        break
+
+    for document in documents:
+        if dedup_service.index_document(document):
+            linked += 1
+
+    processed += len(documents)
+    last_id = documents[-1].id
+    db.expunge_all()
+    print(f"Processed {processed} documents ({linked} linked to a previous version)")
+
+print(f"Built signatures for {processed} documents, {linked} linked to a previous version")
+
+db.close()
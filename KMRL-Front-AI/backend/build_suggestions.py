@@ -0,0 +1,15 @@
+from app.core.config import settings
+from app.core.database import SessionLocal, init_db
+from app.services.suggest_service import SuggestIndex
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+
+# Index every document from scratch; the server loads this snapshot on startup
+phrases = SuggestIndex.rebuild(db)
+print(f"Wrote {settings.suggest_snapshot_path}: {phrases} phrases")
+
+db.close()
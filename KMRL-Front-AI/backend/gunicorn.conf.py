@@ -0,0 +1,51 @@
+# Production server: gunicorn -c gunicorn.conf.py app.main:app
+#
+# The master imports the app and loads models and vector indexes once
+# (app/core/prefork.py), then forks WEB_CONCURRENCY uvicorn workers that share
+# those pages copy-on-write. Workers tell each other about index changes over
+# Unix sockets in INVALIDATION_DIR, and their metrics are merged through files
+# in PROMETHEUS_MULTIPROC_DIR. Unix only.
+import os
+
+# Must be set before prometheus_client is first imported, by the app import below
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.abspath("./data/run/prometheus"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn_worker.UvicornWorker"
+# Off (GUNICORN_PRELOAD=0) gives each worker its own copy of everything
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+# Model warm-up in a worker can take a while on a cold cache
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+# Shared memory rather than a disk-backed /tmp for the heartbeat files
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+def on_starting(server):
+    from app.core.prefork import clear_metrics
+
+    clear_metrics()
+
+def when_ready(server):
+    from app.core.config import settings
+
+    if server.cfg.preload_app:
+        from app.core.prefork import preload
+
+        preload()
+    if server.cfg.workers > 1 and settings.rate_limit_backend == "memory":
+        server.log.warning(
+            "RATE_LIMIT_BACKEND=memory: every worker keeps its own buckets, so %d workers allow %d times "
+            "each configured rate; use redis to share them", server.cfg.workers, server.cfg.workers
+        )
+
+def post_fork(server, worker):
+    from app.core.prefork import after_fork
+
+    after_fork()
+
+def child_exit(server, worker):
+    from app.core.prefork import worker_exited
+
+    worker_exited(worker.pid)
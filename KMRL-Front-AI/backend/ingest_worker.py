@@ -0,0 +1,59 @@
+import argparse
+import signal
+import threading
+
+from app.core.config import settings
+from app.core.database import init_db
+from app.services.ingest_queue import IngestQueue, lease_owner
+from app.services.model_registry import ModelRegistry
+from app.services.vector_store import VectorIndex
+
+# With INGEST_MODE=queue the API only stores uploads; run this on any number of
+# hosts sharing DATABASE_URL, upload storage and FAISS_INDEX_PATH to process them
+parser = argparse.ArgumentParser(description="Claim pending documents from the ingestion queue and process them")
+parser.add_argument("--concurrency", type=int, default=settings.inference_workers)
+parser.add_argument("--once", action="store_true", help="Exit once the queue is empty")
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+ModelRegistry.warm_up([name.strip() for name in settings.warmup_models.split(",") if name.strip()])
+
+stop = threading.Event()
+signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+counts = {"completed": 0, "failed": 0}
+counts_lock = threading.Lock()
+
+def work():
+    # Each call claims with its own session
+    while not stop.is_set():
+        try:
+            status = IngestQueue.process_next()
+        except Exception as e:
+            # Usually the database; the lease, if taken, expires and is reclaimed
+            print(f"Ingestion worker error: {e}")
+            stop.wait(settings.ingest_poll_seconds)
+            continue
+        if status is None:
+            if args.once:
+                return
+            stop.wait(settings.ingest_poll_seconds)
+            continue
+        with counts_lock:
+            counts["completed" if status == "completed" else "failed"] += 1
+
+print(f"Ingest worker {lease_owner()} running {args.concurrency} thread(s)")
+threads = [threading.Thread(target=work, name=f"ingest-{i}") for i in range(args.concurrency)]
+for thread in threads:
+    thread.start()
+# Joined with a timeout so the main thread keeps handling signals
+while any(thread.is_alive() for thread in threads):
+    for thread in threads:
+        thread.join(timeout=1)
+
+# Vectors are in the logs already; this folds them into the index files
+VectorIndex.save()
+print(f"Processed {counts['completed']} documents, {counts['failed']} failed")
@@ -0,0 +1,136 @@
+"""Move extracted text from documents.extracted_text into compressed segments.
+
+Measures the database size and the listing queries before and after, so the
+effect of taking the text out of the documents row can be checked:
+
+    python migrate_extracted_text.py --drop-column --output migration.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import time
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+
+from app.core.database import SessionLocal, engine, init_db
+from app.services.text_store import TextStore
+
+parser = argparse.ArgumentParser(description="Move extracted text into compressed, page-sized segments")
+parser.add_argument("--batch-size", type=int, default=200)
+parser.add_argument("--drop-column", action="store_true", help="drop documents.extracted_text afterwards (SQLite 3.35+)")
+parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM; the file keeps its freed pages")
+parser.add_argument("--repeat", type=int, default=5, help="runs of each timed query")
+parser.add_argument("--output", help="write the before/after numbers to this JSON file")
+args = parser.parse_args()
+
+database_path = make_url(str(engine.url)).database
+
+def timed(query, parameters=()):
+    """Median milliseconds over fresh connections, so SQLite's page cache starts cold each run"""
+    runs = []
+    for _ in range(args.repeat):
+        connection = sqlite3.connect(database_path)
+        started = time.perf_counter()
+        connection.execute(query, parameters).fetchall()
+        runs.append((time.perf_counter() - started) * 1000)
+        connection.close()
+    return round(statistics.median(runs), 2)
+
+def measure():
+    connection = sqlite3.connect(database_path)
+    page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+    page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+    documents = connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    connection.close()
+    return {
+        "file_bytes": os.path.getsize(database_path),
+        "used_bytes": page_size * page_count,
+        "documents": documents,
+        # The listing endpoint's query: the ORM selects every column of the row
+        "list_first_page_ms": timed("SELECT * FROM documents ORDER BY id LIMIT 10"),
+        "list_last_page_ms": timed("SELECT * FROM documents ORDER BY id LIMIT 10 OFFSET ?", (max(documents - 10, 0),)),
+        # A filter without an index reads every row
+        "scan_by_type_ms": timed("SELECT * FROM documents WHERE document_type = ?", ("safety",)),
+    }
+
+# Creates document_text_segments and the text_length column
+init_db()
+
+if "extracted_text" not in {column["name"] for column in inspect(engine).get_columns("documents")}:
+    print("documents.extracted_text no longer exists; nothing to migrate")
+    raise SystemExit(0)
+
+before = measure()
+print(f"Before: {before}")
+
+db = SessionLocal()
+text_store = TextStore(db)
+
+# Keyset pagination; each batch commits the segments and clears the inline text together
+migrated = 0
+characters = 0
+last_id = 0
+started = time.perf_counter()
+while True:
+    rows = db.execute(
+        text(
+            "SELECT id, extracted_text FROM documents "
+            "WHERE id > :last_id AND extracted_text IS NOT NULL ORDER BY id LIMIT :limit"
+        ),
+        {"last_id": last_id, "limit": args.batch_size}
+    ).all()
+    if not rows:
+        break
+    for document_id, extracted_text in rows:
+        length = text_store.write(document_id, extracted_text)
+        db.execute(
+            text("UPDATE documents SET text_length = :length, extracted_text = NULL WHERE id = :id"),
+            {"length": length, "id": document_id}
+        )
+        characters += length
+    db.commit()
+    migrated += len(rows)
+    last_id = rows[-1][0]
+    print(f"Migrated {migrated} documents")
+db.close()
+migration_seconds = round(time.perf_counter() - started, 2)
+
+with engine.connect() as connection:
+    segment_bytes = connection.execute(
+        text("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM document_text_segments")
+    ).scalar()
+
+engine.dispose()
+connection = sqlite3.connect(database_path, isolation_level=None)
+if args.drop_column:
+    try:
+        connection.execute("ALTER TABLE documents DROP COLUMN extracted_text")
+        print("Dropped documents.extracted_text")
+    except sqlite3.OperationalError as e:
+        print(f"Could not drop documents.extracted_text (SQLite {sqlite3.sqlite_version}): {e}")
+if not args.no_vacuum:
+    connection.execute("VACUUM")
+connection.close()
+
+after = measure()
+print(f"After: {after}")
+
+results = {
+    "migrated_documents": migrated,
+    "migration_seconds": migration_seconds,
+    "text_chars": characters,
+    "compressed_bytes": segment_bytes,
+    "before": before,
+    "after": after,
+}
+print(f"Moved {migrated} documents ({characters} chars into {segment_bytes} compressed bytes)")
+for key in before:
+    print(f"  {key:20} {before[key]:>14} -> {after[key]}")
+
+if args.output:
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
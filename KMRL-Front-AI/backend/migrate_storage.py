@@ -0,0 +1,75 @@
+"""Copy uploaded files into the configured storage backend and point documents at the copies.
+
+Moves files from the flat upload directory into the sharded layout, or from
+local disk to S3 (STORAGE_BACKEND=s3), or back. Each copy is checked against
+the document's content hash before the document is updated. Sources are only
+deleted with --delete.
+
+    python migrate_storage.py --dry-run
+    STORAGE_BACKEND=s3 S3_BUCKET=kmrl-documents python migrate_storage.py --create-bucket --delete
+"""
+import argparse
+
+import anyio
+
+from app.core.database import SessionLocal, init_db
+from app.models.document import Document
+from app.services.storage import S3Storage, get_storage
+
+parser = argparse.ArgumentParser(description="Copy uploaded files into the configured storage backend")
+parser.add_argument("--delete", action="store_true", help="delete each source file once its copy is recorded")
+parser.add_argument("--dry-run", action="store_true", help="only list the files that would be copied")
+parser.add_argument("--create-bucket", action="store_true", help="create S3_BUCKET if it does not exist")
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+target = get_storage()
+if args.create_bucket and isinstance(target, S3Storage) and not args.dry_run:
+    try:
+        target.client.head_bucket(Bucket=target.bucket)
+    except Exception:
+        target.client.create_bucket(Bucket=target.bucket)
+        print(f"Created bucket {target.bucket}")
+
+# Create session
+db = SessionLocal()
+
+copied = skipped = failed = 0
+document_ids = [row[0] for row in db.query(Document.id).order_by(Document.id).all()]
+for document_id in document_ids:
+    document = db.query(Document).filter(Document.id == document_id).first()
+    source_location = document.file_path
+    if source_location == target.location(document.filename):
+        skipped += 1
+        continue
+    if args.dry_run:
+        print(f"Would copy document {document.id}: {source_location} -> {target.location(document.filename)}")
+        continue
+
+    source = get_storage(source_location)
+    try:
+        with source.open(source_location) as f:
+            stored = anyio.run(target.save, document.filename, anyio.wrap_file(f), document.mime_type)
+    except FileNotFoundError:
+        print(f"Document {document.id}: {source_location} not found")
+        failed += 1
+        continue
+    if document.content_hash and stored.content_hash != document.content_hash:
+        print(f"Document {document.id}: copy does not match the content hash, leaving it at {source_location}")
+        target.delete(stored.location)
+        failed += 1
+        continue
+
+    document.file_path = stored.location
+    document.content_hash = stored.content_hash
+    db.commit()
+    if args.delete:
+        source.delete(source_location)
+    copied += 1
+    print(f"Copied document {document.id} to {stored.location}")
+
+print(f"Copied {copied} files, {skipped} already in place, {failed} failed")
+
+db.close()
@@ -0,0 +1,26 @@
+import argparse
+
+from app.core.database import SessionLocal, init_db
+from app.services.stats_service import StatsService
+
+parser = argparse.ArgumentParser(description="Recount the dashboard statistics rollups from the documents table")
+parser.add_argument("--check", action="store_true", help="only report rollup rows that disagree with a recount")
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+stats_service = StatsService(db)
+
+if args.check:
+    drift = stats_service.drift()
+    for row in drift:
+        print(f"{row['table']} {row['key']}: rollup {row['actual']}, documents {row['expected']}")
+    print(f"{len(drift)} rollup rows disagree with the documents table")
+else:
+    rows = stats_service.rebuild()
+    print(f"Rebuilt document_stats and document_stat_totals: {rows} daily rows")
+
+db.close()
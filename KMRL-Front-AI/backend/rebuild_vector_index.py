@@ -0,0 +1,29 @@
+import argparse
+
+from app.core.database import SessionLocal, init_db
+from app.services.vector_store import VectorIndex
+
+parser = argparse.ArgumentParser(description="Retrain and rebuild the FAISS vector index from its vector logs")
+parser.add_argument("--factory", help="FAISS index_factory string to build instead of FAISS_INDEX_FACTORY")
+parser.add_argument("--reshard", action="store_true", help="first move every vector to the shard FAISS_SHARD_BY assigns it")
+args = parser.parse_args()
+
+if not VectorIndex.available():
+    raise SystemExit("FAISS is not installed")
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+
+if args.reshard:
+    for key, count in VectorIndex.reshard(db).items():
+        print(f"Shard {key if key is not None else '(unsharded)'}: {count} vectors")
+if not args.reshard or args.factory:
+    VectorIndex.rebuild(args.factory)
+
+for shard in VectorIndex.status():
+    print(f"Shard {shard['shard'] if shard['shard'] is not None else '(unsharded)'}: {shard['vectors']} vectors, {shard['factory']}")
+
+db.close()
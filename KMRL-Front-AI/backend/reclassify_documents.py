@@ -0,0 +1,84 @@
+import argparse
+from sqlalchemy import or_
+
+from app.core.database import SessionLocal, init_db
+from app.models.document import Document
+from app.services.classifier_service import DocumentClassifier, apply_classification
+
+parser = argparse.ArgumentParser(description="Reclassify document type and priority in chunks")
+parser.add_argument("--chunk-size", type=int, default=256)
+parser.add_argument("--train", action="store_true", help="train on uploader-labelled documents first")
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+
+if args.train:
+    # Labels come from documents whose type or priority was chosen by the uploader;
+    # a priority the model assigned would only teach it its own guesses
+    texts, types, priorities = [], [], []
+    last_id = 0
+    while True:
+        documents = (
+            db.query(Document)
+            .filter(
+                Document.id > last_id,
+                or_(Document.classification_source == "user", Document.priority_source == "user"),
+                Document.text_length > 0
+            )
+            .order_by(Document.id)
+            .limit(args.chunk_size)
+            .all()
+        )
+        if not documents:
+            break
+        for document in documents:
+            texts.append(document.extracted_text)
+            types.append(document.document_type if document.classification_source == "user" else None)
+            priorities.append(document.priority if document.priority_source == "user" else None)
+        last_id = documents[-1].id
+        db.expunge_all()
+
+    classifier = DocumentClassifier.train(texts, types, priorities)
+    classifier.save()
+    print(
+        f"Trained on {len(texts)} labelled documents: "
+        f"{sum(label is not None for label in types)} types, {sum(label is not None for label in priorities)} priorities"
+    )
+else:
+    classifier = DocumentClassifier.load()
+
+# Keyset pagination keeps each chunk an index range scan on the primary key
+processed = 0
+changed = 0
+last_id = 0
+while True:
+    documents = (
+        db.query(Document)
+        .filter(Document.id > last_id, Document.text_length.isnot(None))
+        .order_by(Document.id)
+        .limit(args.chunk_size)
+        .all()
+    )
+    if not documents:
+        break
+
+    results = classifier.predict([document.extracted_text for document in documents])
+    for document, result in zip(documents, results):
+        before = (document.document_type, document.priority)
+        apply_classification(document, result)
+        # Related-document scores do not depend on type or priority, so no lists need recomputing
+        changed += (document.document_type, document.priority) != before
+
+    db.commit()
+    processed += len(documents)
+    last_id = documents[-1].id
+    db.expunge_all()
+    print(f"Processed {processed} documents ({changed} changed)")
+
+print(f"Reclassified {processed} documents, {changed} changed")
+
+db.close()
\ No newline at end of file
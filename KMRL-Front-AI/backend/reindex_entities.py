@@ -0,0 +1,32 @@
+import argparse
+
+from app.core.config import settings
+from app.core.database import SessionLocal, init_db
+from app.models.document import Document
+from app.services.entity_service import EntityService
+from app.services.suggest_service import SuggestIndex
+
+parser = argparse.ArgumentParser(description="Extract entities again for every processed document, after the rules changed")
+parser.add_argument("--batch-size", type=int, default=32)
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+entity_service = EntityService(db)
+
+# Each batch replaces its documents' entities in one NER pass
+document_ids = [row[0] for row in db.query(Document.id).filter(Document.text_length.isnot(None)).order_by(Document.id)]
+for start in range(0, len(document_ids), args.batch_size):
+    batch = db.query(Document).filter(Document.id.in_(document_ids[start:start + args.batch_size])).all()
+    entity_service.index_documents(batch)
+    db.expunge_all()
+    print(f"Extracted entities for {min(start + args.batch_size, len(document_ids))}/{len(document_ids)} documents")
+
+# Suggestions are built from the entities; running servers pick up the snapshot on restart
+phrases = SuggestIndex.rebuild(db)
+print(f"Wrote {settings.suggest_snapshot_path}: {phrases} phrases")
+
+db.close()
@@ -0,0 +1,20 @@
+from app.core.database import SessionLocal, init_db
+from app.models.document import Document
+from app.services.search_service import SearchService
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+search_service = SearchService(db)
+
+# Rebuild chunks and vectors for every processed document
+documents = db.query(Document).filter(Document.text_length.isnot(None)).order_by(Document.id).all()
+for document in documents:
+    search_service.index_document(document)
+    print(f"Indexed document {document.id}: {document.title}")
+
+print(f"Indexed {len(documents)} documents")
+
+db.close()
\ No newline at end of file
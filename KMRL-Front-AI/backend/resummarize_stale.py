@@ -0,0 +1,20 @@
+import argparse
+
+from app.core.database import SessionLocal, init_db
+from app.services.summary_service import SummaryService
+
+parser = argparse.ArgumentParser(description="Regenerate summaries whose text, model or generation params changed")
+parser.add_argument("--chunk-size", type=int, default=100)
+args = parser.parse_args()
+
+# Initialize database
+init_db()
+
+# Create session
+db = SessionLocal()
+
+# Up-to-date summaries are skipped; identical texts share one cached generation
+counts = SummaryService(db).refresh_stale(chunk_size=args.chunk_size)
+print(f"Checked {counts['checked']} summaries, refreshed {counts['refreshed']}, failed {counts['failed']}")
+
+db.close()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import, so the app must see a scratch database and data directory first
+DATA_DIR = tempfile.mkdtemp(prefix="kmrl-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{DATA_DIR}/test.db",
+    "UPLOAD_DIR": os.path.join(DATA_DIR, "uploads"),
+    "RENDITIONS_DIR": os.path.join(DATA_DIR, "renditions"),
+    "FAISS_INDEX_PATH": os.path.join(DATA_DIR, "faiss_index"),
+    "SUGGEST_SNAPSHOT_PATH": os.path.join(DATA_DIR, "suggest_index.json"),
+    "INVALIDATION_DIR": "",
+    "WARMUP_MODELS": ""
+})
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from app.core.database import init_db
+
+    init_db()
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    user = {"email": "tester@kmrl.co.in", "name": "Tester", "password": "testpass123", "department": "Operations"}
+    client.post("/api/v1/auth/register", json=user)
+    response = client.post("/api/v1/auth/login", json={"email": user["email"], "password": user["password"]})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,28 @@
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+
+def register_and_login(client, email, **extra):
+    user = {"email": email, "name": "Applicant", "password": "testpass123", "department": "Finance", **extra}
+    registered = client.post("/api/v1/auth/register", json=user)
+    token = client.post("/api/v1/auth/login", json={"email": email, "password": user["password"]}).json()["access_token"]
+    return registered, {"Authorization": f"Bearer {token}"}
+
+def test_register_ignores_requested_role(client):
+    registered, headers = register_and_login(client, "self-made-admin@kmrl.co.in", role="admin")
+    assert registered.status_code == 200
+    assert registered.json()["role"] == "user"
+    assert client.get("/api/v1/admin/traces", headers=headers).status_code == 403
+
+def test_admin_routes_follow_unrestricted_roles(client, monkeypatch):
+    _, headers = register_and_login(client, "director@kmrl.co.in")
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email == "director@kmrl.co.in").update({"role": "director"})
+        db.commit()
+    finally:
+        db.close()
+
+    assert client.get("/api/v1/admin/traces", headers=headers).status_code == 403
+    monkeypatch.setattr(settings, "unrestricted_roles", "admin,director")
+    assert client.get("/api/v1/admin/traces", headers=headers).status_code == 200
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.services.chat_service import ChatService, Generator, SessionStore
+
+class FailingModel:
+    def generate(self, **kwargs):
+        raise RuntimeError("CUDA out of memory")
+
+class FakeTokenizer:
+    def __call__(self, prompt, **kwargs):
+        return {"input_ids": [[0]]}
+
+    def decode(self, tokens, **kwargs):
+        return ""
+
+@pytest.fixture
+def failing_generator(monkeypatch):
+    pytest.importorskip("transformers")
+    monkeypatch.setattr(Generator, "_model", FailingModel())
+    monkeypatch.setattr(Generator, "_tokenizer", FakeTokenizer())
+    monkeypatch.setattr(settings, "chat_token_timeout", 5.0)
+
+def run_bounded(func, seconds=10.0):
+    """Run func on a thread so a hang fails the test instead of blocking the run"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "streaming did not finish"
+    return outcome
+
+def test_generate_error_ends_the_stream(failing_generator):
+    outcome = run_bounded(lambda: list(Generator.stream("When is the Aluva depot inspection?")))
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert "out of memory" in str(outcome["error"])
+
+def test_answer_falls_back_to_extractive(failing_generator):
+    prepared = {
+        "message": "When is the Aluva depot inspection?",
+        "prompt": "question",
+        "context": [{"text": "The Aluva depot inspection is on Monday. Budgets are due in March."}],
+        "extra_context": None,
+        "session": SessionStore.get_or_create(None, user_id=1)
+    }
+    outcome = run_bounded(lambda: ChatService(db=None, search_service=object()).answer(prepared))
+    assert "error" not in outcome
+    assert outcome["result"].startswith("The Aluva depot inspection is on Monday. [1]")
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import Document
+from app.services.ingest_queue import IngestQueue
+
+def add_document(db, **columns):
+    document = Document(
+        filename="stuck.txt", original_filename="stuck.txt", file_path="stuck.txt",
+        file_size=1, mime_type="text/plain", **columns
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+def test_idle_claim_poll_does_not_write():
+    db = SessionLocal()
+    commits = []
+    event.listen(db, "after_commit", lambda session: commits.append(session))
+    try:
+        db.query(Document).filter(Document.processing_status == "pending").update({"processing_status": "completed"})
+        db.commit()
+        commits.clear()
+
+        assert IngestQueue.claim(db) == []
+        assert commits == []
+    finally:
+        db.close()
+
+def test_exhausted_documents_are_failed():
+    db = SessionLocal()
+    try:
+        document = add_document(
+            db,
+            processing_status="processing",
+            lease_owner="gone:1",
+            lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            processing_attempts=settings.ingest_max_attempts
+        )
+        IngestQueue.claim(db)
+        db.refresh(document)
+        assert document.processing_status == "failed"
+        assert document.lease_owner is None
+    finally:
+        db.close()
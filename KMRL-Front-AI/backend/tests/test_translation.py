@@ -0,0 +1,32 @@
+from app.core.database import SessionLocal
+from app.models.translation import TranslationSegment
+from app.services.translation_service import TranslationService, normalize_segment, segment_hash
+
+def test_cache_stores_large_batches_and_counts_hits():
+    sentences = [f"Circular {number} applies to all stations." for number in range(400)]
+    text = "\n".join(sentences)
+
+    db = SessionLocal()
+    try:
+        service = TranslationService(db)
+        # More rows than fit in one 999-variable INSERT
+        service._store(
+            {segment_hash(sentence): f"translated {sentence}" for sentence in sentences},
+            {segment_hash(sentence): normalize_segment(sentence) for sentence in sentences},
+            "ml", "en"
+        )
+        # Served entirely from the cache, so no model is needed
+        assert service.translate(text, "ml", "en") == "\n".join(f"translated {sentence}" for sentence in sentences)
+    finally:
+        db.close()
+
+    db = SessionLocal()
+    try:
+        hits = {
+            row.segment_hash: row.hits
+            for row in db.query(TranslationSegment).filter(TranslationSegment.source_language == "ml")
+        }
+    finally:
+        db.close()
+    assert len(hits) == len(sentences)
+    assert set(hits.values()) == {1}
@@ -0,0 +1,36 @@
+def upload(client, headers, filename, content, mime_type):
+    response = client.post("/api/v1/documents/upload", files={"file": (filename, content, mime_type)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def minimal_pdf(text: str) -> bytes:
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    return (
+        b"%PDF-1.4\n1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+        b"2 0 obj << /Type /Pages /Kids [3 0 R] /Count 1 >> endobj\n"
+        b"3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >> endobj\n"
+        b"4 0 obj << /Length " + str(len(stream)).encode() + b" >> stream\n" + stream + b"\nendstream endobj\n"
+        b"trailer << /Root 1 0 R >>\n%%EOF\n"
+    )
+
+def test_distinct_pdfs_are_not_versions(client, auth_headers):
+    # PDFs get placeholder text until extraction is implemented; it must not link them
+    first = upload(client, auth_headers, "a.pdf", minimal_pdf("Aluva depot brake inspection"), "application/pdf")
+    second = upload(client, auth_headers, "b.pdf", minimal_pdf("Tender for platform screen doors"), "application/pdf")
+
+    document = client.get(f"/api/v1/documents/{second['id']}", headers=auth_headers).json()
+    assert document["previous_version_id"] is None
+    assert document["version_similarity"] is None
+    versions = client.get(f"/api/v1/documents/{second['id']}/versions", headers=auth_headers).json()
+    assert first["id"] not in [version["id"] for version in versions]
+
+def test_revised_text_is_a_version(client, auth_headers):
+    words = "brake signal station maintenance budget tender report aluva train depot door track power".split()
+    original = " ".join(words[i * 7 % len(words)] + str(i % 9) for i in range(300))
+    revised = original.replace("depot0", "yard0")
+
+    first = upload(client, auth_headers, "report.txt", original.encode(), "text/plain")
+    second = upload(client, auth_headers, "report-v2.txt", revised.encode(), "text/plain")
+
+    document = client.get(f"/api/v1/documents/{second['id']}", headers=auth_headers).json()
+    assert document["previous_version_id"] == first["id"]